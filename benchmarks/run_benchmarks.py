@@ -0,0 +1,383 @@
+# run_benchmarks.py
+# Benchmark harness for the log pipeline, the profile engine and the
+# Streamlit KRIs
+#
+# Each benchmark runs in its own interpreter, so its peak RSS is not
+# inflated by the ones before it. Results (throughput, latency percentiles,
+# peak RSS) are printed as JSON and can be compared against a stored
+# baseline; any regression beyond --tolerance exits with status 1.
+#
+#   python benchmarks/run_benchmarks.py --save-baseline benchmarks/baseline.json
+#   python benchmarks/run_benchmarks.py --baseline benchmarks/baseline.json
+#   python benchmarks/run_benchmarks.py --only score_profile --profiles 50000
+#   python benchmarks/run_benchmarks.py --only detect_files_serial detect_files_parallel --workers 4
+
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import types
+from datetime import datetime, timezone
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import synthetic_data
+
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+SRC_DIR = REPO_ROOT / "src"
+
+DEFAULT_TOLERANCE = 0.15
+PERCENTILES = (50, 90, 99)
+
+
+# ------------------------------------------------------------
+# Workloads
+# ------------------------------------------------------------
+def _import_paths():
+    """
+    Makes the log pipeline (flat modules in src/), the profile engine
+    (imported as the risk_engine package) and streamlit_app importable.
+    """
+    for path in (str(SRC_DIR), str(REPO_ROOT)):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    try:
+        import risk_engine  # noqa: F401  (installed or symlinked package)
+    except ImportError:
+        package = types.ModuleType("risk_engine")
+        package.__path__ = [str(SRC_DIR)]
+        sys.modules["risk_engine"] = package
+
+
+def _batches(items: List[Any], size: int) -> List[List[Any]]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _load_events(data: Dict[str, str]):
+    from anomaly_detector import AnomalyDetector
+
+    return AnomalyDetector().load_logs(data["logs"])
+
+
+def bench_detect_anomalies(data, opts) -> Tuple[int, str, List[Callable]]:
+    from anomaly_detector import AnomalyDetector
+
+    events = _load_events(data)
+    detector = AnomalyDetector()
+    calls = [partial(detector.detect_anomalies, b) for b in _batches(events, opts["batch"])]
+    return len(events), f"batch of {opts['batch']} rows", calls
+
+
+def _detect_files(path, workers):
+    # What run_risk_analysis does for multi-file input, minus scoring and report
+    from anomaly_detector import AnomalyDetector
+    from bruteforce_detector import BruteForceDetector
+
+    detector = AnomalyDetector(bruteforce=BruteForceDetector())
+    scanned = detector.scan_logs(path, workers=workers)
+    events = detector.load_logs(path, workers=workers) if scanned is None else list(scanned[1])
+    return detector.detect_anomalies(events)
+
+
+def bench_detect_files(data, opts, workers=None):
+    workers = opts["workers"] if workers is None else workers
+    rows = opts["rows"]
+    return rows, f"{opts['log_files']} files, workers={workers}", [partial(_detect_files, data["log_dir"], workers)]
+
+
+def bench_score_events(data, opts):
+    from anomaly_detector import AnomalyDetector
+    from risk_score_engine import RiskScorer
+
+    anomalies = AnomalyDetector().detect_anomalies(_load_events(data))
+    scorer = RiskScorer()
+    calls = [partial(scorer.score_events, b) for b in _batches(anomalies, opts["batch"])]
+    return len(anomalies), f"batch of {opts['batch']} anomalies", calls
+
+
+def bench_create_html_report(data, opts):
+    from anomaly_detector import AnomalyDetector
+    from report_generator import ReportGenerator
+    from risk_score_engine import RiskScorer
+
+    scored = RiskScorer().score_events(AnomalyDetector().detect_anomalies(_load_events(data)))
+    output = Path(opts["work_dir"]) / "risk_report.html"
+    calls = [partial(ReportGenerator().create_html_report, scored, output)]
+    return len(scored), f"report of {len(scored)} events", calls
+
+
+def bench_score_profile(data, opts):
+    from risk_engine.risk_scoring import RiskEngine
+
+    with open(data["profiles"], encoding="utf-8") as f:
+        profiles = [json.loads(line) for line in f]
+    engine = RiskEngine()
+    calls = [partial(engine.score_profile, p) for p in profiles]
+    return len(profiles), "one profile", calls
+
+
+def bench_compute_kris(data, opts):
+    import pandas as pd
+    from streamlit_app import compute_kris
+
+    df = pd.read_csv(data["metric_logs"])
+    return len(df), f"frame of {len(df)} rows", [partial(compute_kris, df)]
+
+
+BENCHMARKS: Dict[str, Callable] = {
+    "detect_anomalies": bench_detect_anomalies,
+    # Same work, one process vs. --workers processes pre-filtering files
+    "detect_files_serial": partial(bench_detect_files, workers=1),
+    "detect_files_parallel": bench_detect_files,
+    "score_events": bench_score_events,
+    "create_html_report": bench_create_html_report,
+    "score_profile": bench_score_profile,
+    "compute_kris": bench_compute_kris,
+}
+
+
+# ------------------------------------------------------------
+# Measurement (runs inside the per-benchmark subprocess)
+# ------------------------------------------------------------
+def peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def measure(name: str, data: Dict[str, str], opts: Dict[str, Any]) -> Dict[str, Any]:
+    _import_paths()
+    # Library code prints progress lines; keep them out of the JSON channel
+    with contextlib.redirect_stdout(io.StringIO()):
+        items, unit, calls = BENCHMARKS[name](data, opts)
+        setup_rss = peak_rss_mb()
+        # One untimed call pays for lazy imports and first-use caches
+        calls[0]()
+
+        latencies = []
+        started = time.perf_counter()
+        for _ in range(opts["repeat"]):
+            for call in calls:
+                t = time.perf_counter()
+                call()
+                latencies.append(time.perf_counter() - t)
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    processed = items * opts["repeat"]
+    return {
+        "items": processed,
+        "seconds": round(elapsed, 4),
+        "throughput_per_s": round(processed / elapsed, 1) if elapsed > 0 else 0.0,
+        "latency_unit": unit,
+        "latency_ms": {
+            **{f"p{p}": round(percentile(latencies, p) * 1000, 4) for p in PERCENTILES},
+            "max": round(latencies[-1] * 1000, 4) if latencies else 0.0,
+        },
+        "calls": len(latencies),
+        "setup_rss_mb": setup_rss,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+# ------------------------------------------------------------
+# Driver
+# ------------------------------------------------------------
+def prepare_data(data_dir: Path, params: Dict[str, Any]) -> Dict[str, str]:
+    """Generates the synthetic inputs once per parameter set."""
+    data_dir.mkdir(parents=True, exist_ok=True)
+    tag = f"r{params['rows']}-u{params['users']}-i{params['ips']}-a{params['anomaly_ratio']}-s{params['seed']}"
+    log_kwargs = dict(
+        users=params["users"], ips=params["ips"], anomaly_ratio=params["anomaly_ratio"], seed=params["seed"]
+    )
+    data = {
+        "logs": data_dir / f"logs-{tag}.csv",
+        "log_dir": data_dir / f"log-files-{tag}-f{params['log_files']}",
+        "metric_logs": data_dir / f"metric-logs-{tag}.csv",
+        "profiles": data_dir / f"profiles-n{params['profiles']}-a{params['profile_anomaly_ratio']}-s{params['seed']}.jsonl",
+    }
+    if not data["logs"].exists():
+        synthetic_data.write_logs(data["logs"], params["rows"], **log_kwargs)
+    if not data["log_dir"].exists():
+        # Rotated-log style input: each file time-ordered, rows split evenly
+        parts = data["log_dir"].with_name(data["log_dir"].name + ".tmp")
+        parts.mkdir(exist_ok=True)
+        per_file = params["rows"] // params["log_files"]
+        for i in range(params["log_files"]):
+            synthetic_data.write_logs(parts / f"app-{i:02d}.csv", per_file, **{**log_kwargs, "seed": params["seed"] + i})
+        parts.rename(data["log_dir"])
+    if not data["metric_logs"].exists():
+        synthetic_data.write_logs(data["metric_logs"], params["rows"], metrics=True, **log_kwargs)
+    if not data["profiles"].exists():
+        synthetic_data.write_profiles(
+            data["profiles"], params["profiles"], anomaly_ratio=params["profile_anomaly_ratio"], seed=params["seed"]
+        )
+    return {k: str(v) for k, v in data.items()}
+
+
+def run_isolated(name: str, data: Dict[str, str], opts: Dict[str, Any]) -> Dict[str, Any]:
+    """Runs one benchmark in a fresh interpreter and returns its JSON result."""
+    proc = subprocess.run(
+        [sys.executable, __file__, "--worker", json.dumps({"name": name, "data": data, "opts": opts})],
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Benchmark {name} failed:\n{proc.stderr.strip()}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> Dict[str, Any]:
+    """
+    Flags a regression when throughput drops, or p99 latency or peak RSS
+    grows, by more than `tolerance` (a fraction) against the baseline.
+    """
+    report = {"tolerance": tolerance, "regressions": [], "benchmarks": {}}
+    if baseline.get("params") != current.get("params"):
+        report["warning"] = "baseline was recorded with different parameters"
+
+    for name, result in current["benchmarks"].items():
+        base = baseline.get("benchmarks", {}).get(name)
+        if base is None:
+            continue
+        checks = {
+            "throughput_per_s": (result["throughput_per_s"], base["throughput_per_s"], -1),
+            "latency_p99_ms": (result["latency_ms"]["p99"], base["latency_ms"]["p99"], 1),
+            "peak_rss_mb": (result["peak_rss_mb"], base["peak_rss_mb"], 1),
+        }
+        entry = {}
+        for metric, (new, old, worse_sign) in checks.items():
+            if new is None or not old:
+                continue
+            change = (new - old) / old
+            regressed = change * worse_sign > tolerance
+            entry[metric] = {"baseline": old, "current": new, "change": round(change, 4), "regressed": regressed}
+            if regressed:
+                report["regressions"].append(f"{name}.{metric}")
+        report["benchmarks"][name] = entry
+    return report
+
+
+def _print_summary(results: Dict[str, Any], comparison: Optional[Dict[str, Any]]):
+    # Human-readable table on stderr; stdout stays pure JSON
+    out = sys.stderr
+    print(f"{'benchmark':<20} {'items/s':>12} {'p50 ms':>10} {'p99 ms':>10} {'peak MB':>9}", file=out)
+    for name, r in results["benchmarks"].items():
+        line = (
+            f"{name:<20} {r['throughput_per_s']:>12,.0f} {r['latency_ms']['p50']:>10.3f} "
+            f"{r['latency_ms']['p99']:>10.3f} {r['peak_rss_mb'] or 0:>9.1f}"
+        )
+        if comparison and name in comparison["benchmarks"]:
+            tp = comparison["benchmarks"][name].get("throughput_per_s")
+            if tp:
+                line += f"  ({tp['change']:+.1%} throughput vs baseline)"
+        print(line, file=out)
+    if comparison:
+        if comparison.get("warning"):
+            print(f"Warning: {comparison['warning']}", file=out)
+        if comparison["regressions"]:
+            print("Regressions: " + ", ".join(comparison["regressions"]), file=out)
+        else:
+            print("No regressions against baseline.", file=out)
+
+
+def main():
+    import argparse
+
+    if len(sys.argv) == 3 and sys.argv[1] == "--worker":
+        job = json.loads(sys.argv[2])
+        print(json.dumps(measure(job["name"], job["data"], job["opts"])))
+        return 0
+
+    parser = argparse.ArgumentParser(description="Enterprise Risk Intelligence Engine – benchmarks")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="Run a subset of benchmarks.")
+    parser.add_argument("--rows", type=int, default=200_000, help="Synthetic log rows.")
+    parser.add_argument("--users", type=int, default=1000, help="Distinct users in the logs.")
+    parser.add_argument("--ips", type=int, default=2000, help="Distinct source IPs in the logs.")
+    parser.add_argument("--anomaly-ratio", type=float, default=0.05, help="Share of anomalous log rows.")
+    parser.add_argument("--profiles", type=int, default=20_000, help="Synthetic applicant profiles.")
+    parser.add_argument("--profile-anomaly-ratio", type=float, default=0.1, help="Share of high-risk profiles.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--log-files", type=int, default=8, help="Files the detect_files benchmarks split the rows into.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Processes for detect_files_parallel.")
+    parser.add_argument("--batch", type=int, default=10_000, help="Rows per timed call for batch APIs.")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed passes over the workload.")
+    parser.add_argument("--data-dir", type=str, help="Where generated inputs are kept (default: a temp dir).")
+    parser.add_argument("--output", type=str, help="Also write the JSON results to this file.")
+    parser.add_argument("--baseline", type=str, help="Baseline JSON to compare against.")
+    parser.add_argument("--save-baseline", type=str, help="Write this run as the new baseline.")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed regression (fraction).")
+    args = parser.parse_args()
+
+    params = {
+        "rows": args.rows,
+        "users": args.users,
+        "ips": args.ips,
+        "anomaly_ratio": args.anomaly_ratio,
+        "profiles": args.profiles,
+        "profile_anomaly_ratio": args.profile_anomaly_ratio,
+        "seed": args.seed,
+        "log_files": args.log_files,
+        "workers": args.workers,
+        "batch": args.batch,
+        "repeat": args.repeat,
+    }
+
+    with tempfile.TemporaryDirectory(prefix="risk-bench-") as tmp:
+        data = prepare_data(Path(args.data_dir) if args.data_dir else Path(tmp) / "data", params)
+        opts = {
+            "batch": args.batch,
+            "repeat": args.repeat,
+            "work_dir": tmp,
+            "rows": params["rows"] // args.log_files * args.log_files,
+            "log_files": args.log_files,
+            "workers": args.workers,
+        }
+        results = {
+            "meta": {
+                "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+            },
+            "params": params,
+            "benchmarks": {name: run_isolated(name, data, opts) for name in (args.only or BENCHMARKS)},
+        }
+
+    comparison = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            comparison = compare(results, json.load(f), args.tolerance)
+        results["comparison"] = comparison
+
+    text = json.dumps(results, indent=2)
+    print(text)
+    for path in (args.output, args.save_baseline):
+        if path:
+            Path(path).write_text(text + "\n", encoding="utf-8")
+    _print_summary(results, comparison)
+
+    return 1 if comparison and comparison["regressions"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
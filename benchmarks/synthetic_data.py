@@ -0,0 +1,213 @@
+# synthetic_data.py
+# Deterministic synthetic log CSVs and applicant profiles for benchmarks
+#
+# The same seed and parameters always produce byte-identical output, so
+# benchmark runs on different machines or commits see the same workload.
+#
+#   python benchmarks/synthetic_data.py logs out.csv --rows 1000000 --users 5000
+#   python benchmarks/synthetic_data.py profiles out.jsonl --count 100000
+
+import csv
+import json
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List
+
+
+NORMAL_EVENTS = ["login", "logout", "file_access", "api_call", "password_change"]
+HIGH_RISK_EVENTS = ["privilege_escalation", "data_export", "suspicious_login"]
+
+LOG_FIELDS = ["timestamp", "user", "event_type", "source_ip", "status"]
+# Extra columns the Streamlit KRIs look at (message text, numeric outliers)
+METRIC_FIELDS = ["message", "latency_ms", "status_code"]
+
+START_TIME = datetime(2025, 11, 15, tzinfo=timezone.utc)
+
+
+# ------------------------------------------------------------
+# Log events
+# ------------------------------------------------------------
+def _ip_pool(rng: random.Random, size: int) -> List[str]:
+    return [f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}" for _ in range(size)]
+
+
+def iter_log_rows(
+    rows: int,
+    users: int = 1000,
+    ips: int = 2000,
+    anomaly_ratio: float = 0.05,
+    seed: int = 42,
+    metrics: bool = False,
+    mean_gap_seconds: float = 2.0,
+) -> Iterator[List[Any]]:
+    """
+    Yields time-ordered log rows (lists in LOG_FIELDS order, plus
+    METRIC_FIELDS with metrics=True).
+
+    users/ips set the cardinality of those columns. anomaly_ratio is the
+    share of rows the default rules flag: a high-risk event type or a
+    failed action. Most failures come as bursts of repeated failed logins
+    from one user and IP, so KRI1 detection has work to do.
+    """
+    rng = random.Random(seed)
+    user_names = [f"user{i:06d}" for i in range(users)]
+    ip_pool = _ip_pool(rng, ips)
+    t = START_TIME
+    burst = []
+    # A quarter of anomaly draws start a burst of 2-5 more failed logins
+    # (3.5 on average), so draws are made less often to hit anomaly_ratio
+    p_anomaly = anomaly_ratio / (1 + 0.875 * (1 - anomaly_ratio))
+
+    for _ in range(rows):
+        t += timedelta(seconds=rng.expovariate(1.0 / mean_gap_seconds))
+
+        if burst:
+            user, ip = burst.pop()
+            event_type, status = "login", "failed"
+        else:
+            user = rng.choice(user_names)
+            ip = rng.choice(ip_pool)
+            event_type, status = rng.choice(NORMAL_EVENTS), "success"
+            if rng.random() < p_anomaly:
+                kind = rng.random()
+                if kind < 0.5:
+                    event_type = rng.choice(HIGH_RISK_EVENTS)
+                elif kind < 0.75:
+                    status = "failed"
+                else:
+                    event_type, status = "login", "failed"
+                    # The rest of the burst follows on the next rows
+                    burst = [(user, ip)] * rng.randint(2, 5)
+
+        row = [t.strftime("%Y-%m-%dT%H:%M:%SZ"), user, event_type, ip, status]
+        if metrics:
+            failed = status == "failed"
+            latency = rng.lognormvariate(3.5, 0.4)
+            if rng.random() < anomaly_ratio / 5:
+                latency *= rng.uniform(10, 50)
+            row += [
+                f"{event_type} {'failed' if failed else 'ok'}",
+                round(latency, 2),
+                rng.choice((401, 403, 500)) if failed else 200,
+            ]
+        yield row
+
+
+def write_logs(path, rows: int, **kwargs) -> int:
+    """Writes iter_log_rows(...) to a CSV file; returns the row count."""
+    header = LOG_FIELDS + (METRIC_FIELDS if kwargs.get("metrics") else [])
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for row in iter_log_rows(rows, **kwargs):
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+# ------------------------------------------------------------
+# Applicant profiles
+# ------------------------------------------------------------
+def make_profile(rng: random.Random, risky: bool) -> Dict[str, Any]:
+    """One profile in the examples/sample_input.json shape."""
+    required = rng.choice([8000, 10000, 12000, 15000, 20000])
+    if risky:
+        balance = round(required * rng.uniform(0.2, 1.1), 2)
+    else:
+        balance = round(required * rng.uniform(0.9, 3.0), 2)
+    required_gpa = rng.choice([2.5, 2.8, 3.0, 3.2])
+
+    def flag(p_normal: float, p_risky: float) -> bool:
+        return rng.random() < (p_risky if risky else p_normal)
+
+    return {
+        "financial": {
+            "bank_balance": balance,
+            "minimum_required": required,
+            "has_regular_income": not flag(0.1, 0.6),
+            "recent_large_unexplained_deposits": flag(0.02, 0.4),
+        },
+        "documentation": {
+            "all_required_documents_provided": not flag(0.05, 0.5),
+            "documents_verified": not flag(0.1, 0.6),
+            "inconsistencies_found": rng.randint(1, 4) if flag(0.05, 0.6) else 0,
+        },
+        "eligibility": {
+            "meets_minimum_criteria": not flag(0.03, 0.5),
+            "gpa": round(rng.uniform(1.8, 3.2) if risky else rng.uniform(2.6, 4.0), 2),
+            "required_gpa": required_gpa,
+            "gap_years": rng.choice([0, 0, 1, 2, 3, 4]) if risky else rng.choice([0, 0, 0, 1]),
+        },
+        "compliance": {
+            "previous_visa_refusals": rng.randint(1, 3) if flag(0.03, 0.5) else 0,
+            "adverse_immigration_history": flag(0.01, 0.3),
+            "sanctions_or_watchlists": flag(0.0, 0.05),
+        },
+        "behaviour": {
+            "response_consistency_score": round(rng.uniform(0.2, 0.8) if risky else rng.uniform(0.7, 1.0), 2),
+            "missed_deadlines": rng.randint(1, 4) if flag(0.05, 0.6) else 0,
+            "suspicious_communication": flag(0.01, 0.3),
+        },
+    }
+
+
+def iter_profiles(count: int, anomaly_ratio: float = 0.1, seed: int = 42) -> Iterator[Dict[str, Any]]:
+    """Yields profiles; anomaly_ratio is the share drawn from the high-risk distribution."""
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield make_profile(rng, rng.random() < anomaly_ratio)
+
+
+def write_profiles(path, count: int, **kwargs) -> int:
+    """Writes iter_profiles(...) as JSONL; returns the profile count."""
+    n = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for profile in iter_profiles(count, **kwargs):
+            f.write(json.dumps(profile) + "\n")
+            n += 1
+    return n
+
+
+# ------------------------------------------------------------
+# CLI entry point
+# ------------------------------------------------------------
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate deterministic synthetic benchmark data.")
+    sub = parser.add_subparsers(dest="kind", required=True)
+
+    logs = sub.add_parser("logs", help="Log CSV in the data/system_logs format.")
+    logs.add_argument("output", type=str)
+    logs.add_argument("--rows", type=int, default=100_000)
+    logs.add_argument("--users", type=int, default=1000, help="Distinct users.")
+    logs.add_argument("--ips", type=int, default=2000, help="Distinct source IPs.")
+    logs.add_argument("--anomaly-ratio", type=float, default=0.05)
+    logs.add_argument("--metrics", action="store_true", help="Add message/latency_ms/status_code columns.")
+    logs.add_argument("--seed", type=int, default=42)
+
+    profiles = sub.add_parser("profiles", help="Applicant profiles as JSONL.")
+    profiles.add_argument("output", type=str)
+    profiles.add_argument("--count", type=int, default=10_000)
+    profiles.add_argument("--anomaly-ratio", type=float, default=0.1)
+    profiles.add_argument("--seed", type=int, default=42)
+
+    args = parser.parse_args()
+    if args.kind == "logs":
+        n = write_logs(
+            args.output,
+            args.rows,
+            users=args.users,
+            ips=args.ips,
+            anomaly_ratio=args.anomaly_ratio,
+            seed=args.seed,
+            metrics=args.metrics,
+        )
+    else:
+        n = write_profiles(args.output, args.count, anomaly_ratio=args.anomaly_ratio, seed=args.seed)
+    print(f"Wrote {n} {args.kind} rows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,16 @@
 # anomaly_detector.py
 # Basic rule-based anomaly detection for enterprise logs
 
-import csv
-from pathlib import Path
+import time
+
+from log_event import LogEvent
+from log_reader import filter_log_events, iter_log_rows, load_log_rows, read_log_events, resolve_log_paths
+from metrics import NULL_METRICS
+from rule_spec import resolve_rules
+
+
+# Packed IPs below this are IPv4 (see log_event.pack_ip)
+_IPV4_END = 1 << 32
 
 
 class AnomalyDetector:
@@ -13,58 +21,201 @@ class AnomalyDetector:
     Phase 2: can be extended with ML models.
     """
 
-    def load_logs(self, path: str):
-        csv_path = Path(path)
-        if csv_path.is_dir():
-            # default file
-            csv_path = csv_path / "sample_logs.csv"
+    def __init__(self, rules=None, bruteforce=None, metrics=None, watchlist=None):
+        # None (built-in defaults), CompiledRules, or a hot-reloadable RuleSet
+        self.rules_source = rules
+        self.refresh_rules()
+
+        # Optional stateful KRI1 detector (BruteForceDetector); rows must
+        # then be fed in time order
+        self.bruteforce = bruteforce
+
+        # Optional metrics.Metrics: row/anomaly counts and sampled row latency
+        self.metrics = metrics if metrics is not None else NULL_METRICS
+
+        # Optional watchlist.Watchlist: rows from a listed user or source IP
+        # are anomalies whatever their event type or status
+        self.watchlist = watchlist
 
-        logs = []
-        with open(csv_path, newline="") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                logs.append(row)
-        return logs
+    def refresh_rules(self):
+        """
+        Picks up the current compiled rules. Called once per detection run,
+        so a RuleSet reload takes effect on the next batch without a restart.
+        """
+        self.rules = resolve_rules(self.rules_source)
+        # Event types that are always treated as anomalies
+        self.high_risk_events = self.rules.high_risk_events
+        self._reasons = {}
+
+    def resolve_paths(self, path: str):
+        """
+        A file, a directory (every *.csv, *.csv.gz, *.csv.zst, *.parquet,
+        *.arrow, ... inside it) or a glob pattern.
+        """
+        paths = resolve_log_paths(path)
+        if not paths:
+            raise FileNotFoundError(f"No log files found at: {path}")
+        return paths
+
+    def iter_logs(self, path: str, workers=None):
+        """
+        Yields log rows one at a time so arbitrarily large files can be
+        processed with constant memory. Multiple files are parsed
+        concurrently (workers threads) and merged in timestamp order.
+        Rows are compact LogEvents (see log_event).
+        """
+        return iter_log_rows(self.resolve_paths(path), workers=workers, reader=read_log_events)
+
+    def load_logs(self, path: str, workers=None):
+        return load_log_rows(self.resolve_paths(path), workers=workers, reader=read_log_events)
+
+    def scan_logs(self, path: str, workers=None):
+        """
+        Parses multi-file input in up to `workers` processes that send back
+        only the rows the stateless rules flag (high-risk event type,
+        failed status, watchlist) rather than every row. Returns (rows
+        read, those rows in timestamp order), or None for a single file or
+        workers <= 1, where there is nothing to parallelise.
+
+        detect_anomalies[_stream] over the flagged rows finds the same
+        anomalies as over all of them: any other row is never an anomaly,
+        and the brute-force detector only looks at failed rows.
+        """
+        paths = self.resolve_paths(path)
+        if len(paths) < 2 or not workers or workers <= 1:
+            return None
+        self.refresh_rules()
+        return filter_log_events(paths, _StatelessCheck(self.high_risk_events, self.watchlist), workers)
+
+    def check_row(self, row):
+        """
+        Applies the detection rules to a single log row (a LogEvent or a
+        row dict). Returns the row as a LogEvent with its reason set, or
+        None if the row looks normal.
+        """
+        event = row if isinstance(row, LogEvent) else LogEvent.from_row(row)
+        event_type = event.event_type
+
+        high_risk = event_type in self.high_risk_events
+        failed = event.status == "failed"
+        listed = self._screen(event) if self.watchlist is not None else None
+        if not (high_risk or failed or listed):
+            return None
+
+        # Reason strings are shared between events with the same outcome
+        key = (event_type if high_risk else None, failed, listed)
+        reason = self._reasons.get(key)
+        if reason is None:
+            reasons = []
+            if high_risk:
+                reasons.append(f"High-risk event type: {event_type}")
+            if failed:
+                reasons.append("Failed action")
+            if listed:
+                reasons.append(f"Watchlisted {listed}")
+            reason = self._reasons[key] = "; ".join(reasons)
+
+        burst = None
+        if failed and self.bruteforce is not None:
+            burst = self.bruteforce.observe(event, event_type)
+            if burst:
+                reason = f"{reason}; {burst}"
+
+        # Both set on every anomaly, so nothing carries over from an earlier
+        # pass over the same (loaded) events; burst is scored with the rule
+        # spec's bruteforce_bonus
+        event.reason = reason
+        event.burst = bool(burst)
+        return event
+
+    def flagged(self, event):
+        """Whether the stateless rules (all but brute force) flag a row."""
+        high_risk = event.event_type in self.high_risk_events
+        return high_risk or event.status == "failed" or (self.watchlist is not None and bool(self._screen(event)))
+
+    def _screen(self, event):
+        """'user', 'source IP', both or None: which of the event's fields are listed."""
+        watchlist = self.watchlist
+        user = bool(event.user) and watchlist.contains(event.user)
+        packed = event.packed_ip
+        if isinstance(packed, int) and packed < _IPV4_END:
+            ip = watchlist.contains_ip(packed)
+        else:
+            ip = bool(packed) and watchlist.contains_ip(event.source_ip)
+        if user and ip:
+            return "user and source IP"
+        return "user" if user else "source IP" if ip else None
+
+    def detect_anomalies_stream(self, logs):
+        """
+        Generator version of detect_anomalies: consumes any iterable of rows
+        (e.g. iter_logs) and yields anomalies as soon as they are found.
+        """
+        self.refresh_rules()
+        if self.metrics.enabled:
+            yield from self._detect_instrumented(logs)
+            return
+        for row in logs:
+            anomaly = self.check_row(row)
+            if anomaly is not None:
+                yield anomaly
+
+    def _detect_instrumented(self, logs):
+        # Same loop, plus counters and one timed check_row per sample_every rows
+        metrics = self.metrics
+        every = metrics.sample_every
+        perf = time.perf_counter
+        check = self.check_row
+        rows = anomalies = sampled = 0
+        sampled_seconds = peak = 0.0
+        try:
+            for row in logs:
+                if rows % every == 0:
+                    t = perf()
+                    anomaly = check(row)
+                    elapsed = perf() - t
+                    sampled_seconds += elapsed
+                    sampled += 1
+                    if elapsed > peak:
+                        peak = elapsed
+                else:
+                    anomaly = check(row)
+                rows += 1
+                if anomaly is not None:
+                    anomalies += 1
+                    yield anomaly
+        finally:
+            metrics.incr("log_events", rows)
+            metrics.incr("anomalies", anomalies)
+            if sampled:
+                metrics.observe("detect_row", sampled_seconds, count=sampled, peak=peak)
 
     def detect_anomalies(self, logs):
         """
         Very simple heuristic rules:
         - Any event_type in high_risk_events is an anomaly
         - Any status == 'failed' is an anomaly
+        - With a BruteForceDetector, failed logins that complete a
+          sliding-window burst (KRI1) get an extra reason and are marked
+          (burst) for RiskScorer's bruteforce_bonus (0 by default)
+        - With a Watchlist, any event from a listed user or source IP
         """
-        high_risk_events = {
-            "privilege_escalation",
-            "data_export",
-            "suspicious_login",
-        }
+        return list(self.detect_anomalies_stream(logs))
 
-        anomalies = []
 
-        for row in logs:
-            event_type = row.get("event_type", "").lower()
-            status = row.get("status", "").lower()
+class _StatelessCheck:
+    """AnomalyDetector.flagged as a picklable callable for log_reader workers."""
 
-            is_anomaly = False
-            reasons = []
+    def __init__(self, high_risk_events, watchlist):
+        self.high_risk_events = high_risk_events
+        self.watchlist = watchlist
+        self._detector = None
 
-            if event_type in high_risk_events:
-                is_anomaly = True
-                reasons.append(f"High-risk event type: {event_type}")
-
-            if status == "failed":
-                is_anomaly = True
-                reasons.append("Failed action")
+    def __getstate__(self):
+        return {"high_risk_events": self.high_risk_events, "watchlist": self.watchlist, "_detector": None}
 
-            if is_anomaly:
-                anomalies.append(
-                    {
-                        "timestamp": row.get("timestamp"),
-                        "user": row.get("user"),
-                        "event_type": event_type,
-                        "source_ip": row.get("source_ip"),
-                        "status": status,
-                        "reason": "; ".join(reasons),
-                    }
-                )
-
-        return anomalies
+    def __call__(self, event):
+        if self._detector is None:
+            self._detector = AnomalyDetector(watchlist=self.watchlist)
+            self._detector.high_risk_events = self.high_risk_events
+        return self._detector.flagged(event)
@@ -0,0 +1,285 @@
+# arrow_io.py
+# Parquet / Arrow IPC input and output shared by both pipelines
+#
+# Reads are memory-mapped and batch-at-a-time (Parquet row groups, IPC
+# record batches), so reruns and downstream tools skip CSV/JSON parsing
+# without loading whole files. Writes are streamed in batches from any
+# iterable of records. pyarrow is optional; it is only imported when one
+# of these formats is actually used.
+#
+#   python src/arrow_io.py logs.csv logs.parquet        (all columns as text)
+#   python src/arrow_io.py events.jsonl events.arrow    (schema inferred)
+#
+# Risk profiles have a typed layout of their own, see profile_io.
+
+import json
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+
+PARQUET_SUFFIXES = (".parquet", ".pq")
+IPC_SUFFIXES = (".arrow", ".feather", ".ipc")
+COLUMNAR_SUFFIXES = PARQUET_SUFFIXES + IPC_SUFFIXES
+
+DEFAULT_BATCH_ROWS = 65_536
+
+
+def require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError as exc:
+        raise ImportError("pyarrow is required for Parquet/Arrow input and output") from exc
+    return pyarrow
+
+
+def is_columnar_path(path) -> bool:
+    return Path(path).suffix.lower() in COLUMNAR_SUFFIXES
+
+
+# ------------------------------------------------------------
+# Reading
+# ------------------------------------------------------------
+def iter_batches(path, batch_rows: int = DEFAULT_BATCH_ROWS, columns: Optional[List[str]] = None):
+    """
+    Yields pyarrow.RecordBatches from a Parquet or Arrow IPC file. IPC
+    files are memory-mapped and their batches are zero-copy views.
+    """
+    pa = require_pyarrow()
+    path = Path(path)
+    if path.suffix.lower() in PARQUET_SUFFIXES:
+        parquet = pa.parquet.ParquetFile(path, memory_map=True)
+        yield from parquet.iter_batches(batch_size=batch_rows, columns=columns)
+        return
+
+    with pa.memory_map(str(path), "r") as source:
+        try:
+            reader = pa.ipc.open_file(source)
+            batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+        except pa.ArrowInvalid:
+            # Arrow IPC stream format (no footer)
+            source.seek(0)
+            batches = pa.ipc.open_stream(source)
+        for batch in batches:
+            if columns is not None:
+                batch = batch.select([c for c in columns if c in batch.schema.names])
+            yield batch
+
+
+def read_table(path, columns: Optional[List[str]] = None):
+    """A whole Parquet / Arrow IPC file as one (memory-mapped) pyarrow.Table."""
+    pa = require_pyarrow()
+    path = Path(path)
+    if path.suffix.lower() in PARQUET_SUFFIXES:
+        return pa.parquet.read_table(path, columns=columns, memory_map=True)
+
+    # read_all() keeps the schema of files with no batches
+    with pa.memory_map(str(path), "r") as source:
+        try:
+            table = pa.ipc.open_file(source).read_all()
+        except pa.ArrowInvalid:
+            source.seek(0)
+            table = pa.ipc.open_stream(source).read_all()
+    if columns is not None:
+        table = table.select([c for c in columns if c in table.schema.names])
+    return table
+
+
+def as_text(data):
+    """
+    A RecordBatch or Table with every column cast to string. Timestamp
+    columns are formatted as ISO-8601 (with a Z suffix for UTC).
+    """
+    pa = require_pyarrow()
+    import pyarrow.compute as pc
+
+    columns = []
+    for column in data.columns:
+        kind = column.type
+        if pa.types.is_dictionary(kind):
+            column = column.cast(kind.value_type)
+            kind = kind.value_type
+        if pa.types.is_timestamp(kind):
+            utc = kind.tz in ("UTC", "Z", "+00:00", "Etc/UTC")
+            column = pc.strftime(column, format="%Y-%m-%dT%H:%M:%S" + ("Z" if utc else ""))
+        elif not (pa.types.is_string(kind) or pa.types.is_large_string(kind)):
+            column = column.cast(pa.string())
+        columns.append(column)
+    return type(data).from_arrays(columns, names=data.schema.names)
+
+
+def string_columns(batch) -> Dict[str, List[Optional[str]]]:
+    """A batch as name -> list of str, like csv.DictReader values (see as_text)."""
+    batch = as_text(batch)
+    return {name: column.to_pylist() for name, column in zip(batch.schema.names, batch.columns)}
+
+
+def iter_records(path, batch_rows: int = DEFAULT_BATCH_ROWS) -> Iterator[Dict[str, Any]]:
+    """Yields each row as a dict (nested structs become nested dicts)."""
+    for batch in iter_batches(path, batch_rows):
+        yield from batch.to_pylist()
+
+
+# ------------------------------------------------------------
+# Writing
+# ------------------------------------------------------------
+def _open_writer(pa, path: Path, schema, compression: str = "zstd"):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix.lower() in PARQUET_SUFFIXES:
+        return pa.parquet.ParquetWriter(path, schema, compression=compression)
+    return pa.ipc.new_file(str(path), schema)
+
+
+class RecordWriter:
+    """
+    Streams records into a Parquet or Arrow IPC file, one record batch per
+    `batch_rows` records. Records may be dicts or anything with a dict-like
+    .get() (e.g. LogEvent).
+
+    schema is a callable taking the pyarrow module and returning a
+    pyarrow.Schema (so callers need not import pyarrow), or None to infer
+    it from the first batch.
+    """
+
+    def __init__(
+        self,
+        path,
+        schema: Optional[Callable[[Any], Any]] = None,
+        batch_rows: int = DEFAULT_BATCH_ROWS,
+        compression: str = "zstd",
+    ):
+        self.pa = require_pyarrow()
+        self.path = Path(path)
+        self.schema = schema(self.pa) if schema is not None else None
+        self.batch_rows = batch_rows
+        self.compression = compression
+        self.count = 0
+        self._pending: List[Any] = []
+        self._writer = None
+
+    def write(self, record):
+        self._pending.append(record)
+        if len(self._pending) >= self.batch_rows:
+            self._flush()
+
+    def write_all(self, records: Iterable[Any]):
+        for record in records:
+            self.write(record)
+
+    def tee(self, records: Iterable[Any]) -> Iterator[Any]:
+        """Writes each record and passes it on, for use inside a stream."""
+        for record in records:
+            self.write(record)
+            yield record
+
+    def _flush(self):
+        if not self._pending:
+            return
+        pa = self.pa
+        if self.schema is None:
+            rows = [r if isinstance(r, dict) else r.to_dict() for r in self._pending]
+            batch = pa.RecordBatch.from_pylist(rows)
+            self.schema = batch.schema
+        else:
+            names = self.schema.names
+            arrays = [
+                pa.array([r.get(name) for r in self._pending], type=self.schema.field(name).type)
+                for name in names
+            ]
+            batch = pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+
+        if self._writer is None:
+            self._writer = _open_writer(pa, self.path, self.schema, self.compression)
+        self._writer.write_batch(batch)
+        self.count += len(self._pending)
+        self._pending = []
+
+    def close(self):
+        self._flush()
+        if self._writer is None:
+            # Nothing written: still leave a valid (empty) file behind
+            schema = self.schema if self.schema is not None else self.pa.schema([])
+            self._writer = _open_writer(self.pa, self.path, schema, self.compression)
+        self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def write_records(records: Iterable[Any], path, schema=None, batch_rows: int = DEFAULT_BATCH_ROWS) -> int:
+    with RecordWriter(path, schema=schema, batch_rows=batch_rows) as writer:
+        writer.write_all(records)
+    return writer.count
+
+
+# ------------------------------------------------------------
+# Conversion
+# ------------------------------------------------------------
+def convert_csv(src, dst, compression: str = "zstd") -> int:
+    """
+    CSV (optionally compressed) -> Parquet/IPC with every column kept as
+    text, so values read back exactly as csv.DictReader returned them.
+    """
+    pa = require_pyarrow()
+    import pyarrow.csv as pacsv
+
+    # A small first pass only to learn the column names
+    with pacsv.open_csv(
+        pa.input_stream(str(src), compression="detect"), read_options=pacsv.ReadOptions(block_size=1 << 16)
+    ) as probe:
+        names = probe.schema.names
+    schema = pa.schema([(name, pa.string()) for name in names])
+
+    reader = pacsv.open_csv(
+        pa.input_stream(str(src), compression="detect"),
+        read_options=pacsv.ReadOptions(block_size=1 << 24),
+        convert_options=pacsv.ConvertOptions(
+            column_types={name: pa.string() for name in names},
+            strings_can_be_null=False,
+            quoted_strings_can_be_null=False,
+        ),
+    )
+    count = 0
+    with _open_writer(pa, Path(dst), schema, compression) as writer:
+        for batch in reader:
+            writer.write_batch(batch)
+            count += batch.num_rows
+    return count
+
+
+def convert_jsonl(src, dst, batch_rows: int = DEFAULT_BATCH_ROWS, schema=None) -> int:
+    """JSON Lines -> Parquet/IPC (schema inferred from the first batch unless given)."""
+
+    def records():
+        with open(src, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    return write_records(records(), dst, schema=schema, batch_rows=batch_rows)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert CSV / JSON Lines inputs to Parquet or Arrow IPC.")
+    parser.add_argument("input", type=str, help="CSV (.csv, .csv.gz, ...) or JSON Lines (.jsonl) file.")
+    parser.add_argument("output", type=str, help="Destination .parquet or .arrow file.")
+    args = parser.parse_args()
+
+    if not is_columnar_path(args.output):
+        parser.error("output must end in one of " + ", ".join(COLUMNAR_SUFFIXES))
+    if args.input.lower().endswith((".jsonl", ".ndjson")):
+        count = convert_jsonl(args.input, args.output)
+    else:
+        count = convert_csv(args.input, args.output)
+    print(f"Wrote {count} rows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# bruteforce_detector.py
+# Stateful sliding-window detection for KRI1 (repeated failed logins)
+
+from collections import OrderedDict, deque
+from datetime import datetime
+
+
+def parse_timestamp(value):
+    """Converts an ISO-8601 log timestamp to epoch seconds (None if invalid)."""
+    if not value:
+        return None
+    try:
+        # fromisoformat only accepts a "Z" (UTC) suffix from Python 3.11
+        if value[-1] in "Zz":
+            value = value[:-1] + "+00:00"
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+class BruteForceDetector:
+    """
+    Flags `threshold` failed logins within `window_seconds`, tracked
+    separately per user and per source_ip. AnomalyDetector marks the
+    event that completes a burst, and RiskScorer adds the rule spec's
+    bruteforce_bonus (0 unless a spec sets it) to its score.
+
+    Each key keeps a ring buffer (deque with maxlen=threshold) of its most
+    recent failure times, so the check is O(1) per event: the window is
+    breached when the buffer is full and its oldest entry is within
+    window_seconds of the newest.
+
+    Keys live in an OrderedDict ordered by last failure. Keys idle for
+    longer than ttl_seconds are evicted from the front as time advances,
+    and at most max_keys are kept, so memory stays bounded even with
+    millions of distinct users/IPs.
+    """
+
+    def __init__(
+        self,
+        threshold=3,
+        window_seconds=300,
+        ttl_seconds=None,
+        max_keys=1_000_000,
+        key_fields=("user", "source_ip"),
+        event_types=("login",),
+    ):
+        self.threshold = threshold
+        self.window_seconds = window_seconds
+        # A key idle for longer than the window can never complete a burst
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else window_seconds
+        self.max_keys = max_keys
+        self.key_fields = tuple(key_fields)
+        # None means every failed event counts, not only logins
+        self.event_types = set(event_types) if event_types is not None else None
+
+        self._buffers = OrderedDict()
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self._buffers)
+
+    def observe(self, row, event_type=None):
+        """
+        Records one failed event and returns a reason string if it completes
+        a burst for any tracked key, otherwise None. Callers should pass only
+        failed events; event_type may be given already lower-cased.
+        """
+        if event_type is None:
+            event_type = (row.get("event_type") or "").lower()
+        if self.event_types is not None and event_type not in self.event_types:
+            return None
+
+        ts = parse_timestamp(row.get("timestamp"))
+        if ts is None:
+            return None
+
+        hits = []
+        buffers = self._buffers
+        for field in self.key_fields:
+            value = row.get(field)
+            if not value:
+                continue
+            key = (field, value)
+            buf = buffers.get(key)
+            if buf is None:
+                buf = buffers[key] = deque(maxlen=self.threshold)
+            else:
+                buffers.move_to_end(key)
+            buf.append(ts)
+            if len(buf) == self.threshold and ts - buf[0] <= self.window_seconds:
+                hits.append(f"{field}={value}")
+
+        self._evict(ts)
+
+        if not hits:
+            return None
+        return (
+            f"Repeated failed logins: {self.threshold} within "
+            f"{self.window_seconds}s ({', '.join(hits)})"
+        )
+
+    # ------------------------------------------------------------
+    # Checkpointing
+    # ------------------------------------------------------------
+    def to_state(self):
+        """JSON-serialisable snapshot of the per-key buffers (oldest key first)."""
+        return {
+            "buffers": [[field, value, list(buf)] for (field, value), buf in self._buffers.items()],
+            "evicted": self.evicted,
+        }
+
+    def load_state(self, state):
+        self._buffers = OrderedDict(
+            ((field, value), deque(times, maxlen=self.threshold))
+            for field, value, times in state.get("buffers", [])
+        )
+        self.evicted = state.get("evicted", 0)
+
+    def _evict(self, now):
+        buffers = self._buffers
+        cutoff = now - self.ttl_seconds
+        # Front of the OrderedDict holds the least recently failing keys
+        while buffers:
+            key, buf = next(iter(buffers.items()))
+            if buf[-1] >= cutoff and len(buffers) <= self.max_keys:
+                break
+            del buffers[key]
+            self.evicted += 1
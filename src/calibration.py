@@ -0,0 +1,316 @@
+# calibration.py
+# What-if sweeps of RiskEngine weights and band thresholds
+#
+# Weights and thresholds only act after the rules have run, so a sweep
+# scores the portfolio once: the five category scores (and the ML
+# probability, if a model is configured) of every profile go into an
+# n x 6 matrix, cached on disk as .npy. Each candidate configuration is
+# then one column of a normalised weight matrix, and a block of profiles
+# is scored under all of them with a single matrix multiply. Row ranges
+# of the (memory-mapped) matrix are shared out over worker processes and
+# their band counts added up.
+#
+#   python -m risk_engine.risk_scoring profiles.jsonl --sweep grid.json --score-cache scores.npy
+#
+# A grid file lists candidate values per setting; every combination is
+# evaluated (settings left out keep the engine's value):
+#
+#   {"category_weights": {"financial": [0.2, 0.3, 0.4]},
+#    "rule_weight": [0.5, 0.6, 0.7], "high_threshold": [65, 70, 75]}
+#
+# "configs": [{...}, ...] lists explicit configurations instead.
+
+import hashlib
+import json
+import os
+from itertools import product
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .rule_spec import resolve_rules
+from .rules_vectorized import CATEGORY_SCORERS, profiles_to_columns, score_all_categories_columnar
+
+
+CATEGORIES = tuple(CATEGORY_SCORERS)
+BANDS = ("Low", "Medium", "High")
+
+# Profiles scored per pass while building the matrix
+MATRIX_CHUNK_ROWS = 65_536
+# Rows per matrix multiply: the b x configs intermediates stay a few MB
+SWEEP_BLOCK_ROWS = 8_192
+
+_SCALARS = ("rule_weight", "ml_weight", "high_threshold", "medium_threshold")
+
+
+# ------------------------------------------------------------
+# Configurations
+# ------------------------------------------------------------
+def engine_config(engine) -> Dict[str, Any]:
+    """The weights and thresholds a RiskEngine currently scores with."""
+    return {
+        "category_weights": dict(engine.category_weights),
+        **{name: getattr(engine, name) for name in _SCALARS},
+    }
+
+
+def apply_config(engine, config: Dict[str, Any]):
+    """Sets a sweep configuration (or part of one) on a RiskEngine."""
+    if "category_weights" in config:
+        engine.category_weights = {**engine.category_weights, **config["category_weights"]}
+    for name in _SCALARS:
+        if name in config:
+            setattr(engine, name, config[name])
+
+
+def expand_grid(spec: Dict[str, Any], base: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Every configuration described by a grid spec (see the module comment),
+    each a full config with unspecified settings taken from `base`.
+    """
+    if "configs" in spec:
+        partials = spec["configs"]
+    else:
+        axes: List[Tuple[Tuple[str, ...], List[Any]]] = []
+        for category, values in spec.get("category_weights", {}).items():
+            axes.append((("category_weights", category), list(values)))
+        for name in _SCALARS:
+            if name in spec:
+                axes.append(((name,), list(spec[name])))
+        unknown = set(spec) - {"category_weights", *_SCALARS}
+        if unknown:
+            raise ValueError(f"Unknown grid settings: {sorted(unknown)}")
+
+        partials = []
+        for values in product(*(candidates for _, candidates in axes)):
+            config: Dict[str, Any] = {}
+            for (path, _), value in zip(axes, values):
+                if len(path) == 2:
+                    config.setdefault("category_weights", {})[path[1]] = value
+                else:
+                    config[path[0]] = value
+            partials.append(config)
+
+    configs = []
+    for partial in partials:
+        config = json.loads(json.dumps(base))
+        config["category_weights"].update(partial.get("category_weights", {}))
+        config.update({name: partial[name] for name in _SCALARS if name in partial})
+        configs.append(config)
+    return configs
+
+
+def config_arrays(configs: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """
+    Configurations as arrays: `weights` is categories x configs, each
+    column normalised to sum to 1 (as compute_rule_score divides by the
+    total weight); the rest are one value per config.
+    """
+    weights = np.array(
+        [[config["category_weights"].get(c, 0) for config in configs] for c in CATEGORIES], dtype=np.float64
+    ).reshape(len(CATEGORIES), len(configs))
+    totals = weights.sum(axis=0)
+    weights = np.divide(weights, totals, out=np.zeros_like(weights), where=totals != 0)
+    arrays = {"weights": weights}
+    for name in _SCALARS:
+        arrays[name] = np.array([config[name] for config in configs], dtype=np.float64)
+    return arrays
+
+
+# ------------------------------------------------------------
+# Score matrix
+# ------------------------------------------------------------
+def build_score_matrix(engine, profiles: Iterable[Dict[str, Any]], chunk_rows: int = MATRIX_CHUNK_ROWS) -> np.ndarray:
+    """
+    n x (categories + 1) float64 matrix: the category scores of each
+    profile under the engine's rules, then its ML probability (NaN when
+    there is no model).
+    """
+    from .risk_scoring import _chunked
+
+    blocks = []
+    for chunk in _chunked(profiles, chunk_rows):
+        if engine.watchlist is not None:
+            chunk = [engine.screen_profile(p) for p in chunk]
+        scores, _ = score_all_categories_columnar(profiles_to_columns(chunk), rules=engine.rules)
+        ml = [np.nan if p is None else p for p in engine.compute_ml_scores(chunk)]
+        blocks.append(np.column_stack([scores[c] for c in CATEGORIES] + [np.asarray(ml, dtype=np.float64)]))
+    if not blocks:
+        return np.empty((0, len(CATEGORIES) + 1), dtype=np.float64)
+    return np.vstack(blocks).astype(np.float64, copy=False)
+
+
+def _matrix_key(engine, input_path: Path) -> str:
+    st = os.stat(input_path)
+    key = {
+        "input": [str(input_path.resolve()), st.st_mtime_ns, st.st_size],
+        "rules": resolve_rules(engine.rules).digest,
+        "model": engine.model_id(),
+        "watchlist": None,
+        "categories": list(CATEGORIES),
+    }
+    if engine.watchlist is not None:
+        st = os.stat(engine.watchlist.path)
+        key["watchlist"] = [str(engine.watchlist.path.resolve()), st.st_mtime_ns, st.st_size]
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def load_score_matrix(engine, input_path: Path, cache_path: Path) -> np.ndarray:
+    """
+    The score matrix for a profiles file, memory-mapped from cache_path.
+    It is (re)built when the input, rules, model or watchlist changed
+    since it was cached (a .key file beside it records what it was built
+    from).
+    """
+    from .profile_io import iter_profiles
+    from .risk_scoring import iter_jsonl
+
+    key_path = cache_path.with_name(cache_path.name + ".key")
+    key = _matrix_key(engine, input_path)
+    if not (cache_path.exists() and key_path.exists() and key_path.read_text(encoding="utf-8") == key):
+        from .arrow_io import is_columnar_path
+
+        profiles = iter_profiles(input_path) if is_columnar_path(input_path) else iter_jsonl(input_path)
+        matrix = build_score_matrix(engine, profiles)
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        # np.save appends .npy to names without it, so write through a handle
+        with cache_path.open("wb") as f:
+            np.save(f, matrix)
+        key_path.write_text(key, encoding="utf-8")
+    return np.load(cache_path, mmap_mode="r")
+
+
+# ------------------------------------------------------------
+# Sweep
+# ------------------------------------------------------------
+def band_codes(block: np.ndarray, arrays: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    rows x configs band index (0 Low, 1 Medium, 2 High), computed the way
+    RiskEngine._build_result does for each configuration.
+    """
+    rule_risk = 1.0 - (block[:, : len(CATEGORIES)] @ arrays["weights"]) / 100.0
+    ml = block[:, len(CATEGORIES) :]
+    blended = arrays["rule_weight"] * rule_risk + arrays["ml_weight"] * np.nan_to_num(ml)
+    final = np.round(np.where(np.isnan(ml), rule_risk, blended) * 100, 2)
+    return (final >= arrays["medium_threshold"]).astype(np.int8) + (final >= arrays["high_threshold"])
+
+
+def sweep_counts(
+    matrix: np.ndarray,
+    arrays: Dict[str, np.ndarray],
+    baseline: Dict[str, np.ndarray],
+    start: int = 0,
+    stop: Optional[int] = None,
+    block_rows: int = SWEEP_BLOCK_ROWS,
+) -> np.ndarray:
+    """
+    configs x 3 x 3 counts of profiles in rows [start, stop) moving from
+    each baseline band (axis 1) to each band under the config (axis 2).
+    """
+    stop = len(matrix) if stop is None else stop
+    n_configs = arrays["weights"].shape[1]
+    offsets = 9 * np.arange(n_configs)
+    counts = np.zeros(9 * n_configs, dtype=np.int64)
+    for lo in range(start, stop, block_rows):
+        block = np.asarray(matrix[lo : min(lo + block_rows, stop)])
+        before = band_codes(block, baseline)
+        after = band_codes(block, arrays)
+        cells = before * 3 + after + offsets
+        counts += np.bincount(cells.ravel(), minlength=9 * n_configs)
+    return counts.reshape(n_configs, 3, 3)
+
+
+def _sweep_shard(matrix_path: str, arrays, baseline, start: int, stop: int, block_rows: int) -> np.ndarray:
+    # Each worker maps the cached matrix itself; only row bounds are sent
+    return sweep_counts(np.load(matrix_path, mmap_mode="r"), arrays, baseline, start, stop, block_rows)
+
+
+def run_sweep(
+    matrix: np.ndarray,
+    configs: List[Dict[str, Any]],
+    baseline: Dict[str, Any],
+    workers: Optional[int] = None,
+    block_rows: int = SWEEP_BLOCK_ROWS,
+) -> np.ndarray:
+    """
+    Band migration counts (configs x 3 x 3) for every configuration. With
+    workers > 1 and a memory-mapped matrix, row shards run in a process pool.
+    """
+    arrays = config_arrays(configs)
+    base = config_arrays([baseline])
+    n = len(matrix)
+    matrix_path = getattr(matrix, "filename", None)
+    if not workers or workers <= 1 or matrix_path is None or n <= block_rows:
+        return sweep_counts(matrix, arrays, base, block_rows=block_rows)
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    shard_rows = max(block_rows, -(-n // (workers * 4)))
+    total = np.zeros((len(configs), 3, 3), dtype=np.int64)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_sweep_shard, str(matrix_path), arrays, base, lo, min(lo + shard_rows, n), block_rows)
+            for lo in range(0, n, shard_rows)
+        ]
+        for future in futures:
+            total += future.result()
+    return total
+
+
+def summarize(configs: List[Dict[str, Any]], migrations: np.ndarray) -> List[Dict[str, Any]]:
+    """
+    One report per configuration: band counts, their shift from the
+    baseline, and how many profiles changed band (and between which).
+    """
+    baseline = migrations[0].sum(axis=1) if len(migrations) else np.zeros(3, dtype=np.int64)
+    reports = []
+    for config, moves in zip(configs, migrations):
+        bands = moves.sum(axis=0)
+        total = int(bands.sum())
+        changed = total - int(np.trace(moves))
+        reports.append(
+            {
+                "config": config,
+                "bands": {band: int(count) for band, count in zip(BANDS, bands)},
+                "shift": {band: int(count) for band, count in zip(BANDS, bands - baseline)},
+                "changed": changed,
+                "changed_pct": round(100.0 * changed / total, 2) if total else 0.0,
+                "moves": {
+                    f"{BANDS[i]}->{BANDS[j]}": int(moves[i, j])
+                    for i in range(3)
+                    for j in range(3)
+                    if i != j and moves[i, j]
+                },
+            }
+        )
+    return reports
+
+
+def calibrate(
+    engine,
+    input_path: Path,
+    spec: Dict[str, Any],
+    cache_path: Optional[Path] = None,
+    workers: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Runs a sweep over a profiles file (JSON Lines or Parquet/Arrow) and
+    returns one summarize() report per configuration, in grid order.
+    Without cache_path the matrix goes to a temporary file.
+    """
+    import tempfile
+
+    baseline = engine_config(engine)
+    configs = expand_grid(spec, baseline)
+    metrics = engine.metrics
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(cache_path) if cache_path else Path(tmp) / "scores.npy"
+        with metrics.timer("sweep_stage", stage="matrix"):
+            matrix = load_score_matrix(engine, Path(input_path), path)
+        with metrics.timer("sweep_stage", stage="sweep"):
+            migrations = run_sweep(matrix, configs, baseline, workers=workers)
+        del matrix  # release the mapping before the directory goes
+    metrics.incr("sweep_configs", len(configs))
+    return summarize(configs, migrations)
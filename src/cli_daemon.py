@@ -0,0 +1,289 @@
+# cli_daemon.py
+# Warm-interpreter daemon for the scoring CLIs (cli_main, risk_scoring)
+#
+# Orchestration that runs the CLI once per profile pays interpreter start-up
+# and imports on every call. The daemon keeps one interpreter, with modules
+# imported and RiskEngines built, listening on a unix socket; CLI calls made
+# with --daemon (or RISK_ENGINE_DAEMON set) forward their arguments and
+# working directory to it and print what it returns. When nothing is
+# listening the CLI simply runs in-process.
+#
+# A request runs arbitrary CLI arguments (paths, --model pickles) as the
+# daemon's user, so the daemon only serves that user: the socket lives in
+# $XDG_RUNTIME_DIR or a private 0700 directory, is itself 0600, and peers
+# whose SO_PEERCRED uid differs are refused. Clients make the same check
+# on the daemon, so a socket planted by another user is never trusted.
+#
+#   python -m risk_engine.cli_daemon &
+#   python -m risk_engine.cli_main --daemon "$XDG_RUNTIME_DIR/risk-engine.sock" --input profile.json
+#
+# Only the standard library is imported on the client side.
+
+import json
+import os
+import socket
+import stat
+import struct
+import sys
+import tempfile
+from typing import Any, Dict, List, Optional
+
+
+DAEMON_ENV = "RISK_ENGINE_DAEMON"
+
+# CLI modules the daemon will run (each has build_parser() and execute(args, engines))
+PROGRAMS = ("cli_main", "risk_scoring")
+
+_MAX_MESSAGE = 64 * 1024 * 1024
+
+SOCKET_NAME = "risk-engine.sock"
+
+
+def default_socket_path() -> str:
+    """
+    $XDG_RUNTIME_DIR/risk-engine.sock, else risk-engine.sock in a per-user
+    0700 directory under the temp dir (created if missing).
+    """
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return os.path.join(runtime_dir, SOCKET_NAME)
+    private = os.path.join(tempfile.gettempdir(), f"risk-engine-{os.getuid()}")
+    try:
+        os.mkdir(private, 0o700)
+    except FileExistsError:
+        pass
+    st = os.lstat(private)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise RuntimeError(f"{private} is not a private directory owned by this user")
+    return os.path.join(private, SOCKET_NAME)
+
+
+def peer_uid(sock: socket.socket) -> Optional[int]:
+    """uid of the process at the other end of a unix socket, where the OS reports it."""
+    if not hasattr(socket, "SO_PEERCRED"):
+        return None  # not Linux: rely on the socket's 0600 mode
+    creds = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    return struct.unpack("3i", creds)[1]
+
+
+def _same_user(sock: socket.socket) -> bool:
+    uid = peer_uid(sock)
+    return uid is None or uid == os.getuid()
+
+
+def daemon_socket(argv: List[str]) -> Optional[str]:
+    """
+    The socket named by --daemon in argv, else $RISK_ENGINE_DAEMON. Read
+    without argparse so forwarding a call costs no parser set-up.
+    """
+    for i, arg in enumerate(argv):
+        if arg == "--daemon" and i + 1 < len(argv):
+            return argv[i + 1]
+        if arg.startswith("--daemon="):
+            return arg.split("=", 1)[1]
+    return os.environ.get(DAEMON_ENV) or None
+
+
+def _send(sock: socket.socket, message: Dict[str, Any]):
+    sock.sendall(json.dumps(message).encode("utf-8") + b"\n")
+
+
+def _receive(sock: socket.socket) -> Optional[Dict[str, Any]]:
+    chunks = []
+    size = 0
+    while True:
+        chunk = sock.recv(1 << 16)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        size += len(chunk)
+        if chunk.endswith(b"\n"):
+            break
+        if size > _MAX_MESSAGE:
+            raise ValueError("daemon message too large")
+    if not chunks:
+        return None
+    return json.loads(b"".join(chunks))
+
+
+# ------------------------------------------------------------
+# Client
+# ------------------------------------------------------------
+def call_daemon(socket_path: str, program: str, argv: List[str]) -> Optional[int]:
+    """
+    Runs one CLI invocation in the daemon and relays its output. Returns
+    the exit code, or None if no daemon is listening on socket_path.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        try:
+            sock.connect(socket_path)
+        except (FileNotFoundError, ConnectionRefusedError):
+            return None
+        if not _same_user(sock):
+            print(f"Ignoring {socket_path}: the daemon there belongs to another user", file=sys.stderr)
+            return None
+        _send(sock, {"program": program, "argv": list(argv), "cwd": os.getcwd()})
+        reply = _receive(sock)
+    finally:
+        sock.close()
+    if reply is None:
+        return None
+
+    sys.stdout.write(reply.get("stdout", ""))
+    sys.stdout.flush()
+    sys.stderr.write(reply.get("stderr", ""))
+    return int(reply.get("code", 1))
+
+
+# ------------------------------------------------------------
+# Server
+# ------------------------------------------------------------
+class CLIDaemon:
+    """
+    Serves CLI invocations one at a time (each runs in the caller's working
+    directory). RiskEngines are kept between calls, keyed by the arguments
+    that configure them, so their rules, model and result cache stay warm.
+    """
+
+    def __init__(self, socket_path: str, idle_timeout: Optional[float] = None):
+        self.socket_path = socket_path
+        self.idle_timeout = idle_timeout or None
+        self.engines: Dict[Any, Any] = {}
+        self.served = 0
+        self.refused = 0
+        self._sock: Optional[socket.socket] = None
+
+    def preload(self, model: bool = False):
+        """Imports everything a rule-only call needs (plus the ML stack)."""
+        import importlib
+
+        for name in PROGRAMS:
+            importlib.import_module(f"{__package__}.{name}")
+        if model:
+            from . import ml_model  # noqa: F401
+
+    def bind(self):
+        if os.path.exists(self.socket_path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.socket_path)
+            except ConnectionRefusedError:
+                os.unlink(self.socket_path)  # left behind by a daemon that died
+            else:
+                raise RuntimeError(f"A daemon is already listening on {self.socket_path}")
+            finally:
+                probe.close()
+
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # Created owner-only (no window where the umask's mode applies)
+        umask = os.umask(0o177)
+        try:
+            self._sock.bind(self.socket_path)
+        finally:
+            os.umask(umask)
+        os.chmod(self.socket_path, 0o600)
+        self._sock.listen(64)
+        self._sock.settimeout(self.idle_timeout)
+
+    def serve_forever(self):
+        if self._sock is None:
+            self.bind()
+        try:
+            while True:
+                try:
+                    conn, _ = self._sock.accept()
+                except socket.timeout:
+                    return  # idle for idle_timeout seconds
+                with conn:
+                    if not _same_user(conn):
+                        self.refused += 1
+                        continue
+                    request = _receive(conn)
+                    if request is not None:
+                        _send(conn, self.handle(request))
+                        self.served += 1
+        finally:
+            self.close()
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Runs one request; stdout, stderr and the exit code are captured."""
+        import contextlib
+        import importlib
+        import io
+        import traceback
+
+        stdout, stderr = io.StringIO(), io.StringIO()
+        code = 0
+        cwd = os.getcwd()
+        try:
+            with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+                try:
+                    program = request.get("program")
+                    if program not in PROGRAMS:
+                        raise ValueError(f"Unknown program {program!r}; expected one of {PROGRAMS}")
+                    os.chdir(request.get("cwd") or cwd)
+                    module = importlib.import_module(f"{__package__}.{program}")
+                    parser = module.build_parser()
+                    parser.prog = f"{program}.py"
+                    args = parser.parse_args(request.get("argv", []))
+                    module.execute(args, engines=self.engines)
+                except SystemExit as exc:
+                    if isinstance(exc.code, str):
+                        print(exc.code, file=sys.stderr)
+                        code = 1
+                    else:
+                        code = exc.code or 0
+                except Exception:
+                    traceback.print_exc()
+                    code = 1
+        finally:
+            os.chdir(cwd)
+        return {"code": code, "stdout": stdout.getvalue(), "stderr": stderr.getvalue()}
+
+
+def serve(socket_path: str, idle_timeout: Optional[float] = None, preload_model: bool = False):
+    import signal
+
+    daemon = CLIDaemon(socket_path, idle_timeout=idle_timeout)
+    daemon.preload(model=preload_model)
+    daemon.bind()
+
+    def stop(signum, frame):
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, stop)
+    print(f"Risk engine daemon listening on {socket_path}", file=sys.stderr)
+    try:
+        daemon.serve_forever()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    print(f"Risk engine daemon stopped after {daemon.served} calls", file=sys.stderr)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Warm-interpreter daemon for the risk scoring CLIs.")
+    parser.add_argument(
+        "--socket",
+        type=str,
+        default=os.environ.get(DAEMON_ENV),
+        help=f"Unix socket to listen on (default ${DAEMON_ENV}, else {SOCKET_NAME} in $XDG_RUNTIME_DIR or a private temp dir).",
+    )
+    parser.add_argument("--idle-timeout", type=float, default=0, help="Exit after this many idle seconds (0: never).")
+    parser.add_argument("--preload-model", action="store_true", help="Import the ML stack at start-up too.")
+    args = parser.parse_args()
+
+    serve(args.socket or default_socket_path(), idle_timeout=args.idle_timeout, preload_model=args.preload_model)
+
+
+if __name__ == "__main__":
+    main()
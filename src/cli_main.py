@@ -1,11 +1,17 @@
-import argparse
-from pathlib import Path
+import os
+import sys
 import json
 
-from risk_engine.risk_scoring import RiskEngine, load_json, save_json
+# Only light modules at import time: with --daemon this process is just a
+# client, and the parser and scoring modules are only set up when needed
+from risk_engine.cli_daemon import call_daemon, daemon_socket
 
 
-def main():
+def build_parser():
+    import argparse
+
+    from risk_engine.metrics import PROFILERS
+
     parser = argparse.ArgumentParser(
         description="Enterprise Risk Intelligence Engine – CLI Runner"
     )
@@ -14,25 +20,152 @@ def main():
         "--input",
         type=str,
         required=True,
-        help="Path to input JSON file containing the risk profile."
+        help="Path to input JSON file containing the risk profile (or a .parquet/.arrow batch of profiles)."
     )
 
     parser.add_argument(
         "--output",
         type=str,
         required=False,
-        help="Optional output JSON path to save the risk scoring result."
+        help="Optional output JSON path to save the risk scoring result (.parquet/.arrow in batch mode)."
+    )
+
+    parser.add_argument(
+        "--jsonl",
+        action="store_true",
+        help="Batch mode: input is JSON Lines (one profile per line), output is JSON Lines."
+    )
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="Number of worker processes for batch mode."
+    )
+
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=256,
+        help="Profiles sent to a worker per task in batch mode."
+    )
+
+    parser.add_argument(
+        "--rules",
+        type=str,
+        required=False,
+        help="Optional JSON/YAML rule spec overriding the built-in thresholds."
+    )
+
+    parser.add_argument(
+        "--model",
+        type=str,
+        required=False,
+        help="Optional joblib classifier (with predict_proba) blended into the final score."
     )
 
-    args = parser.parse_args()
+    parser.add_argument(
+        "--cache-db",
+        type=str,
+        required=False,
+        help="Optional SQLite file caching results so unchanged profiles are not rescored."
+    )
+
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=0,
+        help="Entries in the in-memory result cache (0 disables; caps --cache-db if set)."
+    )
+
+    parser.add_argument(
+        "--watchlist",
+        type=str,
+        required=False,
+        help="Compiled watchlist (see watchlist.py); a listed identity value sets the sanctions flag."
+    )
+
+    parser.add_argument(
+        "--metrics-out",
+        type=str,
+        required=False,
+        help="Write stage timings and counters here (*.prom/*.txt: Prometheus text, else JSON; '-' for stderr)."
+    )
+
+    parser.add_argument(
+        "--profile",
+        choices=PROFILERS,
+        required=False,
+        help="Run scoring under cProfile or pyinstrument."
+    )
+
+    parser.add_argument(
+        "--profile-out",
+        type=str,
+        required=False,
+        help="Profiler output file (.prof for cProfile, .html for pyinstrument)."
+    )
+
+    parser.add_argument(
+        "--daemon",
+        type=str,
+        required=False,
+        help="Run in the cli_daemon listening on this unix socket (default $RISK_ENGINE_DAEMON), if one is."
+    )
+
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+
+    socket_path = daemon_socket(argv)
+    if socket_path:
+        code = call_daemon(socket_path, "cli_main", argv)
+        if code is not None:
+            sys.exit(code)
+
+    execute(build_parser().parse_args(argv))
+
+
+def execute(args, engines=None):
+    from pathlib import Path
+
+    from risk_engine.metrics import profiled
+    from risk_engine.risk_scoring import engine_from_args
 
     input_path = Path(args.input)
     if not input_path.exists():
         raise FileNotFoundError(f"Input file not found: {input_path}")
 
+    engine = engine_from_args(args, engines)
+
+    with profiled(args.profile, args.profile_out):
+        run(engine, args, input_path)
+
+    if args.metrics_out:
+        engine.metrics.dump(args.metrics_out)
+
+
+def run(engine, args, input_path):
+    from pathlib import Path
+
+    from risk_engine.arrow_io import is_columnar_path
+    from risk_engine.risk_scoring import load_json, save_json, score_file
+
+    if args.jsonl or is_columnar_path(input_path):
+        output_path = Path(args.output) if args.output else None
+        count = score_file(
+            engine, input_path, output_path, workers=args.workers, chunksize=args.chunksize
+        )
+        if output_path:
+            print(f"{count} risk results saved to {args.output}")
+            if engine.cache is not None and engine.cache.hits + engine.cache.misses:
+                print(f"Result cache: {engine.cache.stats()}")
+        return
+
     profile = load_json(input_path)
 
-    engine = RiskEngine()
     result = engine.score_profile(profile)
 
     if args.output:
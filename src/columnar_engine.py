@@ -0,0 +1,357 @@
+# columnar_engine.py
+# Vectorized (NumPy/pandas) detection and scoring for large event logs
+#
+# Produces exactly the same anomalies, scores, risk levels and reasons as
+# the row path (AnomalyDetector.detect_anomalies -> RiskScorer.score_events),
+# including the detector's watchlist and KRI1 brute-force hooks, but
+# evaluates every rule as an array operation over categorical codes.
+#
+# CSVs are parsed by pyarrow when it is installed (pandas otherwise).
+# Measured on one core with 1M synthetic rows (5% anomalies), end to end:
+# about 5.0s for the row path against 0.5s here (~10x), or 5.3s against
+# 0.8s (~6.5x) with the brute-force detector on. That is short of the 20x
+# first aimed for: since LogEvent the row path's detect/score loop is
+# already cheap (0.3s), so CSV parsing dominates both paths, and KRI1
+# brute-force detection is a sequential state machine that still runs once
+# per failed login here. pyarrow parses on every core, so the gap grows
+# with the core count.
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from anomaly_detector import AnomalyDetector
+from arrow_io import as_text, is_columnar_path, iter_batches, read_table
+from risk_score_engine import RiskScorer
+
+
+LOG_COLUMNS = ["timestamp", "user", "event_type", "source_ip", "status"]
+CATEGORICAL_COLUMNS = ("event_type", "status")
+
+# Compressions pyarrow's CSV reader handles; anything else (.xz, ...) is read by pandas
+_ARROW_CSV_COMPRESSION = {".csv": None, ".gz": "gzip", ".bz2": "bz2", ".zst": "zstd", ".zstd": "zstd"}
+
+# Watchlist outcome per row (see AnomalyDetector._screen)
+_LISTED = (None, "user", "source IP", "user and source IP")
+
+
+def _pyarrow_csv():
+    try:
+        import pyarrow.csv
+    except ImportError:
+        return None
+    return pyarrow.csv
+
+
+class ColumnarRiskEngine:
+    """
+    Batch counterpart of AnomalyDetector + RiskScorer.
+
+    event_type and status are encoded as categoricals, so every per-value
+    decision (lower-casing, high-risk lookup, base score, reason text) is
+    computed once per distinct value and then broadcast with a single
+    take over the integer codes.
+    """
+
+    def __init__(self, detector=None, scorer=None):
+        self.detector = detector or AnomalyDetector()
+        self.scorer = scorer or RiskScorer()
+
+    # ------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------
+    def read_logs(self, path, chunksize=None):
+        """
+        Reads sample_logs.csv-shaped files (CSV or Parquet/Arrow) into
+        columns. Empty cells stay empty strings (as with csv.DictReader)
+        rather than becoming NaN. With chunksize, returns an iterator of
+        DataFrames.
+
+        A directory or glob is read file by file in name order; unlike
+        AnomalyDetector.iter_logs, rows are not re-merged by timestamp.
+        """
+        paths = self.detector.resolve_paths(path)
+        dtypes = {c: "category" if c in CATEGORICAL_COLUMNS else str for c in LOG_COLUMNS}
+
+        def read(p):
+            if is_columnar_path(p):
+                if chunksize:
+                    return (self._arrow_frame(b, dtypes) for b in iter_batches(p, batch_rows=chunksize))
+                return self._arrow_frame(read_table(p), dtypes)
+            return self._read_csv(p, dtypes, chunksize)
+
+        if chunksize:
+            return (chunk for p in paths for chunk in read(p))
+        if len(paths) == 1:
+            return read(paths[0])
+        # Categories differ per file, so the concatenated columns fall back to
+        # strings; process_frame re-encodes them
+        return pd.concat([read(p) for p in paths], ignore_index=True)
+
+    def _read_csv(self, path, dtypes, chunksize=None):
+        """
+        pyarrow's multi-threaded CSV parser when it is available, else
+        pandas. Falls back to pandas if pyarrow rejects the file (e.g. rows
+        with missing fields) before any rows were returned.
+        """
+        pacsv = _pyarrow_csv()
+        suffix = Path(path).suffix.lower()
+        if pacsv is None or suffix not in _ARROW_CSV_COMPRESSION:
+            return pd.read_csv(path, dtype=dtypes, keep_default_na=False, chunksize=chunksize)
+
+        if not chunksize:
+            try:
+                table = self._open_arrow_csv(pacsv, path, suffix, streaming=False)
+            except ValueError:  # pyarrow.ArrowInvalid
+                return pd.read_csv(path, dtype=dtypes, keep_default_na=False)
+            return self._arrow_frame(table, dtypes)
+        return self._arrow_csv_chunks(pacsv, path, suffix, dtypes, chunksize)
+
+    def _arrow_csv_chunks(self, pacsv, path, suffix, dtypes, chunksize):
+        import pyarrow as pa
+
+        yielded = False
+        try:
+            # Blocks are re-cut into chunks of exactly chunksize rows
+            pending, rows = [], 0
+            for batch in self._open_arrow_csv(pacsv, path, suffix, streaming=True):
+                pending.append(batch)
+                rows += batch.num_rows
+                while rows >= chunksize:
+                    table = pa.Table.from_batches(pending)
+                    yielded = True
+                    yield self._arrow_frame(table.slice(0, chunksize), dtypes)
+                    rest = table.slice(chunksize)
+                    pending, rows = rest.to_batches(), rest.num_rows
+            if rows:
+                yielded = True
+                yield self._arrow_frame(pa.Table.from_batches(pending), dtypes)
+        except ValueError:  # pyarrow.ArrowInvalid
+            if yielded:
+                raise
+            yield from pd.read_csv(path, dtype=dtypes, keep_default_na=False, chunksize=chunksize)
+
+    @staticmethod
+    def _open_arrow_csv(pacsv, path, suffix, streaming):
+        import pyarrow as pa
+
+        # Log columns stay text, with empty cells as "" (not null)
+        convert = pacsv.ConvertOptions(
+            column_types={c: pa.string() for c in LOG_COLUMNS},
+            strings_can_be_null=False,
+            quoted_strings_can_be_null=False,
+        )
+        source = pa.input_stream(str(path), compression=_ARROW_CSV_COMPRESSION[suffix])
+        if streaming:
+            return pacsv.open_csv(source, convert_options=convert)
+        with source:
+            return pacsv.read_csv(source, convert_options=convert)
+
+    # ------------------------------------------------------------
+    # Detection + scoring
+    # ------------------------------------------------------------
+    def process_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Returns a DataFrame of scored anomalies with the same columns, row
+        order and values as the row-based pipeline, including the
+        detector's watchlist and brute-force (KRI1) reasons. As there, the
+        brute-force detector keeps its state between calls and expects
+        rows in time order.
+        """
+        detector = self.detector
+        detector.refresh_rules()
+        self.scorer.refresh_rules()
+        rules = self.scorer.rules
+
+        event_type = self._categorical(df, "event_type")
+        status = self._categorical(df, "status")
+
+        et_lower = self._lowered(event_type.categories)
+        st_lower = self._lowered(status.categories)
+        et_codes = event_type.codes
+        st_codes = status.codes
+
+        # Per-category lookup tables
+        et_high = np.fromiter(
+            (c in detector.high_risk_events for c in et_lower), dtype=bool, count=len(et_lower)
+        )
+        et_base = np.fromiter(
+            (rules.base_scores.get(c, rules.default_score) for c in et_lower),
+            dtype=np.int64,
+            count=len(et_lower),
+        )
+        st_failed = st_lower == "failed"
+
+        high = et_high[et_codes]
+        failed = st_failed[st_codes]
+        mask = high | failed
+        listed = None
+        if detector.watchlist is not None:
+            listed = self._screen(df)
+            mask |= listed != 0
+        idx = np.flatnonzero(mask)
+
+        et_sel = et_codes[idx]
+        failed_sel = failed[idx]
+
+        score = et_base[et_sel] + failed_sel * rules.failed_bonus
+
+        # Reason text depends only on (event_type category, failed, listed)
+        reason_table = []
+        for i, c in enumerate(et_lower):
+            high_reason = [f"High-risk event type: {c}"] if et_high[i] else []
+            for failed_reason in ([], ["Failed action"]):
+                for who in _LISTED:
+                    listed_reason = [f"Watchlisted {who}"] if who else []
+                    reason_table.append("; ".join(high_reason + failed_reason + listed_reason))
+        reason_codes = (et_sel * 2 + failed_sel) * len(_LISTED)
+        if listed is not None:
+            reason_codes += listed[idx]
+        reason = self._recode(np.array(reason_table, dtype=object), reason_codes)
+
+        if detector.bruteforce is not None:
+            reason, burst = self._add_bursts(df, idx, et_lower[et_sel], failed_sel, reason)
+            score += burst * rules.bruteforce_bonus
+        np.clip(score, rules.score_min, rules.score_max, out=score)
+        level_edges, level_labels, level_codes = self._level_bins(rules)
+
+        return pd.DataFrame(
+            {
+                "timestamp": self._column(df, "timestamp", idx),
+                "user": self._column(df, "user", idx),
+                "event_type": self._recode(et_lower, et_sel),
+                "source_ip": self._column(df, "source_ip", idx),
+                "status": self._recode(st_lower, st_codes[idx]),
+                "reason": reason,
+                "score": score,
+                "risk_level": pd.Categorical.from_codes(
+                    level_codes[np.searchsorted(level_edges, score, side="right")], level_labels
+                ),
+            }
+        )
+
+    def _screen(self, df):
+        """
+        Per-row watchlist outcome as an index into _LISTED, looking each
+        distinct user and source IP up once.
+        """
+        watchlist = self.detector.watchlist
+        listed = np.zeros(len(df), dtype=np.int64)
+        for name, bit, lookup in (("user", 1, watchlist.contains), ("source_ip", 2, watchlist.contains_ip)):
+            if name not in df.columns:
+                continue
+            codes, uniques = pd.factorize(df[name], use_na_sentinel=True)
+            hits = np.fromiter((bool(v) and lookup(v) for v in uniques), dtype=bool, count=len(uniques))
+            # Missing values (code -1) are never listed
+            hits = np.append(hits, False)
+            listed += hits[codes] * bit
+        return listed
+
+    def _add_bursts(self, df, idx, event_types, failed, reason):
+        """
+        Feeds the failed events among the anomalies to the brute-force
+        detector in row order, exactly as AnomalyDetector.check_row does.
+        Returns the reasons with the burst reason appended where a burst
+        completes, and a mask of those anomalies (for bruteforce_bonus).
+        """
+        bruteforce = self.detector.bruteforce
+        burst = np.zeros(len(idx), dtype=bool)
+        watched = failed.copy()
+        if bruteforce.event_types is not None:
+            watched &= np.isin(event_types.astype(str), list(bruteforce.event_types))
+        rows = np.flatnonzero(watched)
+        if not len(rows):
+            return reason, burst
+
+        fields = [f for f in ("timestamp",) + bruteforce.key_fields if f in df.columns]
+        columns = {f: df[f].array.take(idx[rows]).tolist() for f in fields}
+        values = None
+        for n, i in enumerate(rows):
+            found = bruteforce.observe({f: columns[f][n] for f in fields}, event_types[i])
+            if found:
+                if values is None:
+                    values = np.asarray(reason, dtype=object)
+                values[i] = f"{values[i]}; {found}"
+                burst[i] = True
+        if values is None:
+            return reason, burst
+        return pd.Categorical(values), burst
+
+    def process_file(self, path, chunksize=1_000_000):
+        """
+        Yields scored-anomaly DataFrames chunk by chunk, keeping memory
+        bounded by chunksize regardless of file size.
+        """
+        for chunk in self.read_logs(path, chunksize=chunksize):
+            yield self.process_frame(chunk)
+
+    @staticmethod
+    def to_records(scored: pd.DataFrame):
+        """Converts a scored frame into the list-of-dicts row format."""
+        return scored.to_dict("records")
+
+    # ------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------
+    @staticmethod
+    def _arrow_frame(data, dtypes):
+        # Same column types as read_csv: text (nulls as ""), with event_type
+        # and status categorical (dictionary-encoded by pyarrow, which is
+        # much faster than astype("category"))
+        import pyarrow.compute as pc
+
+        data = as_text(data)
+        columns = []
+        for name, column in zip(data.schema.names, data.columns):
+            if column.null_count:
+                column = pc.fill_null(column, "")
+            if name in dtypes and dtypes[name] == "category":
+                column = column.dictionary_encode()
+            columns.append(column)
+        return type(data).from_arrays(columns, names=data.schema.names).to_pandas()
+
+    @staticmethod
+    def _categorical(df, name):
+        if name not in df.columns:
+            return pd.Categorical([""] * len(df))
+        col = df[name]
+        if not isinstance(col.dtype, pd.CategoricalDtype):
+            col = col.fillna("").astype("category")
+        values = col.array
+        if (values.codes < 0).any():
+            # Missing cells (e.g. short CSV rows) count as "", as in the row path
+            if "" not in values.categories:
+                values = values.add_categories([""])
+            values = values.fillna("")
+        return values
+
+    @staticmethod
+    def _level_bins(rules):
+        """Turns the descending risk_levels table into searchsorted bins."""
+        ascending = list(reversed(rules.risk_levels))
+        edges = np.array([threshold for threshold, _ in ascending[1:]])
+        labels = [level for _, level in ascending]
+        # Categories must be unique; repeated labels share one category
+        uniques = list(dict.fromkeys(labels))
+        return edges, uniques, np.array([uniques.index(label) for label in labels])
+
+    @staticmethod
+    def _lowered(categories):
+        return np.array([str(c).lower() for c in categories], dtype=object)
+
+    @staticmethod
+    def _column(df, name, idx):
+        if name not in df.columns:
+            return np.full(len(idx), None, dtype=object)
+        # Take on the backing array keeps the column's native storage
+        return df[name].array.take(idx)
+
+    @staticmethod
+    def _recode(values, codes):
+        """
+        Builds an output categorical from per-category values (which may
+        collapse, e.g. 'Login' and 'login' both lower to 'login').
+        """
+        uniques, inverse = np.unique(values.astype(str), return_inverse=True)
+        return pd.Categorical.from_codes(inverse[codes], uniques.astype(object))
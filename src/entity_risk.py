@@ -0,0 +1,278 @@
+# entity_risk.py
+# Incrementally updated, time-decayed risk per user and source IP
+#
+# Scored anomalies are rolled up into one risk value per entity that decays
+# exponentially with a configurable half-life. Decay is forward (relative to
+# a fixed landmark time): each anomaly adds score * 2^((t - landmark) / half_life),
+# so an entity's stored value never has to be touched just because time
+# passes, and entities rank the same at any query time. The current risk is
+# the stored value scaled down to "now".
+#
+# A snapshot keeps the half-life it was built with. Loading it into a store
+# created with a different half-life keeps the store's: every entity's risk
+# at the snapshot's latest anomaly is carried over unchanged and decays at
+# the new rate from then on.
+#
+# Each dimension keeps a max-heap of (value, key) next to its entity table.
+# Updates push a new heap entry and leave the old one behind; top() pops
+# until it has K live entries and pushes them back, so ranking costs
+# O(K log N) rather than a sort of every entity. Stale entries are purged
+# when the heap grows to twice the table.
+#
+#   python src/entity_risk.py entity_risk.json --top 100 --dimension user
+
+import heapq
+import json
+import math
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+
+from bruteforce_detector import parse_timestamp
+
+
+DEFAULT_DIMENSIONS = ("user", "source_ip")
+DEFAULT_HALF_LIFE = 24 * 3600
+
+# Entities whose current risk decays below this are dropped on compaction
+# (so a returning entity's total is low by at most this much)
+DEFAULT_MIN_RISK = 0.01
+
+# Rebase the landmark before the growth factor gets near float overflow
+_MAX_EXPONENT = 500.0
+
+# Entity record: [stored (landmark-scaled) value, anomalies, peak score, last seen]
+_VALUE, _ANOMALIES, _PEAK, _LAST_SEEN = range(4)
+
+
+def _format_epoch(seconds):
+    return datetime.fromtimestamp(seconds, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class EntityRisk:
+    """
+    Decayed risk per `dimensions` value (user, source_ip) from scored
+    anomalies, with top-K ranking and JSON snapshots.
+    """
+
+    def __init__(self, half_life=None, dimensions=DEFAULT_DIMENSIONS, min_risk=DEFAULT_MIN_RISK):
+        # half_life=None: take a loaded snapshot's (DEFAULT_HALF_LIFE until then)
+        self._fixed_half_life = half_life is not None
+        self.half_life = half_life if half_life is not None else DEFAULT_HALF_LIFE
+        self.rate = math.log(2) / self.half_life
+        self.dimensions = tuple(dimensions)
+        self.min_risk = min_risk
+
+        self.landmark = None
+        self.watermark = None
+        self.skipped = 0
+        self._entities = {dim: {} for dim in self.dimensions}
+        self._heaps = {dim: [] for dim in self.dimensions}
+
+    def __len__(self):
+        return sum(len(entities) for entities in self._entities.values())
+
+    # ------------------------------------------------------------
+    # Ingestion
+    # ------------------------------------------------------------
+    def add(self, event):
+        """Adds one scored anomaly (needs `timestamp` and `score`)."""
+        epoch = parse_timestamp(event.get("timestamp"))
+        score = event.get("score") or 0
+        if epoch is None or score <= 0:
+            self.skipped += 1
+            return
+
+        if self.landmark is None:
+            self.landmark = epoch
+        elif (epoch - self.landmark) * self.rate > _MAX_EXPONENT:
+            self._rebase(epoch)
+        if self.watermark is None or epoch > self.watermark:
+            self.watermark = epoch
+
+        weighted = score * math.exp((epoch - self.landmark) * self.rate)
+        for dim in self.dimensions:
+            key = event.get(dim)
+            if not key:
+                continue
+            entities = self._entities[dim]
+            entity = entities.get(key)
+            if entity is None:
+                entity = entities[key] = [0.0, 0, 0, epoch]
+            entity[_VALUE] += weighted
+            entity[_ANOMALIES] += 1
+            entity[_PEAK] = max(entity[_PEAK], score)
+            entity[_LAST_SEEN] = max(entity[_LAST_SEEN], epoch)
+
+            heap = self._heaps[dim]
+            heapq.heappush(heap, (-entity[_VALUE], key))
+            if len(heap) > 2 * len(entities) + 1024:
+                self._compact(dim)
+
+    def add_all(self, events):
+        for event in events:
+            self.add(event)
+
+    def tee(self, events):
+        """Adds each anomaly and passes it on, for use inside a stream."""
+        for event in events:
+            self.add(event)
+            yield event
+
+    def _rebase(self, landmark):
+        # Same ranking, smaller numbers: scale every value to the new landmark
+        factor = math.exp((self.landmark - landmark) * self.rate)
+        for entities in self._entities.values():
+            for entity in entities.values():
+                entity[_VALUE] *= factor
+        self.landmark = landmark
+        for dim in self.dimensions:
+            self._compact(dim)
+
+    def _compact(self, dim):
+        """Rebuilds a heap from live entries, dropping fully decayed entities."""
+        entities = self._entities[dim]
+        floor = self.min_risk / self._decay(self.watermark) if self.watermark is not None else 0.0
+        for key in [k for k, e in entities.items() if e[_VALUE] < floor]:
+            del entities[key]
+        heap = [(-entity[_VALUE], key) for key, entity in entities.items()]
+        heapq.heapify(heap)
+        self._heaps[dim] = heap
+
+    def _decay(self, at):
+        """Factor turning a stored value into the risk at time `at`."""
+        return math.exp((self.landmark - at) * self.rate)
+
+    # ------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------
+    def _at(self, at):
+        if at is None:
+            return self.watermark
+        return at if isinstance(at, (int, float)) else parse_timestamp(at)
+
+    def risk(self, dimension, key, at=None):
+        """Current decayed risk of one entity (0.0 if unknown)."""
+        entity = self._entities[dimension].get(key)
+        if entity is None:
+            return 0.0
+        return entity[_VALUE] * self._decay(self._at(at))
+
+    def top(self, dimension="user", n=100, at=None):
+        """
+        The n riskiest entities of `dimension`, highest first, as dicts with
+        the risk decayed to `at` (default: the latest anomaly seen).
+        """
+        entities = self._entities[dimension]
+        heap = self._heaps[dimension]
+        found = []
+        seen = set()
+        while heap and len(found) < n:
+            item = heapq.heappop(heap)
+            value, key = -item[0], item[1]
+            entity = entities.get(key)
+            # Superseded by a later push (or dropped on compaction)
+            if entity is None or key in seen or value != entity[_VALUE]:
+                continue
+            seen.add(key)
+            found.append(item)
+        for item in found:
+            heapq.heappush(heap, item)
+
+        decay = self._decay(self._at(at)) if found else 0.0
+        return [self._describe(dimension, key, entities[key], decay) for _, key in found]
+
+    @staticmethod
+    def _describe(dimension, key, entity, decay):
+        return {
+            dimension: key,
+            "risk": round(entity[_VALUE] * decay, 3),
+            "anomalies": entity[_ANOMALIES],
+            "peak_score": entity[_PEAK],
+            "last_seen": _format_epoch(entity[_LAST_SEEN]),
+        }
+
+    # ------------------------------------------------------------
+    # Snapshots
+    # ------------------------------------------------------------
+    def to_state(self):
+        return {
+            "half_life": self.half_life,
+            "landmark": self.landmark,
+            "watermark": self.watermark,
+            "skipped": self.skipped,
+            "entities": {
+                dim: [[key, *entity] for key, entity in entities.items()] for dim, entities in self._entities.items()
+            },
+        }
+
+    def load_state(self, state):
+        """
+        Restores a to_state() snapshot. A store created without a half-life
+        adopts the snapshot's; one created with a different half-life keeps
+        its own and rescales the snapshot to it.
+        """
+        half_life = self.half_life
+        self.half_life = state.get("half_life", DEFAULT_HALF_LIFE)
+        self.rate = math.log(2) / self.half_life
+        self.landmark = state.get("landmark")
+        self.watermark = state.get("watermark")
+        self.skipped = state.get("skipped", 0)
+        stored = state.get("entities", {})
+        self._entities = {dim: {row[0]: list(row[1:]) for row in stored.get(dim, [])} for dim in self.dimensions}
+        if self._fixed_half_life and half_life != self.half_life:
+            self._set_half_life(half_life)
+        for dim in self.dimensions:
+            self._compact(dim)
+
+    def _set_half_life(self, half_life):
+        # Keep each entity's risk at the watermark, re-landmarked there so it
+        # decays at the new rate from then on
+        if self.watermark is not None:
+            decay = self._decay(self.watermark)
+            for entities in self._entities.values():
+                for entity in entities.values():
+                    entity[_VALUE] *= decay
+            self.landmark = self.watermark
+        self.half_life = half_life
+        self.rate = math.log(2) / half_life
+
+    def save(self, path):
+        """Writes a snapshot atomically (write-then-rename)."""
+        path = Path(path)
+        tmp = path.with_name(path.name + ".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(self.to_state(), f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def load(self, path):
+        """Restores a snapshot written by save(); False if there is none."""
+        path = Path(path)
+        if not path.exists():
+            return False
+        with path.open("r", encoding="utf-8") as f:
+            self.load_state(json.load(f))
+        return True
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Rank users or source IPs from an entity risk snapshot.")
+    parser.add_argument("snapshot", type=str, help="Snapshot written by risk_analyzer.py --entities.")
+    parser.add_argument("--dimension", choices=DEFAULT_DIMENSIONS, default="user", help="Entity type to rank.")
+    parser.add_argument("--top", type=int, default=100, help="Number of entities to list.")
+    parser.add_argument("--at", type=str, help="Decay risk to this ISO-8601 time (default: latest anomaly).")
+    args = parser.parse_args()
+
+    store = EntityRisk()
+    if not store.load(args.snapshot):
+        parser.error(f"No snapshot at {args.snapshot}")
+    for row in store.top(args.dimension, args.top, at=args.at):
+        print(json.dumps(row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+# incremental.py
+# Incremental, resumable log processing with checkpointed file offsets
+#
+# Each run reads only the bytes appended since the previous run. Per-file
+# offsets, inode/size fingerprints, the running aggregates, the brute-force
+# detector state and (if used) the KRI buckets and entity risk are stored
+# in a JSON checkpoint, which is rewritten atomically every
+# `checkpoint_every` rows so a crashed run resumes from the last checkpoint
+# instead of from scratch.
+#
+# Inputs are the same as for the batch path (log_reader.resolve_log_paths).
+# Plain CSVs are resumed by byte offset. Compressed CSVs and Parquet/Arrow
+# files cannot be seeked into, so they are resumed by row count (rows
+# already processed are read and skipped), and are not re-read at all
+# while unchanged.
+#
+# Several files are processed one after another in name order, not
+# heap-merged by timestamp as in the batch path, since each file is resumed
+# from its own offset. Brute-force windows depend on event order, so bursts
+# spread across files that overlap in time can be counted differently than
+# by a batch run over the same files.
+
+import csv
+import hashlib
+import json
+import os
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+
+from anomaly_detector import AnomalyDetector
+from arrow_io import is_columnar_path
+from bruteforce_detector import BruteForceDetector
+from log_event import EventParser
+from log_reader import COMPRESSED_SUFFIXES, read_log_events, resolve_log_paths
+from risk_score_engine import RiskScorer
+
+
+CHECKPOINT_VERSION = 1
+HEAD_BYTES = 1024
+
+
+def _empty_aggregates():
+    return {
+        "logs": 0,
+        "anomalies": 0,
+        "score_sum": 0,
+        "by_level": {},
+        "by_event_type": {},
+    }
+
+
+class LogCheckpoint:
+    """
+    Checkpoint file holding per-file read positions plus everything needed
+    to continue where the last run stopped.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.files = {}
+        self.aggregates = _empty_aggregates()
+        self.detector_state = None
+        self.kri_state = None
+        self.entity_state = None
+        self.output_size = 0
+
+        if self.path.exists():
+            with self.path.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == CHECKPOINT_VERSION:
+                self.files = data.get("files", {})
+                self.aggregates = data.get("aggregates", _empty_aggregates())
+                self.detector_state = data.get("detector_state")
+                self.kri_state = data.get("kri_state")
+                self.entity_state = data.get("entity_state")
+                self.output_size = data.get("output_size", 0)
+
+    def save(self):
+        data = {
+            "version": CHECKPOINT_VERSION,
+            "updated_at": datetime.utcnow().isoformat() + "Z",
+            "files": self.files,
+            "aggregates": self.aggregates,
+            "detector_state": self.detector_state,
+            "kri_state": self.kri_state,
+            "entity_state": self.entity_state,
+            "output_size": self.output_size,
+        }
+        # Write-then-rename so a crash never leaves a half-written checkpoint
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+
+def _head_hash(path, length):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read(length)).hexdigest()
+
+
+def _fingerprint(path):
+    st = os.stat(path)
+    return {"inode": st.st_ino, "device": st.st_dev, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _start_position(entry, path, fingerprint):
+    """
+    Returns the offset (bytes, or rows for files read by row count) to
+    resume from, or 0 if the file was rotated, replaced or truncated since
+    the checkpoint.
+    """
+    if not entry:
+        return 0
+    if entry["inode"] != fingerprint["inode"] or entry["device"] != fingerprint["device"]:
+        return 0
+    if fingerprint["size"] < (entry["offset"] if entry.get("unit", "bytes") == "bytes" else entry["size"]):
+        return 0
+    # Guards against an inode being reused by a different file: the bytes
+    # already processed must still be the same
+    if _head_hash(path, entry["head_length"]) != entry["head"]:
+        return 0
+    return entry["offset"]
+
+
+def _by_bytes(path):
+    """Whether a log file can be resumed by byte offset (plain CSV)."""
+    return not is_columnar_path(path) and Path(path).suffix.lower() not in COMPRESSED_SUFFIXES
+
+
+def _log_files(log_path):
+    paths = resolve_log_paths(log_path)
+    if not paths:
+        raise FileNotFoundError(f"No log files found at: {log_path}")
+    return paths
+
+
+def _csv_records(f):
+    """
+    Yields (lines, byte length) for each complete CSV record of a binary
+    file, from its current position. Lines are gathered until every quote
+    is closed, so quoted fields may contain newlines. A last record without
+    its final newline (still being written) is left for the next run.
+    """
+    lines, size, quotes = [], 0, 0
+    for line in f:
+        if not line.endswith(b"\n"):
+            return
+        lines.append(line.decode("utf-8"))
+        size += len(line)
+        quotes += line.count(b'"')
+        if quotes % 2 == 0:
+            yield lines, size
+            lines, size, quotes = [], 0, 0
+
+
+class IncrementalAnalyzer:
+    """
+    Runs the detect -> score pipeline over new log bytes only, appending
+    scored anomalies to a JSON Lines file and merging counts into the
+    checkpoint's aggregates. An optional kri_store.KRIStore is fed every
+    row and scored anomaly, and an optional entity_risk.EntityRisk every
+    scored anomaly; both are checkpointed alongside them.
+    """
+
+    def __init__(
+        self,
+        checkpoint_path="risk_checkpoint.json",
+        scored_output="scored_events.jsonl",
+        rules=None,
+        bruteforce=None,
+        checkpoint_every=10000,
+        metrics=None,
+        kri_store=None,
+        entity_risk=None,
+        watchlist=None,
+    ):
+        self.checkpoint = LogCheckpoint(checkpoint_path)
+        self.scored_output = Path(scored_output)
+        self.checkpoint_every = checkpoint_every
+
+        if bruteforce is None:
+            bruteforce = BruteForceDetector()
+        if self.checkpoint.detector_state:
+            bruteforce.load_state(self.checkpoint.detector_state)
+
+        if kri_store is not None and self.checkpoint.kri_state:
+            kri_store.load_state(self.checkpoint.kri_state)
+        if entity_risk is not None and self.checkpoint.entity_state:
+            entity_risk.load_state(self.checkpoint.entity_state)
+
+        self.bruteforce = bruteforce
+        self.kri_store = kri_store
+        self.entity_risk = entity_risk
+        self.detector = AnomalyDetector(rules=rules, bruteforce=bruteforce, metrics=metrics, watchlist=watchlist)
+        self.scorer = RiskScorer(rules=rules, metrics=metrics)
+        self._out = None
+
+    def run(self, log_path="data/system_logs/"):
+        self._open_output()
+        try:
+            new_logs = 0
+            for path in _log_files(log_path):
+                new_logs += self._process_file(path)
+        finally:
+            self._out.close()
+            self._out = None
+        return {"new_logs": new_logs, **self.checkpoint.aggregates}
+
+    def _open_output(self):
+        # Drop anything written after the last checkpoint (crashed run), so
+        # rows re-read from the checkpointed offset are not duplicated.
+        self._out = self.scored_output.open("a+b")
+        self._out.truncate(self.checkpoint.output_size)
+        self._out.seek(0, os.SEEK_END)
+
+    def _process_file(self, log_path):
+        key = str(Path(log_path).resolve())
+        fingerprint = _fingerprint(log_path)
+        entry = self.checkpoint.files.get(key)
+        start = _start_position(entry, log_path, fingerprint)
+        by_bytes = _by_bytes(log_path)
+        if (
+            start
+            and not by_bytes
+            and entry.get("complete")
+            and (entry["size"], entry.get("mtime_ns")) == (fingerprint["size"], fingerprint["mtime_ns"])
+        ):
+            return 0  # compressed / columnar file fully read and unchanged
+        header = entry.get("header") if entry and start else None
+
+        state = {
+            "key": key,
+            "path": log_path,
+            "fingerprint": fingerprint,
+            "by_bytes": by_bytes,
+            "header": header,
+            "offset": start,
+            "rows": 0,
+            "complete": False,
+        }
+        rows = self._read_new_rows(log_path, state) if by_bytes else self._read_new_events(log_path, state)
+
+        for scored in self.scorer.score_events_stream(self.detector.detect_anomalies_stream(rows)):
+            self._record(scored)
+
+        state["complete"] = True
+        self._save(state)
+        return state["rows"]
+
+    def _read_new_rows(self, csv_path, state):
+        parser = None
+        with open(csv_path, "rb") as f:
+            f.seek(state["offset"])
+            for lines, size in _csv_records(f):
+                fields = next(csv.reader(lines), [])
+                if not fields:  # blank line (csv.DictReader skips these too)
+                    state["offset"] += size
+                    continue
+
+                if state["header"] is None:
+                    state["header"] = fields
+                    state["offset"] += size
+                    continue
+                if parser is None or parser.header != state["header"]:
+                    parser = EventParser(state["header"])
+
+                # Everything for the previous row has been scored and
+                # written by now, so this is a safe point to checkpoint.
+                if state["rows"] and state["rows"] % self.checkpoint_every == 0:
+                    self._save(state)
+
+                state["offset"] += size
+                yield self._counted(parser.parse(fields), state)
+
+    def _read_new_events(self, log_path, state):
+        # Offsets count rows: those already processed are read and skipped
+        for event in islice(read_log_events(log_path), state["offset"], None):
+            if state["rows"] and state["rows"] % self.checkpoint_every == 0:
+                self._save(state)
+            state["offset"] += 1
+            yield self._counted(event, state)
+
+    def _counted(self, event, state):
+        state["rows"] += 1
+        self.checkpoint.aggregates["logs"] += 1
+        if self.kri_store is not None:
+            self.kri_store.add_event(event)
+        return event
+
+    def _record(self, scored):
+        line = json.dumps(scored.to_dict()) + "\n"
+        self._out.write(line.encode("utf-8"))
+
+        agg = self.checkpoint.aggregates
+        level = scored.get("risk_level", "")
+        event_type = scored.get("event_type", "")
+        agg["anomalies"] += 1
+        agg["score_sum"] += scored.get("score", 0)
+        agg["by_level"][level] = agg["by_level"].get(level, 0) + 1
+        agg["by_event_type"][event_type] = agg["by_event_type"].get(event_type, 0) + 1
+        if self.kri_store is not None:
+            self.kri_store.add_anomaly(scored)
+        if self.entity_risk is not None:
+            self.entity_risk.add(scored)
+
+    def _save(self, state):
+        self._out.flush()
+        os.fsync(self._out.fileno())
+        self.checkpoint.output_size = self._out.tell()
+        processed = state["offset"] if state["by_bytes"] else state["fingerprint"]["size"]
+        head_length = min(processed, HEAD_BYTES)
+        self.checkpoint.files[state["key"]] = {
+            **state["fingerprint"],
+            "unit": "bytes" if state["by_bytes"] else "rows",
+            "offset": state["offset"],
+            "complete": state["complete"],
+            "header": state["header"],
+            "head": _head_hash(state["path"], head_length),
+            "head_length": head_length,
+        }
+        self.checkpoint.detector_state = self.bruteforce.to_state()
+        if self.kri_store is not None:
+            self.checkpoint.kri_state = self.kri_store.to_state()
+        if self.entity_risk is not None:
+            self.checkpoint.entity_state = self.entity_risk.to_state()
+        self.checkpoint.save()
+
+
+def run_incremental_analysis(
+    log_path="data/system_logs/",
+    checkpoint_path="risk_checkpoint.json",
+    scored_output="scored_events.jsonl",
+    rules=None,
+    bruteforce=None,
+    metrics=None,
+    kri_store=None,
+    entity_risk=None,
+    watchlist=None,
+):
+    analyzer = IncrementalAnalyzer(
+        checkpoint_path,
+        scored_output,
+        rules=rules,
+        bruteforce=bruteforce,
+        metrics=metrics,
+        kri_store=kri_store,
+        entity_risk=entity_risk,
+        watchlist=watchlist,
+    )
+    result = analyzer.run(log_path)
+    print(f"Processed {result['new_logs']} new log entries.")
+    print(f"Total: {result['logs']} log entries, {result['anomalies']} anomalies.")
+    return result
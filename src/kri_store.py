@@ -0,0 +1,457 @@
+# kri_store.py
+# Rolling, time-bucketed KRI aggregates with range queries
+#
+# Log events and scored anomalies are folded into per-minute and per-hour
+# buckets of event, failure and anomaly counts and score sums, overall and
+# per user, source_ip and event_type. Each series keeps its bucket starts
+# sorted alongside running (prefix) totals, so the totals over any time
+# range cost two bisects and a subtraction however long the range is.
+# Buckets older than their tier's retention are evicted as time advances,
+# so memory is bounded by retention x distinct keys, not by log volume.
+#
+# Events are buffered per bucket and counted in bulk (collections.Counter)
+# when the buffer fills or a query needs them, keeping the per-row cost to
+# an append.
+
+import heapq
+from bisect import bisect_left
+from collections import Counter
+from datetime import datetime, timezone
+from operator import attrgetter
+
+from bruteforce_detector import parse_timestamp
+from log_event import LogEvent, pack_ip, unpack_ip
+
+
+MINUTE = 60
+HOUR = 3600
+DAY = 86400
+
+# Bucket width -> retention, in seconds. Minute buckets answer "last hour"
+# queries, hour buckets "last day" ones.
+DEFAULT_TIERS = {MINUTE: 2 * HOUR, HOUR: 2 * DAY}
+DEFAULT_DIMENSIONS = ("user", "source_ip", "event_type")
+
+STATS = ("events", "failures", "anomalies", "score_sum")
+
+# Buffered rows before they are folded into the series
+FLUSH_ROWS = 65_536
+
+# LogEvent attribute holding each dimension. IP keys are kept packed (see
+# log_event.pack_ip) and converted back to text only on the way out.
+_EVENT_ATTRS = {"source_ip": "packed_ip"}
+
+
+def _to_epoch(value):
+    """Epoch seconds from a number or an ISO-8601 string."""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    return parse_timestamp(value)
+
+
+def format_epoch(seconds):
+    return datetime.fromtimestamp(seconds, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _internal_key(key):
+    if key is not None and key[0] == "source_ip":
+        return key[0], pack_ip(key[1])
+    return key
+
+
+def _external_key(key):
+    if key is not None and key[0] == "source_ip":
+        return key[0], unpack_ip(key[1])
+    return key
+
+
+def _series(tier, key):
+    series = tier.get(key)
+    if series is None:
+        series = tier[key] = _Series()
+    return series
+
+
+class _Series:
+    """
+    Sorted bucket starts with the running total of each stat, stored flat:
+    totals[4*i : 4*i + 4] are the STATS summed over buckets 0..i.
+    """
+
+    __slots__ = ("starts", "totals", "base")
+
+    def __init__(self, starts=None, totals=None, base=None):
+        self.starts = starts if starts is not None else []
+        self.totals = totals if totals is not None else []
+        # Running totals of the buckets evicted so far
+        self.base = base if base is not None else [0, 0, 0, 0]
+
+    def add(self, start, events, failures, anomalies, score):
+        starts = self.starts
+        t = self.totals
+        if starts:
+            last = starts[-1]
+            if start == last:
+                t[-4] += events
+                t[-3] += failures
+                t[-2] += anomalies
+                t[-1] += score
+                return
+            if start > last:
+                starts.append(start)
+                t.extend((t[-4] + events, t[-3] + failures, t[-2] + anomalies, t[-1] + score))
+                return
+        else:
+            starts.append(start)
+            b = self.base
+            t.extend((b[0] + events, b[1] + failures, b[2] + anomalies, b[3] + score))
+            return
+
+        # Late data for an earlier bucket: every later running total moves
+        i = bisect_left(starts, start)
+        if starts[i] != start:
+            starts.insert(i, start)
+            t[4 * i:4 * i] = t[4 * i - 4:4 * i] if i else self.base
+        for j in range(4 * i, len(t), 4):
+            t[j] += events
+            t[j + 1] += failures
+            t[j + 2] += anomalies
+            t[j + 3] += score
+
+    def index(self, start, end):
+        """Indices [i, j) of the buckets starting in [start, end)."""
+        return bisect_left(self.starts, start), bisect_left(self.starts, end)
+
+    def sum(self, i, j):
+        if j <= i:
+            return [0, 0, 0, 0]
+        t = self.totals
+        before = t[4 * i - 4:4 * i] if i else self.base
+        return [t[4 * j - 4 + k] - before[k] for k in range(4)]
+
+    def evict(self, cutoff):
+        """Drops buckets starting before cutoff; True if none are left."""
+        starts = self.starts
+        if starts[0] >= cutoff:
+            return False
+        i = bisect_left(starts, cutoff)
+        self.base = self.totals[4 * i - 4:4 * i]
+        del starts[:i]
+        del self.totals[:4 * i]
+        return not starts
+
+
+class KRIStore:
+    """
+    In-memory rolling aggregates for a live risk dashboard.
+
+    tiers maps bucket width to retention (seconds); every event is counted
+    in each tier. Series are keyed by None (all events) or a
+    (dimension, value) pair such as ("user", "alice"). Times in queries
+    are epoch seconds or ISO-8601 strings; ranges are [start, end) rounded
+    out to whole buckets of the tier used. Buckets are evicted lazily, so
+    data up to a quarter-retention past its expiry may still be returned.
+    """
+
+    def __init__(self, tiers=None, dimensions=DEFAULT_DIMENSIONS):
+        self.tiers = dict(sorted((tiers or DEFAULT_TIERS).items()))
+        self.width = min(self.tiers)
+        self.dimensions = tuple(dimensions)
+        self._series = {width: {} for width in self.tiers}
+
+        # Latest event time seen (epoch seconds)
+        self.watermark = None
+        self.skipped = 0
+
+        # bucket start -> ([events], [failed events], [anomalies])
+        self._buffer = {}
+        self._buffered = 0
+        self._current = None
+        self._current_start = None
+        self._last_ts = None
+
+        # Each tier is swept for expired buckets every quarter retention
+        self._next_evict = dict.fromkeys(self.tiers)
+
+    def __len__(self):
+        """Number of live series across all tiers."""
+        return sum(len(series) for series in self._series.values())
+
+    # ------------------------------------------------------------
+    # Ingestion
+    # ------------------------------------------------------------
+    def add_event(self, event):
+        """Counts one log row (a LogEvent or row dict)."""
+        entry = self._entry(event)
+        if entry is None:
+            return
+        entry[0].append(event)
+        self._buffered += 1
+        status = getattr(event, "status", None)
+        if status is None:
+            status = (event.get("status") or "").lower()
+        if status == "failed":
+            entry[1].append(event)
+
+    def add_anomaly(self, event):
+        """Counts one scored anomaly (needs a `score`)."""
+        entry = self._entry(event)
+        if entry is not None:
+            entry[2].append(event)
+            self._buffered += 1
+
+    def add_events(self, events):
+        for event in events:
+            self.add_event(event)
+
+    def add_anomalies(self, events):
+        for event in events:
+            self.add_anomaly(event)
+
+    def tee_events(self, events):
+        """Counts each row and passes it on, for use inside a stream."""
+        for event in events:
+            self.add_event(event)
+            yield event
+
+    def tee_anomalies(self, events):
+        for event in events:
+            self.add_anomaly(event)
+            yield event
+
+    def _entry(self, event):
+        ts = getattr(event, "timestamp", None)
+        if ts is None:
+            ts = event.get("timestamp")
+        if ts == self._last_ts and self._current is not None:
+            return self._current
+
+        epoch = parse_timestamp(ts)
+        if epoch is None:
+            self.skipped += 1
+            return None
+        if self.watermark is None or epoch > self.watermark:
+            self.watermark = epoch
+
+        start = int(epoch // self.width) * self.width
+        if start != self._current_start:
+            if self._buffered >= FLUSH_ROWS:
+                self.flush()
+            self._current_start = start
+            self._current = self._buffer.get(start)
+            if self._current is None:
+                self._current = self._buffer[start] = ([], [], [])
+        self._last_ts = ts
+        return self._current
+
+    def flush(self):
+        """Folds buffered rows into the series (and evicts expired buckets)."""
+        buffer = sorted(self._buffer.items())
+        self._buffer.clear()
+        self._buffered = 0
+        self._current = self._current_start = self._last_ts = None
+
+        for width, tier in self._series.items():
+            if width == self.width:
+                groups = buffer
+            else:
+                # Coarser tiers count whole buckets at once: one update per
+                # key and bucket rather than per key and minute
+                merged = {}
+                for start, entry in buffer:
+                    group = merged.get(start - start % width)
+                    if group is None:
+                        merged[start - start % width] = tuple(list(rows) for rows in entry)
+                    else:
+                        for rows, more in zip(group, entry):
+                            rows.extend(more)
+                groups = merged.items()
+            for bucket, (events, failures, anomalies) in groups:
+                self._fold(tier, bucket, events, failures, anomalies)
+
+        if self.watermark is not None:
+            for width, retention in self.tiers.items():
+                due = self._next_evict[width]
+                if due is None or self.watermark >= due:
+                    self._evict_tier(width, self.watermark - retention)
+                    self._next_evict[width] = self.watermark + retention / 4
+
+    def _fold(self, tier, bucket, events, failures, anomalies):
+        scores = [a.get("score") or 0 for a in anomalies]
+        _series(tier, None).add(bucket, len(events), len(failures), len(anomalies), sum(scores))
+
+        for dim in self.dimensions:
+            counts = Counter(self._values(events, dim))
+            failed = Counter(self._values(failures, dim))
+            flagged = Counter()
+            scored = {}
+            for value, score in zip(self._values(anomalies, dim), scores):
+                flagged[value] += 1
+                scored[value] = scored.get(value, 0) + score
+
+            for value in counts.keys() | flagged.keys() if flagged else counts:
+                if value is None or value == "":
+                    continue
+                _series(tier, (dim, value)).add(
+                    bucket, counts.get(value, 0), failed.get(value, 0), flagged.get(value, 0), scored.get(value, 0)
+                )
+
+    @staticmethod
+    def _values(group, dim):
+        if group and isinstance(group[0], LogEvent):
+            return map(attrgetter(_EVENT_ATTRS.get(dim, dim)), group)
+        if dim == "source_ip":
+            return [pack_ip(row.get(dim)) for row in group]
+        return [row.get(dim) for row in group]
+
+    def evict(self, now=None):
+        """Drops buckets older than each tier's retention (relative to now)."""
+        now = _to_epoch(now) if now is not None else self.watermark
+        if now is None:
+            return
+        for width, retention in self.tiers.items():
+            self._evict_tier(width, now - retention)
+
+    def _evict_tier(self, width, cutoff):
+        tier = self._series[width]
+        for key in [k for k, series in tier.items() if series.evict(cutoff)]:
+            del tier[key]
+
+    # ------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------
+    def tier_for(self, start):
+        """The finest bucket width whose retention still covers `start`."""
+        start = _to_epoch(start)
+        if self.watermark is not None and start is not None:
+            for width, retention in self.tiers.items():
+                if start >= self.watermark - retention:
+                    return width
+        return max(self.tiers)
+
+    def _range(self, start, end, width):
+        self.flush()
+        start, end = _to_epoch(start), _to_epoch(end)
+        width = width or self.tier_for(start)
+        if width not in self._series:
+            raise ValueError(f"No {width}s tier; have {list(self.tiers)}")
+        # Round out to whole buckets
+        return start - start % width, -(-end // width) * width, width
+
+    def totals(self, start, end, key=None, width=None):
+        """Stat totals over [start, end) for one series (None: all events)."""
+        start, end, width = self._range(start, end, width)
+        series = self._series[width].get(_internal_key(key))
+        if series is None:
+            return dict.fromkeys(STATS, 0)
+        return dict(zip(STATS, series.sum(*series.index(start, end))))
+
+    def buckets(self, start, end, key=None, width=None, step=None):
+        """
+        (bucket start, stats) over [start, end), downsampled to buckets of
+        `step` seconds (a multiple of the tier width). Empty buckets are
+        included, so the list is a regular time series.
+        """
+        start, end, width = self._range(start, end, width)
+        step = step or width
+        if step % width:
+            raise ValueError(f"step must be a multiple of the {width}s bucket width")
+        start -= start % step
+        series = self._series[width].get(_internal_key(key))
+
+        out = []
+        for t in range(int(start), int(end), step):
+            values = series.sum(*series.index(t, t + step)) if series is not None else [0] * len(STATS)
+            out.append((t, dict(zip(STATS, values))))
+        return out
+
+    def top(self, dimension, start, end, by="anomalies", n=10, width=None):
+        """The n values of `dimension` with the largest `by` total in range."""
+        if by not in STATS:
+            raise ValueError(f"by must be one of {STATS}")
+        start, end, width = self._range(start, end, width)
+
+        def totals():
+            for key, series in self._series[width].items():
+                if key is not None and key[0] == dimension:
+                    values = series.sum(*series.index(start, end))
+                    if values[0] or values[2]:
+                        yield _external_key(key)[1], dict(zip(STATS, values))
+
+        return heapq.nlargest(n, totals(), key=lambda item: item[1][by])
+
+    def kris(self, window=HOUR, end=None, key=None):
+        """
+        KRIs over the `window` seconds before `end` (default: just after the
+        latest event), from the finest tier that still covers the window.
+        volume_spike_ratio is the busiest bucket over the mean bucket
+        between the first and last active ones (0 if fewer than 3).
+        """
+        self.flush()
+        if self.watermark is None:
+            return {"window_seconds": window, **dict.fromkeys(STATS, 0)}
+        end = _to_epoch(end) if end is not None else self.watermark + 1
+        start = end - window
+        width = self.tier_for(start)
+        series = self.buckets(start, end, key=key, width=width)
+
+        totals = dict.fromkeys(STATS, 0)
+        for _, values in series:
+            for stat, value in values.items():
+                totals[stat] += value
+        events = totals["events"]
+        anomalies = totals["anomalies"]
+
+        active = [values["events"] for _, values in series if values["events"]]
+        spike = 0.0
+        if active:
+            first = next(i for i, (_, v) in enumerate(series) if v["events"])
+            last = max(i for i, (_, v) in enumerate(series) if v["events"])
+            n_buckets = last - first + 1
+            if n_buckets >= 3:
+                spike = max(active) / (events / n_buckets)
+
+        return {
+            "window_seconds": window,
+            "bucket_seconds": width,
+            "start": format_epoch(start),
+            "end": format_epoch(end),
+            **totals,
+            "failure_rate": round(totals["failures"] / events, 4) if events else 0.0,
+            "anomaly_rate": round(anomalies / events, 4) if events else 0.0,
+            "mean_score": round(totals["score_sum"] / anomalies, 2) if anomalies else 0.0,
+            "volume_spike_ratio": round(spike, 4),
+        }
+
+    def summary(self, end=None):
+        """Last-hour and last-day KRIs (see kris)."""
+        return {"last_hour": self.kris(HOUR, end=end), "last_day": self.kris(DAY, end=end)}
+
+    # ------------------------------------------------------------
+    # Checkpointing
+    # ------------------------------------------------------------
+    def to_state(self):
+        """JSON-serialisable snapshot (buffered rows are folded in first)."""
+        self.flush()
+        return {
+            "tiers": [[width, retention] for width, retention in self.tiers.items()],
+            "dimensions": list(self.dimensions),
+            "watermark": self.watermark,
+            "skipped": self.skipped,
+            "series": [
+                [width, list(_external_key(key)) if key is not None else None, s.starts, s.totals, s.base]
+                for width, tier in self._series.items()
+                for key, s in tier.items()
+            ],
+        }
+
+    def load_state(self, state):
+        """Restores a to_state() snapshot taken with the same tiers."""
+        tiers = {int(w): r for w, r in state.get("tiers", [])}
+        if tiers and tiers != self.tiers:
+            return  # different bucket layout: start afresh
+        self.watermark = state.get("watermark")
+        self.skipped = state.get("skipped", 0)
+        self._series = {width: {} for width in self.tiers}
+        for width, key, starts, totals, base in state.get("series", []):
+            self._series[int(width)][_internal_key(tuple(key)) if key is not None else None] = _Series(starts, totals, base)
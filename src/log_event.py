@@ -0,0 +1,250 @@
+# log_event.py
+# Compact record for one log row as it moves through detect -> score -> report
+#
+# A csv.DictReader row plus the anomaly dict and the scored copy made each
+# event three dicts with repeated keys. A LogEvent is a single __slots__
+# object that the detector and scorer annotate in place: user, event_type
+# and status are interned (one shared string per distinct value), IPs are
+# packed into ints, and extra CSV columns are only kept when present.
+#
+# LogEvent keeps a read-only dict-like API (get, [], keys, to_dict) so
+# code written against row dicts keeps working.
+
+import csv
+import ipaddress
+import sys
+from functools import lru_cache
+from operator import itemgetter
+
+
+CORE_FIELDS = ("timestamp", "user", "event_type", "source_ip", "status")
+SCORED_FIELDS = ("reason", "score", "risk_level")
+
+# IPv6 addresses are tagged above the 128-bit range so they never collide
+# with IPv4 values
+_IPV6_FLAG = 1 << 128
+
+# Bounded lookup tables for the per-row normalisation; cleared when full
+_CACHE_LIMIT = 1_000_000
+_IP_CACHE = {}
+_LOWER_CACHE = {}
+
+
+def pack_ip(value):
+    """
+    Canonical IPv4/IPv6 text -> int. Anything that would not round-trip
+    exactly (hostnames, zero-padded or upper-case forms) stays an
+    interned string.
+    """
+    if not value:
+        return value
+    packed = _IP_CACHE.get(value)
+    if packed is None:
+        try:
+            ip = ipaddress.ip_address(value)
+        except ValueError:
+            packed = sys.intern(value)
+        else:
+            if str(ip) != value:
+                packed = sys.intern(value)
+            elif ip.version == 4:
+                packed = int(ip)
+            else:
+                packed = int(ip) | _IPV6_FLAG
+        if len(_IP_CACHE) >= _CACHE_LIMIT:
+            _IP_CACHE.clear()
+        _IP_CACHE[value] = packed
+    return packed
+
+
+@lru_cache(maxsize=65536)
+def _format_ip(packed):
+    if packed >= _IPV6_FLAG:
+        return str(ipaddress.IPv6Address(packed ^ _IPV6_FLAG))
+    return str(ipaddress.IPv4Address(packed))
+
+
+def unpack_ip(packed):
+    if isinstance(packed, int):
+        return _format_ip(packed)
+    return packed
+
+
+def _intern(value):
+    return sys.intern(value) if value else value
+
+
+def _lowered(value):
+    # event_type/status are compared lower-cased everywhere
+    if not value:
+        return ""
+    lowered = _LOWER_CACHE.get(value)
+    if lowered is None:
+        lowered = sys.intern(value.lower())
+        if len(_LOWER_CACHE) >= _CACHE_LIMIT:
+            _LOWER_CACHE.clear()
+        _LOWER_CACHE[value] = lowered
+    return lowered
+
+
+class LogEvent:
+    """
+    One log row. reason/score/risk_level are unset until the detector and
+    scorer fill them in; get() returns the default for unset fields, like
+    a dict without the key. burst is set (True) by the detector on a failed
+    login that completes a KRI1 brute-force burst.
+    """
+
+    __slots__ = (
+        "timestamp", "user", "event_type", "_ip", "status", "extra", "reason", "score", "risk_level", "burst"
+    )
+
+    def __init__(self, timestamp, user, event_type, source_ip, status, extra=None):
+        # Cache hits are inlined: this runs once per log row
+        self.timestamp = timestamp
+        self.user = _intern(user)
+        self.event_type = _LOWER_CACHE.get(event_type) or _lowered(event_type)
+        self._ip = _IP_CACHE.get(source_ip) or pack_ip(source_ip)
+        self.status = _LOWER_CACHE.get(status) or _lowered(status)
+        self.extra = extra
+
+    @classmethod
+    def from_row(cls, row):
+        """Builds an event from a csv.DictReader-style dict."""
+        extra = {k: v for k, v in row.items() if k not in CORE_FIELDS} or None
+        return cls(
+            row.get("timestamp"),
+            row.get("user"),
+            row.get("event_type"),
+            row.get("source_ip"),
+            row.get("status"),
+            extra,
+        )
+
+    @property
+    def source_ip(self):
+        return unpack_ip(self._ip)
+
+    @property
+    def packed_ip(self):
+        """The source IP as an int (None/str if it is not a plain IP)."""
+        return self._ip
+
+    # ------------------------------------------------------------
+    # Read-only mapping API
+    # ------------------------------------------------------------
+    def get(self, key, default=None):
+        if key == "source_ip":
+            return unpack_ip(self._ip)
+        if key in _ATTRIBUTES:
+            return getattr(self, key, default)
+        if self.extra is not None:
+            return self.extra.get(key, default)
+        return default
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def keys(self):
+        keys = list(CORE_FIELDS)
+        if self.extra:
+            keys.extend(self.extra)
+        keys.extend(k for k in SCORED_FIELDS if hasattr(self, k))
+        return keys
+
+    def to_dict(self):
+        """
+        Plain dict in the field order of the former anomaly/scored dicts
+        (extra columns are not included).
+        """
+        d = {
+            "timestamp": self.timestamp,
+            "user": self.user,
+            "event_type": self.event_type,
+            "source_ip": unpack_ip(self._ip),
+            "status": self.status,
+        }
+        for key in SCORED_FIELDS:
+            value = getattr(self, key, _MISSING)
+            if value is not _MISSING:
+                d[key] = value
+        return d
+
+    def __repr__(self):
+        return f"LogEvent({self.to_dict()!r})"
+
+    def __reduce__(self):
+        # Rebuilt through __init__ so values are re-interned in the receiving process
+        scored = tuple(getattr(self, k, _MISSING) for k in SCORED_FIELDS)
+        burst = getattr(self, "burst", False)
+        return _restore, (self.timestamp, self.user, self.event_type, self._ip, self.status, self.extra, scored, burst)
+
+
+_ATTRIBUTES = frozenset(("timestamp", "user", "event_type", "status", "burst") + SCORED_FIELDS)
+
+
+class _Missing:
+    def __reduce__(self):
+        return "_MISSING"
+
+
+_MISSING = _Missing()
+
+
+def _restore(timestamp, user, event_type, packed_ip, status, extra, scored, burst=False):
+    event = LogEvent(timestamp, user, event_type, None, status, extra)
+    event._ip = packed_ip if isinstance(packed_ip, int) else _intern(packed_ip)
+    for key, value in zip(SCORED_FIELDS, scored):
+        if value is not _MISSING:
+            setattr(event, key, value)
+    if burst:
+        event.burst = True
+    return event
+
+
+class EventParser:
+    """
+    Builds LogEvents straight from csv.reader field lists for a given
+    header, skipping the per-row dict that csv.DictReader allocates.
+    """
+
+    def __init__(self, header):
+        self.header = list(header)
+        index = {name: i for i, name in enumerate(self.header)}
+        self._core = [index.get(name) for name in CORE_FIELDS]
+        self._extra = [(i, name) for i, name in enumerate(self.header) if name not in CORE_FIELDS]
+        self._width = len(self.header)
+        self._fast = None
+        if None not in self._core and not self._extra:
+            self._fast = itemgetter(*self._core)
+
+    def parse(self, fields):
+        if self._fast is not None and len(fields) >= self._width:
+            return LogEvent(*self._fast(fields))
+
+        # Missing columns and short rows give None, as with csv.DictReader
+        n = len(fields)
+        values = [fields[i] if i is not None and i < n else None for i in self._core]
+        extra = {name: (fields[i] if i < n else None) for i, name in self._extra} or None
+        return LogEvent(*values, extra)
+
+
+def read_events(f):
+    """Yields LogEvents from an open CSV text file (header on the first line)."""
+    reader = csv.reader(f)
+    header = next(reader, None)
+    if header is None:
+        return
+    parser = EventParser(header)
+    parse, fast, width = parser.parse, parser._fast, parser._width
+    for fields in reader:
+        if fast is not None and len(fields) >= width:
+            yield LogEvent(*fast(fields))
+        elif fields:  # csv.DictReader skips blank lines too
+            yield parse(fields)
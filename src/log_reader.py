@@ -0,0 +1,258 @@
+# log_reader.py
+# Multi-file log ingestion: compressed inputs, Parquet/Arrow files,
+# parallel parsing and a timestamp-ordered k-way merge
+#
+# Shipping parsed rows between processes costs more than parsing them
+# (pickling a LogEvent is slower than reading its CSV line), so worker
+# processes are only used by filter_log_events, which sends back just the
+# rows a filter keeps. Everything else parses in this process, with
+# background threads overlapping decompression and I/O across files.
+
+import bz2
+import csv
+import glob
+import gzip
+import heapq
+import io
+import lzma
+import os
+import pickle
+import queue
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from arrow_io import COLUMNAR_SUFFIXES, is_columnar_path, iter_batches, string_columns
+from log_event import EventParser, read_events
+
+
+# Matches plain and compressed CSVs (sample_logs.csv, app-10.csv.gz, ...)
+LOG_GLOB = "*.csv*"
+# Everything a directory of logs may hold: CSVs plus Parquet / Arrow IPC
+LOG_GLOBS = (LOG_GLOB,) + tuple("*" + suffix for suffix in COLUMNAR_SUFFIXES)
+# Compressed CSVs open_log_file can read
+COMPRESSED_SUFFIXES = (".gz", ".bz2", ".xz", ".lzma", ".zst", ".zstd")
+
+# Rows are handed from parser threads to the merge in batches; memory is
+# bounded by files * PREFETCH_DEPTH * PREFETCH_BATCH rows.
+PREFETCH_BATCH = 1024
+PREFETCH_DEPTH = 2
+
+# Kept rows per pickle written to a filter_log_events spill file
+SPILL_BATCH = 4096
+
+_DONE = object()
+
+
+def resolve_log_paths(path, pattern=None):
+    """
+    Expands a file, a directory (every file matching `pattern`, by default
+    any of LOG_GLOBS) or a glob expression into a sorted list of log files.
+    """
+    p = Path(path)
+    if p.is_dir():
+        patterns = (pattern,) if pattern else LOG_GLOBS
+        return sorted({f for pat in patterns for f in p.glob(pat) if f.is_file()})
+    if glob.has_magic(str(path)):
+        return sorted(Path(f) for f in glob.glob(str(path)) if os.path.isfile(f))
+    return [p]
+
+
+def open_log_file(path):
+    """Opens a plain or compressed (.gz, .bz2, .xz, .zst) log file as text."""
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix == ".gz":
+        return gzip.open(path, "rt", newline="")
+    if suffix == ".bz2":
+        return bz2.open(path, "rt", newline="")
+    if suffix in (".xz", ".lzma"):
+        return lzma.open(path, "rt", newline="")
+    if suffix in (".zst", ".zstd"):
+        try:
+            import zstandard
+        except ImportError as exc:
+            raise ImportError("The 'zstandard' package is required to read .zst logs") from exc
+        raw = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+        return io.TextIOWrapper(raw, newline="")
+    return open(path, newline="")
+
+
+def _columnar_batches(path):
+    # (header, rows as tuples of str) per Parquet row group / IPC batch
+    for batch in iter_batches(path):
+        columns = string_columns(batch)
+        yield list(columns), zip(*columns.values())
+
+
+def read_rows(path):
+    if is_columnar_path(path):
+        for header, rows in _columnar_batches(path):
+            yield from (dict(zip(header, fields)) for fields in rows)
+        return
+    with open_log_file(path) as f:
+        yield from csv.DictReader(f)
+
+
+def read_log_events(path):
+    """Like read_rows, but yields compact LogEvents instead of dicts."""
+    if is_columnar_path(path):
+        parser = None
+        for header, rows in _columnar_batches(path):
+            if parser is None or parser.header != header:
+                parser = EventParser(header)
+            yield from map(parser.parse, rows)
+        return
+    with open_log_file(path) as f:
+        yield from read_events(f)
+
+
+def _timestamp_key(row):
+    # ISO-8601 timestamps in one format sort correctly as strings
+    return row.get("timestamp") or ""
+
+
+def _event_timestamp_key(event):
+    return event.timestamp or ""
+
+
+# reader -> merge key
+_MERGE_KEYS = {
+    read_rows: _timestamp_key,
+    read_log_events: _event_timestamp_key,
+}
+
+
+def _prefetch(path, parse_slots, stop, reader=read_rows):
+    """
+    Parses `path` on a background thread and yields its rows. Threads only
+    hold a parse slot while parsing a batch, never while blocked on a full
+    queue, so any number of files can be merged with `workers` slots.
+    """
+    q = queue.Queue(maxsize=PREFETCH_DEPTH)
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            rows = reader(path)
+            while True:
+                with parse_slots:
+                    batch = [row for _, row in zip(range(PREFETCH_BATCH), rows)]
+                if not batch or not put(batch):
+                    break
+        except BaseException as exc:  # re-raised in the consuming thread
+            put(exc)
+        finally:
+            put(_DONE)
+
+    threading.Thread(target=produce, name=f"log-reader:{Path(path).name}", daemon=True).start()
+
+    while True:
+        item = q.get()
+        if item is _DONE:
+            return
+        if isinstance(item, BaseException):
+            raise item
+        yield from item
+
+
+def iter_log_rows(paths, workers=None, reader=read_rows):
+    """
+    Yields rows from all files in timestamp order. Each file must itself be
+    time-ordered (as rotated logs are); files are combined with a k-way
+    heap merge. With workers > 1, files are decompressed and parsed on
+    background threads, at most `workers` at a time.
+
+    reader is read_rows (dicts) or read_log_events (LogEvents).
+    """
+    key = _MERGE_KEYS[reader]
+    paths = list(paths)
+    if len(paths) == 1:
+        yield from reader(paths[0])
+        return
+
+    if not workers or workers <= 1:
+        yield from heapq.merge(*(reader(p) for p in paths), key=key)
+        return
+
+    stop = threading.Event()
+    parse_slots = threading.Semaphore(workers)
+    try:
+        streams = [_prefetch(p, parse_slots, stop, reader) for p in paths]
+        yield from heapq.merge(*streams, key=key)
+    finally:
+        stop.set()
+
+
+def load_log_rows(paths, workers=None, reader=read_rows):
+    """
+    Reads all files into one timestamp-ordered list (see iter_log_rows for
+    workers).
+    """
+    return list(iter_log_rows(paths, workers=workers, reader=reader))
+
+
+def _filter_file(path, keep, spill_path):
+    # Pool worker: pickles the kept LogEvents of one file to spill_path in
+    # batches and returns how many rows the file had
+    rows = 0
+    batch = []
+    with open(spill_path, "wb") as f:
+        for event in read_log_events(path):
+            rows += 1
+            if keep(event):
+                batch.append(event)
+                if len(batch) >= SPILL_BATCH:
+                    pickle.dump(batch, f, pickle.HIGHEST_PROTOCOL)
+                    batch = []
+        if batch:
+            pickle.dump(batch, f, pickle.HIGHEST_PROTOCOL)
+    return rows
+
+
+def _read_spill(path):
+    with open(path, "rb") as f:
+        while True:
+            try:
+                batch = pickle.load(f)
+            except EOFError:
+                return
+            yield from batch
+
+
+def _merge_spills(spill_dir, spill_paths):
+    try:
+        yield from heapq.merge(*(_read_spill(p) for p in spill_paths), key=_event_timestamp_key)
+    finally:
+        spill_dir.cleanup()
+
+
+def filter_log_events(paths, keep, workers):
+    """
+    Parses files in up to `workers` processes, keeping only the LogEvents
+    for which keep(event) (a picklable callable) is true. Returns (rows
+    read, iterator of the kept events in timestamp order).
+
+    Workers spill what they keep to temporary files, which are merged
+    lazily once every file is parsed, so memory stays bounded by the
+    merge however many rows are kept.
+    """
+    paths = list(paths)
+    spill_dir = tempfile.TemporaryDirectory(prefix="risk-logs-")
+    spill_paths = [os.path.join(spill_dir.name, f"{i}.pickle") for i in range(len(paths))]
+    try:
+        with ProcessPoolExecutor(max_workers=max(1, min(workers, len(paths)))) as pool:
+            rows = sum(pool.map(_filter_file, paths, [keep] * len(paths), spill_paths))
+    except BaseException:
+        spill_dir.cleanup()
+        raise
+    return rows, _merge_spills(spill_dir, spill_paths)
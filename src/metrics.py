@@ -0,0 +1,344 @@
+# metrics.py
+# Opt-in stage timers, counters and profiler hooks for the pipelines
+#
+# Components take a `metrics` argument that defaults to NULL_METRICS, whose
+# methods do nothing. Hot loops check `metrics.enabled` once per run and
+# only then switch to an instrumented loop, so with instrumentation off the
+# cost is one attribute lookup per call, not per row. Per-row latencies are
+# sampled (one row in `sample_every`) rather than timed on every row.
+
+import json
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+
+METRIC_PREFIX = "risk"
+DEFAULT_SAMPLE_EVERY = 64
+
+PROFILERS = ("cprofile", "pyinstrument")
+
+Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def _key(name: str, labels: Dict[str, Any]) -> Key:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(labels) -> str:
+    if not labels:
+        return ""
+    inner = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+    return "{" + inner + "}"
+
+
+def _number(value) -> str:
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value))
+
+
+class _Timer:
+    __slots__ = ("metrics", "key", "start")
+
+    def __init__(self, metrics: "Metrics", key: Key):
+        self.metrics = metrics
+        self.key = key
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics._observe(self.key, time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    """
+    In-process registry of counters, gauges and timers. Names are plain
+    snake_case; labels are keyword arguments (risk_level="High").
+    """
+
+    enabled = True
+
+    def __init__(self, sample_every: int = DEFAULT_SAMPLE_EVERY):
+        self.sample_every = max(int(sample_every), 1)
+        self.counters: Dict[Key, float] = {}
+        self.gauges: Dict[Key, float] = {}
+        # key -> [count, total_seconds, max_seconds]
+        self.timers: Dict[Key, list] = {}
+
+    # ------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------
+    def incr(self, name: str, value: float = 1, **labels):
+        key = _key(name, labels)
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        self.gauges[_key(name, labels)] = value
+
+    def timer(self, name: str, **labels) -> _Timer:
+        """Context manager adding the elapsed wall time to timer `name`."""
+        return _Timer(self, _key(name, labels))
+
+    def observe(self, name: str, seconds: float, count: int = 1, peak: Optional[float] = None, **labels):
+        """
+        Records `count` timed calls that took `seconds` in total; `peak` is
+        the slowest of them (defaults to the mean).
+        """
+        self._observe(_key(name, labels), seconds, count, peak)
+
+    def _observe(self, key: Key, seconds: float, count: int = 1, peak: Optional[float] = None):
+        if peak is None:
+            peak = seconds / count
+        entry = self.timers.get(key)
+        if entry is None:
+            self.timers[key] = [count, seconds, peak]
+        else:
+            entry[0] += count
+            entry[1] += seconds
+            if peak > entry[2]:
+                entry[2] = peak
+
+    def timed_iter(self, items: Iterable[Any], name: str, every: Optional[int] = None, **labels) -> Iterator[Any]:
+        """
+        Passes items through, counting them in `{name}_items` and timing one
+        next() in `every` (default sample_every). The sampled mean times the
+        item count is recorded as the (inclusive) time spent producing the
+        items; use every=1 for low-volume streams.
+        """
+        every = every or self.sample_every
+        perf = time.perf_counter
+        it = iter(items)
+        n = sampled = 0
+        sampled_seconds = peak = 0.0
+        try:
+            while True:
+                if n % every == 0:
+                    t = perf()
+                    try:
+                        item = next(it)
+                    except StopIteration:
+                        return
+                    elapsed = perf() - t
+                    sampled_seconds += elapsed
+                    sampled += 1
+                    if elapsed > peak:
+                        peak = elapsed
+                else:
+                    try:
+                        item = next(it)
+                    except StopIteration:
+                        return
+                n += 1
+                yield item
+        finally:
+            self.incr(f"{name}_items", n, **labels)
+            if sampled and n:
+                self.observe(name, sampled_seconds / sampled * n, count=n, peak=peak, **labels)
+
+    def total_seconds(self, name: str, **labels) -> float:
+        entry = self.timers.get(_key(name, labels))
+        return entry[1] if entry else 0.0
+
+    def merge(self, snapshot: Dict[str, Any]):
+        """Adds a snapshot() taken in another process (e.g. a pool worker)."""
+        for key, value in snapshot.get("counters", ()):
+            self.counters[key] = self.counters.get(key, 0) + value
+        for key, value in snapshot.get("gauges", ()):
+            self.gauges[key] = value
+        for key, (count, total, peak) in snapshot.get("timers", ()):
+            entry = self.timers.get(key)
+            if entry is None:
+                self.timers[key] = [count, total, peak]
+            else:
+                entry[0] += count
+                entry[1] += total
+                entry[2] = max(entry[2], peak)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Picklable copy of everything recorded so far."""
+        return {
+            "counters": list(self.counters.items()),
+            "gauges": list(self.gauges.items()),
+            "timers": [(k, tuple(v)) for k, v in self.timers.items()],
+        }
+
+    def reset(self):
+        self.counters.clear()
+        self.gauges.clear()
+        self.timers.clear()
+
+    # ------------------------------------------------------------
+    # Export
+    # ------------------------------------------------------------
+    def to_dict(self) -> Dict[str, Any]:
+        timers = {}
+        for (name, labels), (count, total, peak) in sorted(self.timers.items()):
+            timers[name + _label_text(labels)] = {
+                "count": count,
+                "total_seconds": round(total, 6),
+                "mean_seconds": round(total / count, 9) if count else 0.0,
+                "max_seconds": round(peak, 6),
+            }
+        return {
+            "counters": {n + _label_text(l): v for (n, l), v in sorted(self.counters.items())},
+            "gauges": {n + _label_text(l): v for (n, l), v in sorted(self.gauges.items())},
+            "timers": timers,
+        }
+
+    def to_prometheus(self, prefix: str = METRIC_PREFIX) -> str:
+        """Prometheus text exposition format (counters, gauges, timer summaries)."""
+        # metric family -> (type, sample lines); each family is written as one block
+        families: Dict[str, Tuple[str, list]] = {}
+
+        def sample(metric, kind, labels, value, suffix=""):
+            families.setdefault(metric, (kind, []))[1].append(f"{metric}{suffix}{_label_text(labels)} {_number(value)}")
+
+        for (name, labels), value in sorted(self.counters.items()):
+            sample(f"{prefix}_{name}_total", "counter", labels, value)
+        for (name, labels), value in sorted(self.gauges.items()):
+            sample(f"{prefix}_{name}", "gauge", labels, value)
+        for (name, labels), (count, total, peak) in sorted(self.timers.items()):
+            metric = f"{prefix}_{name}_seconds"
+            sample(metric, "summary", labels, count, "_count")
+            sample(metric, "summary", labels, total, "_sum")
+            sample(f"{metric}_max", "gauge", labels, peak)
+
+        lines = []
+        for metric, (kind, samples) in families.items():
+            lines.append(f"# TYPE {metric} {kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: str):
+        """
+        Writes Prometheus text for *.prom / *.txt paths, JSON otherwise;
+        "-" prints JSON to stderr.
+        """
+        if path == "-":
+            print(json.dumps(self.to_dict(), indent=2), file=sys.stderr)
+            return
+        p = Path(path)
+        if p.suffix.lower() in (".prom", ".txt"):
+            p.write_text(self.to_prometheus(), encoding="utf-8")
+        else:
+            p.write_text(json.dumps(self.to_dict(), indent=2) + "\n", encoding="utf-8")
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class NullMetrics:
+    """Drop-in Metrics replacement that records nothing."""
+
+    enabled = False
+    sample_every = DEFAULT_SAMPLE_EVERY
+
+    def incr(self, name, value=1, **labels):
+        pass
+
+    def set_gauge(self, name, value, **labels):
+        pass
+
+    def timer(self, name, **labels):
+        return _NULL_TIMER
+
+    def observe(self, name, seconds, count=1, peak=None, **labels):
+        pass
+
+    def timed_iter(self, items, name, every=None, **labels):
+        return items
+
+    def total_seconds(self, name, **labels):
+        return 0.0
+
+    def merge(self, snapshot):
+        pass
+
+    def snapshot(self):
+        return {}
+
+    def reset(self):
+        pass
+
+    def to_dict(self):
+        return {"counters": {}, "gauges": {}, "timers": {}}
+
+
+NULL_METRICS = NullMetrics()
+
+
+def make_metrics(enabled: bool, sample_every: int = DEFAULT_SAMPLE_EVERY):
+    return Metrics(sample_every) if enabled else NULL_METRICS
+
+
+# ------------------------------------------------------------
+# Profiler hook
+# ------------------------------------------------------------
+@contextmanager
+def profiled(kind: Optional[str], output: Optional[str] = None):
+    """
+    Runs the enclosed block under cProfile or pyinstrument. cProfile stats
+    go to `output` (pstats file) and a top-25 summary to stderr;
+    pyinstrument writes HTML to `output` (*.html) or text to stderr.
+    kind=None is a no-op.
+    """
+    if not kind:
+        yield
+        return
+
+    if kind == "cprofile":
+        import cProfile
+        import pstats
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            if output:
+                profiler.dump_stats(output)
+            pstats.Stats(profiler, stream=sys.stderr).sort_stats("cumulative").print_stats(25)
+        return
+
+    if kind == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError as exc:
+            raise ImportError("pyinstrument is required for --profile pyinstrument") from exc
+
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            if output and output.lower().endswith(".html"):
+                Path(output).write_text(profiler.output_html(), encoding="utf-8")
+            elif output:
+                Path(output).write_text(profiler.output_text(), encoding="utf-8")
+            else:
+                print(profiler.output_text(), file=sys.stderr)
+        return
+
+    raise ValueError(f"Unknown profiler {kind!r}; expected one of {PROFILERS}")
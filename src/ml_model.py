@@ -0,0 +1,84 @@
+# ml_model.py
+# Feature extraction and batched inference for the optional ML component
+#
+# Profiles are flattened into a fixed-order float vector (one column per
+# rules_vectorized.FIELDS entry), so a classifier trained on
+# feature_matrix() output can be dropped into RiskEngine. Models saved with
+# joblib.dump (uncompressed) are memory-mapped on load and cached per
+# process, so pool workers share the arrays through the page cache.
+
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from .rules_vectorized import FIELDS, profiles_to_columns
+
+
+FEATURE_NAMES: Tuple[str, ...] = tuple(FIELDS)
+
+# (resolved path, mtime_ns, size) -> loaded model, per process
+_MODEL_CACHE: Dict[Tuple[str, int, int], Any] = {}
+
+
+def extract_features(profile: Dict[str, Any]) -> np.ndarray:
+    """One profile as a float vector in FEATURE_NAMES order."""
+    return feature_matrix([profile])[0]
+
+
+def feature_matrix(profiles: Sequence[Dict[str, Any]]) -> np.ndarray:
+    """
+    Profiles as an (n, len(FEATURE_NAMES)) float64 matrix. Missing fields
+    take the same defaults as the rule scorers.
+    """
+    columns = profiles_to_columns(profiles)
+    matrix = np.empty((len(profiles), len(FEATURE_NAMES)), dtype=np.float64)
+    for j, name in enumerate(FEATURE_NAMES):
+        matrix[:, j] = columns[name]
+    return matrix
+
+
+def load_model(path) -> Any:
+    """
+    Loads a joblib model with mmap_mode="r", once per process. The cache is
+    keyed by path, mtime and size, so replacing the file on disk is picked
+    up on the next call.
+    """
+    try:
+        import joblib
+    except ImportError as exc:
+        raise ImportError("joblib is required to load ML models") from exc
+
+    resolved = Path(path).resolve()
+    st = os.stat(resolved)
+    key = (str(resolved), st.st_mtime_ns, st.st_size)
+
+    model = _MODEL_CACHE.get(key)
+    if model is None:
+        model = joblib.load(resolved, mmap_mode="r")
+        # Drop stale versions of the same file
+        for old in [k for k in _MODEL_CACHE if k[0] == key[0]]:
+            del _MODEL_CACHE[old]
+        _MODEL_CACHE[key] = model
+    return model
+
+
+def positive_proba(model: Any, features: np.ndarray) -> np.ndarray:
+    """Probability of the positive (high-risk) class for every row."""
+    proba = np.asarray(model.predict_proba(features))
+    classes = list(getattr(model, "classes_", []))
+    if 1 in classes:
+        return proba[:, classes.index(1)]
+    if len(classes) == 1:
+        # Trained on a single class: it is either always or never positive
+        return np.full(len(features), 0.0 if classes[0] == 0 else 1.0)
+    return proba[:, -1]
+
+
+def predict_risk(model: Any, profiles: Iterable[Dict[str, Any]]) -> List[float]:
+    """Scores a batch of profiles with a single predict_proba call."""
+    profiles = list(profiles)
+    if not profiles:
+        return []
+    return [float(p) for p in positive_proba(model, feature_matrix(profiles))]
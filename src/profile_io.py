@@ -0,0 +1,146 @@
+# profile_io.py
+# Parquet / Arrow IPC batches of risk profiles and scoring results
+#
+# Profiles are stored as one struct column per section (financial,
+# documentation, ...) with the typed fields of rules_vectorized.FIELDS;
+# anything else in a profile is kept as JSON in an `_extra` column, so a
+# profile reads back with the same scoring inputs it was written with.
+# Results get a typed schema of their own. See arrow_io for the readers.
+#
+#   python -m risk_engine.profile_io profiles.jsonl profiles.parquet
+#   python -m risk_engine.profile_io profiles.parquet profiles.jsonl
+
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from .rules_vectorized import CATEGORY_SCORERS, FIELDS
+
+
+EXTRA_COLUMN = "_extra"
+
+# section -> [(field, coercion), ...] in FIELDS order
+SECTIONS: Dict[str, List[Any]] = {}
+for _field, (_section, _cast, _) in FIELDS.items():
+    SECTIONS.setdefault(_section, []).append((_field, _cast))
+
+
+def _arrow_type(pa, cast):
+    return {float: pa.float64(), int: pa.int64(), bool: pa.bool_()}[cast]
+
+
+def profile_schema(pa):
+    return pa.schema(
+        [
+            (section, pa.struct([(field, _arrow_type(pa, cast)) for field, cast in fields]))
+            for section, fields in SECTIONS.items()
+        ]
+        + [(EXTRA_COLUMN, pa.string())]
+    )
+
+
+def result_schema(pa):
+    return pa.schema(
+        [
+            ("rule_scores", pa.struct([(category, pa.int64()) for category in CATEGORY_SCORERS])),
+            ("rule_based_score", pa.float64()),
+            ("ml_score", pa.float64()),
+            ("final_risk_score", pa.float64()),
+            ("risk_band", pa.string()),
+            ("notes", pa.list_(pa.string())),
+        ]
+    )
+
+
+# ------------------------------------------------------------
+# Profile <-> row
+# ------------------------------------------------------------
+def profile_to_row(profile: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Splits a profile into typed section structs plus `_extra` JSON. Field
+    values are coerced as rules_engine does (float(), int(), bool()).
+    """
+    row: Dict[str, Any] = {}
+    extra: Dict[str, Any] = {}
+    for key, value in profile.items():
+        fields = SECTIONS.get(key)
+        if fields is None or not isinstance(value, dict):
+            extra[key] = value
+            continue
+        known = {}
+        for field, cast in fields:
+            v = value.get(field)
+            known[field] = None if v is None else cast(v)
+        row[key] = known
+        rest = {k: v for k, v in value.items() if k not in known or v is None}
+        if rest:
+            extra[key] = rest
+    row[EXTRA_COLUMN] = json.dumps(extra) if extra else None
+    return row
+
+
+def row_to_profile(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Inverse of profile_to_row; missing (null) fields are left out."""
+    extra = row.get(EXTRA_COLUMN)
+    profile = json.loads(extra) if extra else {}
+    for section in SECTIONS:
+        values = row.get(section)
+        if values is None:
+            continue
+        known = {k: v for k, v in values.items() if v is not None}
+        profile[section] = {**known, **profile[section]} if isinstance(profile.get(section), dict) else known
+    return profile
+
+
+# ------------------------------------------------------------
+# Files
+# ------------------------------------------------------------
+def iter_profiles(path, batch_rows: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Yields profiles from a Parquet / Arrow IPC file written by
+    write_profiles (or any file with section struct columns).
+    """
+    from .arrow_io import DEFAULT_BATCH_ROWS, iter_batches
+
+    for batch in iter_batches(path, batch_rows or DEFAULT_BATCH_ROWS):
+        for row in batch.to_pylist():
+            yield row_to_profile(row)
+
+
+def write_profiles(profiles: Iterable[Dict[str, Any]], path) -> int:
+    from .arrow_io import write_records
+
+    return write_records((profile_to_row(p) for p in profiles), path, schema=profile_schema)
+
+
+def iter_results(path) -> Iterator[Dict[str, Any]]:
+    from .arrow_io import iter_records
+
+    return iter_records(path)
+
+
+def write_results(results: Iterable[Dict[str, Any]], path) -> int:
+    from .arrow_io import write_records
+
+    return write_records(results, path, schema=result_schema)
+
+
+def main():
+    import argparse
+    from pathlib import Path
+
+    from .arrow_io import is_columnar_path
+    from .risk_scoring import iter_jsonl, write_jsonl
+
+    parser = argparse.ArgumentParser(description="Convert risk profiles between JSON Lines and Parquet/Arrow.")
+    parser.add_argument("input", type=str, help="Profiles as .jsonl, .parquet or .arrow.")
+    parser.add_argument("output", type=str, help="Destination .jsonl, .parquet or .arrow file.")
+    args = parser.parse_args()
+
+    src, dst = Path(args.input), Path(args.output)
+    profiles = iter_profiles(src) if is_columnar_path(src) else iter_jsonl(src)
+    count = write_profiles(profiles, dst) if is_columnar_path(dst) else write_jsonl(profiles, dst)
+    print(f"Wrote {count} profiles to {dst}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,58 +1,201 @@
 # report_generator.py
 # Generates a simple HTML risk report
 
+from html import escape
 from pathlib import Path
 from datetime import datetime
 
 
-class ReportGenerator:
-    def create_html_report(self, events, output="risk_report.html"):
-        output_path = Path(output)
+COLUMNS = [
+    ("timestamp", "Timestamp"),
+    ("user", "User"),
+    ("event_type", "Event Type"),
+    ("source_ip", "Source IP"),
+    ("status", "Status"),
+    ("score", "Score"),
+    ("risk_level", "Risk Level"),
+    ("reason", "Reason"),
+]
+
+RISK_LEVEL_ORDER = ["Critical", "High", "Medium", "Low"]
+
+BUFFER_SIZE = 1024 * 1024
 
-        rows = []
-        for e in events:
-            rows.append(
-                f"<tr>"
-                f"<td>{e.get('timestamp','')}</td>"
-                f"<td>{e.get('user','')}</td>"
-                f"<td>{e.get('event_type','')}</td>"
-                f"<td>{e.get('source_ip','')}</td>"
-                f"<td>{e.get('status','')}</td>"
-                f"<td>{e.get('score','')}</td>"
-                f"<td>{e.get('risk_level','')}</td>"
-                f"<td>{e.get('reason','')}</td>"
-                f"</tr>"
-            )
-
-        html = f"""
+
+class ReportGenerator:
+    @staticmethod
+    def _head(title, generated_at):
+        return f"""
         <html>
         <head>
-            <title>Enterprise Risk Intelligence Report</title>
+            <title>{escape(title)}</title>
             <meta charset="utf-8" />
         </head>
         <body>
-            <h1>Enterprise Risk Intelligence Report</h1>
-            <p>Generated at: {datetime.utcnow().isoformat()}Z</p>
+            <h1>{escape(title)}</h1>
+            <p>Generated at: {generated_at}Z</p>
+        """
+
+    @staticmethod
+    def _table_open():
+        header_cells = "".join(f"<th>{label}</th>" for _, label in COLUMNS)
+        return f"""
             <table border="1" cellspacing="0" cellpadding="4">
                 <thead>
-                    <tr>
-                        <th>Timestamp</th>
-                        <th>User</th>
-                        <th>Event Type</th>
-                        <th>Source IP</th>
-                        <th>Status</th>
-                        <th>Score</th>
-                        <th>Risk Level</th>
-                        <th>Reason</th>
-                    </tr>
+                    <tr>{header_cells}</tr>
                 </thead>
                 <tbody>
-                    {''.join(rows)}
+                    """
+
+    @staticmethod
+    def _table_close():
+        return """
                 </tbody>
             </table>
-        </body>
-        </html>
         """
 
-        output_path.write_text(html, encoding="utf-8")
+    @staticmethod
+    def _row(e):
+        # All fields come from log data, so they are HTML-escaped
+        cells = "".join(f"<td>{escape(str(e.get(key, '')))}</td>" for key, _ in COLUMNS)
+        return f"<tr>{cells}</tr>"
+
+    def create_html_report(self, events, output="risk_report.html"):
+        """
+        Writes the report incrementally: rows are streamed to a buffered
+        file handle, so `events` can be a generator of any length.
+        Returns the number of rows written.
+        """
+        output_path = Path(output)
+        title = "Enterprise Risk Intelligence Report"
+
+        count = 0
+        with output_path.open("w", encoding="utf-8", buffering=BUFFER_SIZE) as f:
+            f.write(self._head(title, datetime.utcnow().isoformat()))
+            f.write(self._table_open())
+            for e in events:
+                f.write(self._row(e))
+                count += 1
+            f.write(self._table_close())
+            f.write("</body>\n</html>\n")
+
         print(f"Risk report written to: {output_path.resolve()}")
+        return count
+
+    # ------------------------------------------------------------
+    # Paginated report for very large event volumes
+    # ------------------------------------------------------------
+    def create_paginated_report(self, events, output_dir="risk_report", page_size=5000):
+        """
+        Streams events into page-00001.html, page-00002.html, ... of at most
+        page_size rows each, then writes index.html with overall and
+        per-page risk level summaries. Only one page is open at a time and
+        only counters are kept, so memory is flat for any number of events.
+        Returns the summary dict used for the index.
+        """
+        out_dir = Path(output_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        generated_at = datetime.utcnow().isoformat()
+
+        totals = {}
+        score_sums = {}
+        pages = []  # (file name, first row, last row, level counts)
+
+        f = None
+        page_counts = {}
+        rows_in_page = 0
+        row_number = 0
+
+        try:
+            for e in events:
+                if f is None or rows_in_page >= page_size:
+                    if f is not None:
+                        self._close_page(f, len(pages), has_next=True)
+                        pages[-1] = pages[-1][:2] + (row_number, page_counts)
+                    page_counts = {}
+                    rows_in_page = 0
+                    name = f"page-{len(pages) + 1:05d}.html"
+                    pages.append((name, row_number + 1, row_number, page_counts))
+                    f = (out_dir / name).open("w", encoding="utf-8", buffering=BUFFER_SIZE)
+                    f.write(self._head(f"Risk Report – page {len(pages)}", generated_at))
+                    f.write(self._nav(len(pages), has_next=False))
+                    f.write(self._table_open())
+
+                f.write(self._row(e))
+                rows_in_page += 1
+                row_number += 1
+
+                level = str(e.get("risk_level", "") or "Unknown")
+                page_counts[level] = page_counts.get(level, 0) + 1
+                totals[level] = totals.get(level, 0) + 1
+                score = e.get("score")
+                if isinstance(score, (int, float)):
+                    score_sums[level] = score_sums.get(level, 0) + score
+        finally:
+            if f is not None:
+                self._close_page(f, len(pages), has_next=False)
+                pages[-1] = pages[-1][:2] + (row_number, page_counts)
+
+        summary = {
+            "rows": row_number,
+            "pages": len(pages),
+            "by_level": totals,
+            "avg_score_by_level": {
+                level: round(score_sums[level] / totals[level], 2) for level in score_sums
+            },
+        }
+        self._write_index(out_dir / "index.html", pages, summary, generated_at)
+
+        print(f"Risk report written to: {(out_dir / 'index.html').resolve()} ({len(pages)} pages)")
+        return summary
+
+    def _nav(self, page_number, has_next):
+        links = ['<a href="index.html">Index</a>']
+        if page_number > 1:
+            links.append(f'<a href="page-{page_number - 1:05d}.html">Previous</a>')
+        if has_next:
+            links.append(f'<a href="page-{page_number + 1:05d}.html">Next</a>')
+        return f"<p>{' | '.join(links)}</p>"
+
+    def _close_page(self, f, page_number, has_next):
+        f.write(self._table_close())
+        # The "Next" link is only known once the following row arrives
+        f.write(self._nav(page_number, has_next))
+        f.write("</body>\n</html>\n")
+        f.close()
+
+    @staticmethod
+    def _ordered_levels(counts):
+        known = [level for level in RISK_LEVEL_ORDER if level in counts]
+        return known + sorted(level for level in counts if level not in RISK_LEVEL_ORDER)
+
+    def _write_index(self, path, pages, summary, generated_at):
+        levels = self._ordered_levels(summary["by_level"])
+
+        with path.open("w", encoding="utf-8", buffering=BUFFER_SIZE) as f:
+            f.write(self._head("Enterprise Risk Intelligence Report", generated_at))
+            f.write(f"<p>Total scored events: {summary['rows']:,} across {summary['pages']} pages</p>")
+
+            f.write("<h2>Summary by risk level</h2>")
+            f.write('<table border="1" cellspacing="0" cellpadding="4">')
+            f.write("<tr><th>Risk Level</th><th>Events</th><th>Average Score</th></tr>")
+            for level in levels:
+                avg = summary["avg_score_by_level"].get(level, "")
+                f.write(
+                    f"<tr><td>{escape(level)}</td>"
+                    f"<td>{summary['by_level'][level]:,}</td><td>{avg}</td></tr>"
+                )
+            f.write("</table>")
+
+            f.write("<h2>Pages</h2>")
+            f.write('<table border="1" cellspacing="0" cellpadding="4">')
+            level_headers = "".join(f"<th>{escape(level)}</th>" for level in levels)
+            f.write(f"<tr><th>Page</th><th>Rows</th>{level_headers}</tr>")
+            for i, (name, first, last, counts) in enumerate(pages, start=1):
+                level_cells = "".join(f"<td>{counts.get(level, 0):,}</td>" for level in levels)
+                f.write(
+                    f'<tr><td><a href="{name}">Page {i}</a></td>'
+                    f"<td>{first:,}–{last:,}</td>{level_cells}</tr>"
+                )
+            f.write("</table>")
+            f.write("</body>\n</html>\n")
@@ -0,0 +1,206 @@
+# result_cache.py
+# Opt-in memoization of RiskEngine results for resubmitted profiles
+#
+# Entries are keyed by a canonical hash of the profile JSON combined with
+# the engine's scoring version (rule digest, category/blend weights, model
+# identity), so changing any of those makes every old entry unreachable.
+
+import hashlib
+import json
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+def canonical_json(data: Any) -> str:
+    """Key-order and whitespace independent JSON encoding."""
+    return json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def profile_key(profile: Dict[str, Any], version: str) -> str:
+    h = hashlib.sha256(version.encode("utf-8"))
+    h.update(b"\0")
+    h.update(canonical_json(profile).encode("utf-8"))
+    return h.hexdigest()
+
+
+class ResultCache(ABC):
+    """Base class: hit/miss accounting around get_many/put_many."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.get_many([key])[0]
+
+    def put(self, key: str, result: Dict[str, Any]):
+        self.put_many([(key, result)])
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[Dict[str, Any]]]:
+        results = self._lookup(keys)
+        found = sum(r is not None for r in results)
+        self.hits += found
+        self.misses += len(results) - found
+        return results
+
+    @abstractmethod
+    def put_many(self, items: Iterable[Tuple[str, Dict[str, Any]]]):
+        """Stores (key, result) pairs."""
+
+    @abstractmethod
+    def _lookup(self, keys: Sequence[str]) -> List[Optional[Dict[str, Any]]]:
+        """One result per key, None if absent; get_many does the accounting."""
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": len(self),
+        }
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """Number of stored entries."""
+
+
+class MemoryResultCache(ResultCache):
+    """
+    In-process LRU holding at most max_entries results. Cached results are
+    returned as-is, so callers must not mutate them.
+    """
+
+    def __init__(self, max_entries: int = 100_000):
+        super().__init__()
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _lookup(self, keys):
+        entries = self._entries
+        results = []
+        with self._lock:
+            for key in keys:
+                result = entries.get(key)
+                if result is not None:
+                    entries.move_to_end(key)
+                results.append(result)
+        return results
+
+    def put_many(self, items):
+        entries = self._entries
+        with self._lock:
+            for key, result in items:
+                entries[key] = result
+                entries.move_to_end(key)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+
+    def __getstate__(self):
+        # Copies (e.g. in pool workers) start empty: RiskEngine looks
+        # results up in the process that owns the cache
+        state = self.__dict__.copy()
+        state["_entries"] = OrderedDict()
+        state["_lock"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+class SQLiteResultCache(ResultCache):
+    """
+    Persistent cache in a SQLite file, shared by runs and by worker
+    processes (WAL mode). With max_entries, the least recently used rows
+    are trimmed after each write batch.
+    """
+
+    def __init__(self, path, max_entries: Optional[int] = None):
+        super().__init__()
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self._conn: Optional["sqlite3.Connection"] = None
+        self._tick = 0
+
+    @property
+    def conn(self) -> "sqlite3.Connection":
+        if self._conn is None:
+            import sqlite3
+
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, result TEXT NOT NULL, used INTEGER NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS results_used ON results (used)")
+            row = conn.execute("SELECT MAX(used) FROM results").fetchone()
+            self._tick = row[0] or 0
+            self._conn = conn
+        return self._conn
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def _next_tick(self) -> int:
+        self._tick += 1
+        return self._tick
+
+    def _lookup(self, keys):
+        if not keys:
+            return []
+        conn = self.conn
+        found = {}
+        # Stay under SQLite's bound-parameter limit
+        for i in range(0, len(keys), 500):
+            batch = keys[i:i + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = conn.execute(
+                f"SELECT key, result FROM results WHERE key IN ({placeholders})", batch
+            ).fetchall()
+            found.update(rows)
+
+        if found and self.max_entries:
+            tick = self._next_tick()
+            with conn:
+                conn.executemany("UPDATE results SET used = ? WHERE key = ?", [(tick, k) for k in found])
+        return [json.loads(found[k]) if k in found else None for k in keys]
+
+    def put_many(self, items):
+        items = list(items)
+        if not items:
+            return
+        conn = self.conn
+        tick = self._next_tick()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO results (key, result, used) VALUES (?, ?, ?)",
+                [(key, json.dumps(result), tick) for key, result in items],
+            )
+            if self.max_entries:
+                conn.execute(
+                    "DELETE FROM results WHERE key IN ("
+                    "SELECT key FROM results ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __getstate__(self):
+        # Connections cannot cross processes; each worker reopens the file
+        state = self.__dict__.copy()
+        state["_conn"] = None
+        return state
@@ -1,23 +1,352 @@
 # risk_analyzer.py
 # Main orchestrator for the risk intelligence engine
 
+import argparse
+import json
+import os
+import time
+
 from anomaly_detector import AnomalyDetector
+from arrow_io import COLUMNAR_SUFFIXES, RecordWriter, is_columnar_path
+from bruteforce_detector import BruteForceDetector
+from entity_risk import DEFAULT_HALF_LIFE, EntityRisk
+from incremental import run_incremental_analysis
+from kri_store import KRIStore
+from metrics import NULL_METRICS, PROFILERS, make_metrics, profiled
 from risk_score_engine import RiskScorer
+from rule_spec import RuleSet
+from watchlist import open_watchlist
+
+
+def scored_schema(pa):
+    """Columns of the --save-scored Parquet/Arrow file."""
+    return pa.schema(
+        [
+            ("timestamp", pa.string()),
+            ("user", pa.string()),
+            ("event_type", pa.string()),
+            ("source_ip", pa.string()),
+            ("status", pa.string()),
+            ("reason", pa.string()),
+            ("score", pa.int64()),
+            ("risk_level", pa.string()),
+        ]
+    )
+
+
+def _counted(items, counts, key):
+    """Passes items through unchanged while counting them."""
+    for item in items:
+        counts[key] += 1
+        yield item
+
+
+def run_risk_analysis(
+    log_path="data/system_logs/",
+    output="risk_report.html",
+    stream=False,
+    rules=None,
+    bruteforce=None,
+    page_size=None,
+    workers=None,
+    metrics=None,
+    save_scored=None,
+    kri_store=None,
+    entity_risk=None,
+    watchlist=None,
+):
+    """
+    save_scored: optional .parquet/.arrow path that also receives every
+    scored anomaly as a typed table.
 
+    kri_store: optional kri_store.KRIStore that every row and scored
+    anomaly is also counted into (stage "kri" in batch mode).
 
-def run_risk_analysis():
-    detector = AnomalyDetector()
-    scorer = RiskScorer()
+    entity_risk: optional entity_risk.EntityRisk that every scored anomaly
+    is also added to.
 
-    logs = detector.load_logs("data/system_logs/")
-    print(f"Loaded {len(logs)} log entries.")
+    watchlist: optional watchlist.Watchlist; events from a listed user or
+    source IP are reported as anomalies.
 
-    anomalies = detector.detect_anomalies(logs)
+    With a metrics.Metrics, records per-stage wall time (timer "stage":
+    load, detect, score, report, save, kri, entities), row/anomaly counters, the score
+    distribution by risk_level and an events_per_second gauge.
+
+    With several files and workers > 1 (and no kri_store, which needs
+    every row), files are parsed in worker processes that only send back
+    the rows the stateless rules flag (AnomalyDetector.scan_logs); the
+    "load" stage then includes that filtering.
+    """
+    metrics = metrics if metrics is not None else NULL_METRICS
+    if bruteforce is None:
+        # KRI1: 3 failed logins per user/IP within 5 minutes
+        bruteforce = BruteForceDetector(threshold=3, window_seconds=300)
+
+    detector = AnomalyDetector(rules=rules, bruteforce=bruteforce, metrics=metrics, watchlist=watchlist)
+    scorer = RiskScorer(rules=rules, metrics=metrics)
+
+    if stream:
+        return run_streaming_analysis(
+            detector, scorer, log_path, output, page_size, workers, metrics, save_scored, kri_store, entity_risk
+        )
+
+    started = time.perf_counter()
+    with metrics.timer("stage", stage="load"):
+        scanned = detector.scan_logs(log_path, workers=workers) if kri_store is None else None
+        if scanned is None:
+            logs = detector.load_logs(log_path, workers=workers)
+            rows = len(logs)
+        else:
+            rows, logs = scanned
+            logs = list(logs)
+    print(f"Loaded {rows} log entries.")
+
+    with metrics.timer("stage", stage="detect"):
+        anomalies = detector.detect_anomalies(logs)
     print(f"Detected {len(anomalies)} anomalies.")
 
-    scored = scorer.score_events(anomalies)
-    scorer.generate_report(scored, output="risk_report.html")
+    with metrics.timer("stage", stage="score"):
+        scored = scorer.score_events(anomalies)
+    with metrics.timer("stage", stage="report"):
+        scorer.generate_report(scored, output=output, page_size=page_size)
+    if save_scored:
+        with metrics.timer("stage", stage="save"), RecordWriter(save_scored, schema=scored_schema) as writer:
+            writer.write_all(scored)
+        print(f"Saved {writer.count} scored anomalies to {save_scored}")
+    if kri_store is not None:
+        with metrics.timer("stage", stage="kri"):
+            kri_store.add_events(logs)
+            kri_store.add_anomalies(scored)
+            kri_store.flush()
+    if entity_risk is not None:
+        with metrics.timer("stage", stage="entities"):
+            entity_risk.add_all(scored)
+    _record_throughput(metrics, rows, time.perf_counter() - started)
+
+
+def run_streaming_analysis(
+    detector,
+    scorer,
+    log_path,
+    output,
+    page_size=None,
+    workers=None,
+    metrics=None,
+    save_scored=None,
+    kri_store=None,
+    entity_risk=None,
+):
+    """
+    Constant-memory pipeline: rows are read, checked, scored and written to
+    the report one at a time, so the log file can be larger than RAM.
+
+    The stages are interleaved generators, so with metrics each one is
+    timed around its next() calls (sampled for the per-row read stage, see
+    metrics.timed_iter) and per-stage times are derived by subtracting the
+    upstream stage.
+
+    Multi-file input with workers > 1 and no kri_store is first filtered
+    in worker processes (AnomalyDetector.scan_logs), which spill the
+    flagged rows to temporary files; memory stays bounded, but the first
+    anomaly is only reported once every file has been parsed.
+    """
+    metrics = metrics if metrics is not None else NULL_METRICS
+    counts = {"logs": 0, "anomalies": 0}
+
+    started = time.perf_counter()
+    scanned = detector.scan_logs(log_path, workers=workers) if kri_store is None else None
+    if scanned is None:
+        logs = _counted(detector.iter_logs(log_path, workers=workers), counts, "logs")
+    else:
+        counts["logs"], logs = scanned
+    if kri_store is not None:
+        logs = kri_store.tee_events(logs)
+    logs = metrics.timed_iter(logs, "stream", stage="load")
+    anomalies = _counted(detector.detect_anomalies_stream(logs), counts, "anomalies")
+    # Anomalies are far fewer than rows, so those stages are timed on every item
+    anomalies = metrics.timed_iter(anomalies, "stream", every=1, stage="detect")
+    scored = metrics.timed_iter(scorer.score_events_stream(anomalies), "stream", every=1, stage="score")
+    if kri_store is not None:
+        scored = kri_store.tee_anomalies(scored)
+    if entity_risk is not None:
+        scored = entity_risk.tee(scored)
+    writer = RecordWriter(save_scored, schema=scored_schema) if save_scored else None
+    if writer is not None:
+        scored = writer.tee(scored)
+    try:
+        scorer.generate_report(scored, output=output, page_size=page_size)
+    finally:
+        if writer is not None:
+            writer.close()
+    elapsed = time.perf_counter() - started
+
+    if metrics.enabled:
+        # timed_iter totals are inclusive of every upstream stage
+        upstream = 0.0
+        for stage in ("load", "detect", "score"):
+            inclusive = metrics.total_seconds("stream", stage=stage)
+            metrics.observe("stage", max(inclusive - upstream, 0.0), stage=stage)
+            upstream = max(inclusive, upstream)
+        metrics.observe("stage", max(elapsed - upstream, 0.0), stage="report")
+        _record_throughput(metrics, counts["logs"], elapsed)
+
+    print(f"Loaded {counts['logs']} log entries.")
+    print(f"Detected {counts['anomalies']} anomalies.")
+    if writer is not None:
+        print(f"Saved {writer.count} scored anomalies to {save_scored}")
+    return counts
+
+
+def _record_throughput(metrics, rows, seconds):
+    metrics.observe("run", seconds)
+    if seconds > 0:
+        metrics.set_gauge("events_per_second", round(rows / seconds, 1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Enterprise Risk Intelligence Engine – log analysis")
+    parser.add_argument(
+        "--logs",
+        type=str,
+        default="data/system_logs/",
+        help="Log file (CSV, optionally compressed, or Parquet/Arrow), directory of them, or glob pattern.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="Processes parsing and pre-filtering multi-file input (threads with --kris).",
+    )
+    parser.add_argument(
+        "--output", type=str, help="HTML report path, default risk_report.html (a directory with --page-size)."
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Process logs row by row with constant memory (for files larger than RAM).",
+    )
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        help="Split the report into pages of this many rows plus an index.html.",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only process bytes appended since the last run (see --checkpoint).",
+    )
+    parser.add_argument("--checkpoint", type=str, default="risk_checkpoint.json", help="Checkpoint file for --incremental.")
+    parser.add_argument(
+        "--scored-output",
+        type=str,
+        default="scored_events.jsonl",
+        help="JSON Lines file that --incremental appends scored anomalies to.",
+    )
+    parser.add_argument(
+        "--save-scored",
+        type=str,
+        help="Also write the scored anomalies to this Parquet/Arrow file (" + ", ".join(COLUMNAR_SUFFIXES) + ").",
+    )
+    parser.add_argument(
+        "--kris",
+        action="store_true",
+        help="Print last-hour and last-day KRIs from minute/hour buckets (kept in the checkpoint with --incremental).",
+    )
+    parser.add_argument(
+        "--entities",
+        type=str,
+        help="Per-user/IP decayed risk snapshot to load, update and save (kept in the checkpoint with --incremental).",
+    )
+    parser.add_argument(
+        "--entity-half-life",
+        type=float,
+        help=f"Entity risk half-life in seconds (default: the snapshot's, else {DEFAULT_HALF_LIFE}).",
+    )
+    parser.add_argument("--top-entities", type=int, default=10, help="Riskiest users and IPs to print with --entities.")
+    parser.add_argument(
+        "--watchlist",
+        type=str,
+        help="Compiled watchlist (see watchlist.py): events from listed users or source IPs are anomalies.",
+    )
+    parser.add_argument("--rules", type=str, help="Optional JSON/YAML rule spec (see examples/rules.json).")
+    parser.add_argument("--bruteforce-threshold", type=int, default=3, help="KRI1: failed logins per user or IP that count as brute force.")
+    parser.add_argument("--bruteforce-window", type=int, default=300, help="KRI1: sliding window length in seconds.")
+    parser.add_argument(
+        "--metrics-out",
+        type=str,
+        help="Write stage timings and counters here (*.prom/*.txt: Prometheus text, else JSON; '-' for stderr).",
+    )
+    parser.add_argument("--metrics-sample", type=int, default=64, help="Time one row in N inside the hot loops.")
+    parser.add_argument("--profile", choices=PROFILERS, help="Run the analysis under a profiler.")
+    parser.add_argument("--profile-out", type=str, help="Profiler output (.prof for cProfile, .html for pyinstrument).")
+    args = parser.parse_args()
+    if args.save_scored and not is_columnar_path(args.save_scored):
+        parser.error("--save-scored must end in one of " + ", ".join(COLUMNAR_SUFFIXES))
+    if args.incremental:
+        # Incremental runs append scored anomalies to --scored-output instead
+        unsupported = [
+            flag
+            for flag, value in (
+                ("--output", args.output),
+                ("--stream", args.stream),
+                ("--page-size", args.page_size),
+                ("--save-scored", args.save_scored),
+            )
+            if value
+        ]
+        if unsupported:
+            parser.error(f"{', '.join(unsupported)} cannot be combined with --incremental (see --scored-output)")
+
+    rules = RuleSet(args.rules) if args.rules else None
+    bruteforce = BruteForceDetector(threshold=args.bruteforce_threshold, window_seconds=args.bruteforce_window)
+
+    metrics = make_metrics(bool(args.metrics_out), args.metrics_sample)
+    watchlist = open_watchlist(args.watchlist)
+    kri_store = KRIStore() if args.kris else None
+    entity_risk = None
+    if args.entities:
+        entity_risk = EntityRisk(half_life=args.entity_half_life)
+        if not args.incremental:
+            entity_risk.load(args.entities)
+
+    with profiled(args.profile, args.profile_out):
+        if args.incremental:
+            run_incremental_analysis(
+                args.logs,
+                checkpoint_path=args.checkpoint,
+                scored_output=args.scored_output,
+                rules=rules,
+                bruteforce=bruteforce,
+                metrics=metrics,
+                kri_store=kri_store,
+                entity_risk=entity_risk,
+                watchlist=watchlist,
+            )
+        else:
+            run_risk_analysis(
+                args.logs,
+                args.output or "risk_report.html",
+                stream=args.stream,
+                rules=rules,
+                bruteforce=bruteforce,
+                page_size=args.page_size,
+                workers=args.workers,
+                metrics=metrics,
+                save_scored=args.save_scored,
+                kri_store=kri_store,
+                entity_risk=entity_risk,
+                watchlist=watchlist,
+            )
+
+    if kri_store is not None:
+        print(json.dumps(kri_store.summary(), indent=2))
+    if entity_risk is not None:
+        entity_risk.save(args.entities)
+        for dimension in entity_risk.dimensions:
+            print(json.dumps({dimension: entity_risk.top(dimension, args.top_entities)}, indent=2))
+    if args.metrics_out:
+        metrics.dump(args.metrics_out)
 
 
 if __name__ == "__main__":
-    run_risk_analysis()
+    main()
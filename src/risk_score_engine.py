@@ -4,7 +4,12 @@
 # Phase 2: reflects expert-defined KRIs and risk levels.
 # (Based on inputs from the Technology Risk Analyst.)
 
+import time
+
+from log_event import LogEvent
+from metrics import NULL_METRICS
 from report_generator import ReportGenerator
+from rule_spec import resolve_rules
 
 
 class RiskScorer:
@@ -19,59 +24,108 @@ class RiskScorer:
     - KRI4: Suspicious login from unusual IP or pattern
     """
 
-    def __init__(self):
+    def __init__(self, rules=None, metrics=None):
+        # None (built-in defaults), CompiledRules, or a hot-reloadable RuleSet.
+        # Thresholds are defined in rule_spec.DEFAULT_RULE_SPEC.
+        self.rules_source = rules
+        self.refresh_rules()
+
+        # Optional metrics.Metrics: score distribution by risk_level
+        self.metrics = metrics if metrics is not None else NULL_METRICS
+
+    def refresh_rules(self):
+        """Picks up the current compiled rules (once per scoring run)."""
+        self.rules = resolve_rules(self.rules_source)
+
         # Base scores per event type (1–10)
-        self.base_scores = {
-            "login": 3,
-            "privilege_escalation": 9,  # KRI2
-            "data_export": 8,           # KRI3
-            "suspicious_login": 7,      # KRI4
-        }
+        self.base_scores = self.rules.base_scores
 
-        # Extra weight for failures (KRI1)
-        self.failed_bonus = 2
+        # Extra weight for failures, and for failed logins completing a
+        # brute-force burst (KRI1)
+        self.failed_bonus = self.rules.failed_bonus
+        self.bruteforce_bonus = self.rules.bruteforce_bonus
 
-    def score_events(self, anomalies):
+    def score_event(self, a):
         """
-        Input: list of anomaly dicts from AnomalyDetector.
-        Output: same list enriched with numeric 'score' and textual 'risk_level'.
+        Scores a single anomaly. A LogEvent is enriched in place and
+        returned; a dict is returned as an enriched copy.
         """
-        scored = []
-
-        for a in anomalies:
-            event_type = a.get("event_type", "").lower()
-            status = a.get("status", "").lower()
+        if isinstance(a, LogEvent):
+            a.score, a.risk_level = self.rules.score_event(
+                a.event_type, a.status == "failed", getattr(a, "burst", False)
+            )
+            return a
 
-            # Base score from event type; default to 5 (Medium) if unknown
-            score = self.base_scores.get(event_type, 5)
+        event_type = a.get("event_type", "").lower()
+        status = a.get("status", "").lower()
 
-            # KRI1: failed attempts are more risky
-            if status == "failed":
-                score += self.failed_bonus
+        # Precompiled decision table: base score (default 5 if unknown),
+        # KRI1 failed and brute-force bonuses, clamp to 1–10 and risk level
+        # in one lookup
+        score, level = self.rules.score_event(event_type, status == "failed", bool(a.get("burst")))
 
-            # Clamp to 1–10 range
-            score = max(1, min(score, 10))
+        enriched = dict(a)
+        enriched["score"] = score
+        enriched["risk_level"] = level
+        return enriched
 
-            # Map numeric score to enterprise risk level
-            if score >= 9:
-                level = "Critical"
-            elif score >= 7:
-                level = "High"
-            elif score >= 4:
-                level = "Medium"
-            else:
-                level = "Low"
+    def score_events_stream(self, anomalies):
+        """
+        Generator version of score_events: yields each scored anomaly as
+        soon as it arrives, so the pipeline never holds the full list.
+        """
+        self.refresh_rules()
+        if self.metrics.enabled:
+            yield from self._score_instrumented(anomalies)
+            return
+        for a in anomalies:
+            yield self.score_event(a)
 
-            enriched = dict(a)
-            enriched["score"] = score
-            enriched["risk_level"] = level
-            scored.append(enriched)
+    def _score_instrumented(self, anomalies):
+        metrics = self.metrics
+        every = metrics.sample_every
+        perf = time.perf_counter
+        score = self.score_event
+        levels = {}
+        n = sampled = 0
+        sampled_seconds = peak = 0.0
+        try:
+            for a in anomalies:
+                if n % every == 0:
+                    t = perf()
+                    scored = score(a)
+                    elapsed = perf() - t
+                    sampled_seconds += elapsed
+                    sampled += 1
+                    if elapsed > peak:
+                        peak = elapsed
+                else:
+                    scored = score(a)
+                n += 1
+                level = scored.get("risk_level")
+                levels[level] = levels.get(level, 0) + 1
+                yield scored
+        finally:
+            for level, count in levels.items():
+                metrics.incr("scored_events", count, risk_level=level)
+            if sampled:
+                metrics.observe("score_event", sampled_seconds, count=sampled, peak=peak)
 
-        return scored
+    def score_events(self, anomalies):
+        """
+        Input: list of anomaly dicts from AnomalyDetector.
+        Output: same list enriched with numeric 'score' and textual 'risk_level'.
+        """
+        return list(self.score_events_stream(anomalies))
 
-    def generate_report(self, scored_events, output="risk_report.html"):
+    def generate_report(self, scored_events, output="risk_report.html", page_size=None):
         """
         Delegates to the ReportGenerator to produce an HTML report.
+        scored_events may be a list or a generator (streaming mode).
+        With page_size, `output` is a directory of paginated pages plus
+        an index.html summary.
         """
         generator = ReportGenerator()
-        generator.create_html_report(scored_events, output=output)
+        if page_size:
+            return generator.create_paginated_report(scored_events, output_dir=output, page_size=page_size)
+        return generator.create_html_report(scored_events, output=output)
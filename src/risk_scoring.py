@@ -1,7 +1,16 @@
+import hashlib
 import json
+import os
+import sys
+from collections import deque
+from itertools import islice
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterable, Iterator, List, Optional
 
+from .arrow_io import is_columnar_path
+from .metrics import NULL_METRICS, PROFILERS, make_metrics, profiled
+from .result_cache import MemoryResultCache, SQLiteResultCache, canonical_json, profile_key
+from .rule_spec import RuleSet, resolve_rules
 from .rules_engine import score_all_categories
 
 
@@ -10,10 +19,40 @@ class RiskEngine:
     Hybrid risk engine that combines rule-based scoring with an optional ML component.
     If an ML model is provided, its probability score is blended with the rule-based
     trust score to produce a final risk score.
+
+    The model can be passed as an object or as model_path, a joblib file that
+    is memory-mapped on first use. With model_path, pickled engines (e.g. for
+    pool workers) carry only the path, and each process loads the model once.
+
+    An optional result cache (see result_cache) skips scoring for profiles
+    seen before under the same rules, weights and model.
+
+    An optional metrics.Metrics records time per scoring stage (rules, ml,
+    assemble), profile counts by risk band and cache hits; pool workers
+    send theirs back to be merged.
+
+    An optional watchlist.Watchlist screens every value of a profile's
+    `identity` section (names, document numbers, e-mails, IPs, ...); a
+    match sets compliance.sanctions_or_watchlists before scoring.
     """
 
-    def __init__(self, model: Optional[Any] = None):
-        self.model = model
+    def __init__(
+        self,
+        model: Optional[Any] = None,
+        rules: Optional[Any] = None,
+        model_path: Optional[str] = None,
+        cache: Optional[Any] = None,
+        metrics: Optional[Any] = None,
+        watchlist: Optional[Any] = None,
+    ):
+        self._model = model
+        self.model_path = model_path
+        self.cache = cache
+        self.metrics = metrics if metrics is not None else NULL_METRICS
+        self.watchlist = watchlist
+
+        # Rule thresholds: None (defaults), CompiledRules or a hot-reloadable RuleSet
+        self.rules = rules
 
         # Weight for each risk category in the rule-based score
         self.category_weights = {
@@ -28,6 +67,51 @@ class RiskEngine:
         self.rule_weight = 0.60
         self.ml_weight = 0.40
 
+        # Final score cut-offs for the High and Medium risk bands
+        self.high_threshold = 70
+        self.medium_threshold = 40
+
+    @property
+    def model(self) -> Optional[Any]:
+        if self._model is None and self.model_path:
+            from .ml_model import load_model
+
+            self._model = load_model(self.model_path)
+        return self._model
+
+    @model.setter
+    def model(self, value: Optional[Any]):
+        self._model = value
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if self.model_path:
+            state["_model"] = None  # reloaded (memory-mapped) in the receiving process
+        return state
+
+    # ------------------------------------------------------------
+    # Version of everything that affects a result, for cache keys
+    # ------------------------------------------------------------
+    def model_id(self) -> Optional[List[Any]]:
+        if self.model_path:
+            st = os.stat(self.model_path)
+            return [str(self.model_path), st.st_mtime_ns, st.st_size]
+        if self._model is not None:
+            # In-memory model without a file: only valid for this object
+            return [type(self._model).__name__, id(self._model)]
+        return None
+
+    def cache_version(self) -> str:
+        version = {
+            "rules": resolve_rules(self.rules).digest,
+            "category_weights": self.category_weights,
+            "rule_weight": self.rule_weight,
+            "ml_weight": self.ml_weight,
+            "bands": [self.high_threshold, self.medium_threshold],
+            "model": self.model_id(),
+        }
+        return hashlib.sha256(canonical_json(version).encode("utf-8")).hexdigest()
+
     # ------------------------------------------------------------
     # Computes weighted rule score between 0 – 100
     # ------------------------------------------------------------
@@ -49,13 +133,16 @@ class RiskEngine:
     # Optional ML model risk score (0–1)
     # ------------------------------------------------------------
     def compute_ml_score(self, profile: Dict[str, Any]) -> Optional[float]:
-        if self.model is None:
-            return None
+        return self.compute_ml_scores([profile])[0]
+
+    def compute_ml_scores(self, profiles: List[Dict[str, Any]]) -> List[Optional[float]]:
+        """Positive-class probabilities for a batch, from one predict_proba call."""
+        model = self.model
+        if model is None:
+            return [None] * len(profiles)
+        from .ml_model import predict_risk
 
-        # Placeholder — in real usage you would extract structured features
-        # and feed them into the ML classifier.
-        # Example: self.model.predict_proba([[feature_vector]])[0][1]
-        return 0.50  # Neutral placeholder
+        return predict_risk(model, profiles)
 
     # ------------------------------------------------------------
     # Combine rule-based score and ML score into final risk score (0–100)
@@ -74,22 +161,51 @@ class RiskEngine:
     # Risk band based on final risk score
     # ------------------------------------------------------------
     @staticmethod
-    def risk_band(score: float) -> str:
-        if score >= 70:
+    def risk_band(score: float, high: float = 70, medium: float = 40) -> str:
+        if score >= high:
             return "High"
-        elif score >= 40:
+        elif score >= medium:
             return "Medium"
         return "Low"
 
+    # ------------------------------------------------------------
+    # Watchlist screening of profile identifiers
+    # ------------------------------------------------------------
+    def screen_profile(self, profile: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        The profile with compliance.sanctions_or_watchlists set if any
+        identity value is listed; otherwise the profile itself.
+        """
+        identity = profile.get("identity") if self.watchlist is not None else None
+        if not isinstance(identity, dict):
+            return profile
+        for value in identity.values():
+            for v in value if isinstance(value, list) else (value,):
+                # Numeric ids are screened as their text, never as packed IPs
+                if isinstance(v, int) and not isinstance(v, bool):
+                    v = str(v)
+                if isinstance(v, str) and self.watchlist.matches(v):
+                    compliance = profile.get("compliance")
+                    compliance = dict(compliance) if isinstance(compliance, dict) else {}
+                    compliance["sanctions_or_watchlists"] = True
+                    return {**profile, "compliance": compliance}
+        return profile
+
     # ------------------------------------------------------------
     # Main scoring workflow
     # ------------------------------------------------------------
     def score_profile(self, profile: Dict[str, Any]) -> Dict[str, Any]:
-        category_scores, notes = score_all_categories(profile)
+        return self.score_batch([profile])[0]
+
+    def _build_result(
+        self,
+        category_scores: Dict[str, int],
+        notes: Dict[str, List[str]],
+        ml_score: Optional[float],
+    ) -> Dict[str, Any]:
         rule_score = self.compute_rule_score(category_scores)
-        ml_score = self.compute_ml_score(profile)
         final_score = self.combine_scores(rule_score, ml_score)
-        band = self.risk_band(final_score)
+        band = self.risk_band(final_score, self.high_threshold, self.medium_threshold)
 
         combined_notes = []
         for cat, n_list in notes.items():
@@ -105,10 +221,255 @@ class RiskEngine:
             "notes": combined_notes,
         }
 
+    # ------------------------------------------------------------
+    # Batch scoring
+    # ------------------------------------------------------------
+    def score_batch(self, profiles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if self.watchlist is not None:
+            # Before cache keys are taken, so a list update changes the key
+            profiles = [self.screen_profile(p) for p in profiles]
+        if self.cache is None:
+            results = self._score_uncached(profiles)
+        else:
+            version = self.cache_version()
+            keys = [profile_key(p, version) for p in profiles]
+            results = self.cache.get_many(keys)
+
+            missing = [i for i, r in enumerate(results) if r is None]
+            if missing:
+                scored = self._score_uncached([profiles[i] for i in missing])
+                self.cache.put_many((keys[i], r) for i, r in zip(missing, scored))
+                for i, r in zip(missing, scored):
+                    results[i] = r
+            self.metrics.incr("profile_cache_hits", len(profiles) - len(missing))
+
+        if self.metrics.enabled:
+            self._count_bands(results)
+        return results
+
+    def _count_bands(self, results: List[Dict[str, Any]]):
+        bands: Dict[str, int] = {}
+        for r in results:
+            bands[r["risk_band"]] = bands.get(r["risk_band"], 0) + 1
+        for band, count in bands.items():
+            self.metrics.incr("profiles_scored", count, risk_band=band)
+
+    def _score_uncached(self, profiles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        metrics = self.metrics
+        rules = resolve_rules(self.rules)
+        with metrics.timer("profile_stage", stage="rules"):
+            rule_results = [score_all_categories(p, rules) for p in profiles]
+        with metrics.timer("profile_stage", stage="ml"):
+            ml_scores = self.compute_ml_scores(profiles)
+        # Weighting, blending, banding and note assembly
+        with metrics.timer("profile_stage", stage="assemble"):
+            return [
+                self._build_result(category_scores, notes, ml_score)
+                for (category_scores, notes), ml_score in zip(rule_results, ml_scores)
+            ]
+
+    def score_json_batch(self, lines: List[str]) -> List[str]:
+        """Parses, scores and re-serialises a batch of JSON Lines records."""
+        results = self.score_batch([json.loads(line) for line in lines])
+        return [json.dumps(r) for r in results]
+
+    def score_profiles(
+        self,
+        profiles: Iterable[Dict[str, Any]],
+        workers: Optional[int] = None,
+        chunksize: int = 256,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Scores an iterable of profiles and yields results in input order.
+
+        With workers > 1 the profiles are split into chunks of `chunksize`
+        and fanned out over a process pool. At most 2 * workers chunks are
+        in flight at once, so memory stays bounded for any input size.
+        """
+        return self._map_chunks("score_batch", profiles, workers, chunksize)
+
+    def score_json_lines(
+        self,
+        lines: Iterable[str],
+        workers: Optional[int] = None,
+        chunksize: int = 256,
+    ) -> Iterator[str]:
+        """
+        Like score_profiles, but takes raw JSON Lines and yields serialised
+        results, so JSON parsing and encoding also run in the workers.
+        """
+        lines = (line for line in lines if line.strip())
+        return self._map_chunks("score_json_batch", lines, workers, chunksize)
+
+    def _map_chunks(self, method: str, items: Iterable[Any], workers: Optional[int], chunksize: int):
+        if not workers or workers <= 1:
+            for chunk in _chunked(items, chunksize):
+                yield from getattr(self, method)(chunk)
+            return
+
+        if self.cache is not None:
+            yield from self._map_cached(method, items, workers, chunksize)
+            return
+
+        for results in self._pool_map(method, _chunked(items, chunksize), workers):
+            yield from results
+
+    def _map_cached(self, method: str, items: Iterable[Any], workers: int, chunksize: int):
+        """
+        Pool scoring with the result cache kept in this process: each chunk
+        is looked up here and only its misses go to the workers (which
+        would otherwise each get an empty copy of an in-memory cache, and
+        whose hit/miss counts would never come back). JSON Lines input is
+        therefore parsed here. Profiles repeated within the chunks in
+        flight (2 * workers) are scored again, as within one chunk.
+        """
+        as_json = method == "score_json_batch"
+        version = self.cache_version()
+        looked_up = deque()
+
+        def misses():
+            for chunk in _chunked(items, chunksize):
+                profiles = [json.loads(line) for line in chunk] if as_json else chunk
+                if self.watchlist is not None:
+                    profiles = [self.screen_profile(p) for p in profiles]
+                keys = [profile_key(p, version) for p in profiles]
+                results = self.cache.get_many(keys)
+                missing = [i for i, r in enumerate(results) if r is None]
+                looked_up.append((keys, results, missing))
+                yield [profiles[i] for i in missing]
+
+        for scored in self._pool_map("_score_uncached", misses(), workers):
+            keys, results, missing = looked_up.popleft()
+            if scored:
+                self.cache.put_many((keys[i], r) for i, r in zip(missing, scored))
+                for i, r in zip(missing, scored):
+                    results[i] = r
+            self.metrics.incr("profile_cache_hits", len(results) - len(missing))
+            if self.metrics.enabled:
+                self._count_bands(results)
+            if as_json:
+                yield from (json.dumps(r) for r in results)
+            else:
+                yield from results
+
+    def _pool_map(self, method: str, chunks: Iterable[List[Any]], workers: int) -> Iterator[List[Any]]:
+        """Runs `method` on each chunk in a process pool; yields each chunk's results in order."""
+        # With metrics on, workers return a snapshot alongside each chunk
+        metered = self.metrics.enabled
+        run = _run_chunk_metered if metered else _run_chunk
+
+        def results(future):
+            if future is None:  # empty chunk, nothing was submitted
+                return []
+            if not metered:
+                return future.result()
+            chunk_results, snapshot = future.result()
+            self.metrics.merge(snapshot)
+            return chunk_results
+
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(self,)
+        ) as pool:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(pool.submit(run, method, chunk) if chunk else None)
+                if len(pending) >= workers * 2:
+                    yield results(pending.popleft())
+            while pending:
+                yield results(pending.popleft())
+
+
+# ------------------------------------------------------------
+# Process pool helpers
+# ------------------------------------------------------------
+_WORKER_ENGINE: Optional[RiskEngine] = None
+
+
+def _init_worker(engine: RiskEngine):
+    # Each worker process receives the engine once, not once per chunk
+    global _WORKER_ENGINE
+    _WORKER_ENGINE = engine
+
+
+def _run_chunk(method: str, chunk: List[Any]) -> List[Any]:
+    return getattr(_WORKER_ENGINE, method)(chunk)
+
+
+def _run_chunk_metered(method: str, chunk: List[Any]):
+    # Only this chunk's metrics go back, so the parent can simply add them up
+    metrics = _WORKER_ENGINE.metrics
+    metrics.reset()
+    results = getattr(_WORKER_ENGINE, method)(chunk)
+    return results, metrics.snapshot()
+
+
+def _chunked(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    it = iter(items)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
 
 # ------------------------------------------------------------
 # Helpers for CLI usage
 # ------------------------------------------------------------
+def make_result_cache(db_path: Optional[str] = None, size: int = 0):
+    """SQLite cache if db_path is given, else an in-memory LRU if size > 0."""
+    if db_path:
+        return SQLiteResultCache(db_path, max_entries=size or None)
+    if size > 0:
+        return MemoryResultCache(size)
+    return None
+
+
+def engine_from_args(args, engines: Optional[Dict[Any, RiskEngine]] = None) -> RiskEngine:
+    """
+    The RiskEngine for parsed CLI arguments (--rules, --model, --cache-db,
+    --cache-size, --metrics-out, --watchlist). With an `engines` dict (kept by
+    cli_daemon between calls) an engine built for the same configuration
+    is reused, with its metrics reset.
+    """
+    key = None
+    if engines is not None:
+        model_id = None
+        if args.model:
+            st = os.stat(args.model)
+            model_id = (os.path.abspath(args.model), st.st_mtime_ns, st.st_size)
+        watchlist_id = None
+        if args.watchlist:
+            st = os.stat(args.watchlist)
+            watchlist_id = (os.path.abspath(args.watchlist), st.st_mtime_ns, st.st_size)
+        key = (
+            os.path.abspath(args.rules) if args.rules else None,
+            model_id,
+            os.path.abspath(args.cache_db) if args.cache_db else None,
+            args.cache_size,
+            bool(args.metrics_out),
+            watchlist_id,
+        )
+        engine = engines.get(key)
+        if engine is not None:
+            engine.metrics.reset()
+            return engine
+
+    from .watchlist import open_watchlist
+
+    engine = RiskEngine(
+        rules=RuleSet(args.rules) if args.rules else None,
+        model_path=args.model,
+        cache=make_result_cache(args.cache_db, args.cache_size),
+        metrics=make_metrics(bool(args.metrics_out)),
+        watchlist=open_watchlist(args.watchlist),
+    )
+    if engines is not None:
+        engines[key] = engine
+    return engine
+
+
 def load_json(path: Path) -> Dict[str, Any]:
     with path.open("r", encoding="utf-8") as f:
         return json.load(f)
@@ -119,24 +480,147 @@ def save_json(data: Dict[str, Any], path: Path):
         json.dump(data, f, indent=4)
 
 
+def iter_jsonl(path: Path) -> Iterator[Dict[str, Any]]:
+    """Yields one profile per non-blank line of a JSON Lines file."""
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def write_jsonl(records: Iterable[Any], path: Optional[Path] = None) -> int:
+    """
+    Writes one JSON object per line to path (or stdout). Records may be dicts
+    or already-serialised JSON strings. Returns the count.
+    """
+    count = 0
+    f = path.open("w", encoding="utf-8") if path else sys.stdout
+    try:
+        for record in records:
+            f.write(record if isinstance(record, str) else json.dumps(record))
+            f.write("\n")
+            count += 1
+    finally:
+        if path:
+            f.close()
+    return count
+
+
+def score_file(
+    engine: RiskEngine,
+    input_path: Path,
+    output_path: Optional[Path] = None,
+    workers: Optional[int] = None,
+    chunksize: int = 256,
+) -> int:
+    """
+    Batch-scores a JSON Lines or Parquet/Arrow file of profiles. Results
+    go to output_path as Parquet/Arrow (by extension) or JSON Lines, or to
+    stdout as JSON Lines. Returns the count.
+    """
+    columnar_out = output_path is not None and is_columnar_path(output_path)
+    if not is_columnar_path(input_path) and not columnar_out:
+        # JSON in and out: parsing and encoding stay in the workers
+        with input_path.open("r", encoding="utf-8") as f:
+            return write_jsonl(engine.score_json_lines(f, workers=workers, chunksize=chunksize), output_path)
+
+    from .profile_io import iter_profiles, write_results
+
+    profiles = iter_profiles(input_path) if is_columnar_path(input_path) else iter_jsonl(input_path)
+    results = engine.score_profiles(profiles, workers=workers, chunksize=chunksize)
+    if columnar_out:
+        return write_results(results, output_path)
+    return write_jsonl(results, output_path)
+
+
 # ------------------------------------------------------------
 # CLI entry point
 # ------------------------------------------------------------
-def main():
+def build_parser():
     import argparse
 
     parser = argparse.ArgumentParser(description="Enterprise Risk Intelligence Engine")
-    parser.add_argument("input", type=str, help="Path to input JSON profile.")
-    parser.add_argument("--output", type=str, help="Optional output JSON file.")
-    args = parser.parse_args()
-
+    parser.add_argument("input", type=str, help="Path to input JSON profile (or a .parquet/.arrow batch).")
+    parser.add_argument("--output", type=str, help="Optional output JSON file (.parquet/.arrow in batch mode).")
+    parser.add_argument("--jsonl", action="store_true", help="Input and output are JSON Lines (one profile per line).")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes for --jsonl and --sweep.")
+    parser.add_argument("--chunksize", type=int, default=256, help="Profiles per worker task in --jsonl mode.")
+    parser.add_argument(
+        "--sweep",
+        type=str,
+        help="Weight/threshold grid (JSON, see calibration.py): report band shifts per configuration instead of scoring.",
+    )
+    parser.add_argument("--score-cache", type=str, help="Category score matrix (.npy) reused by --sweep runs.")
+    parser.add_argument("--rules", type=str, help="Optional JSON/YAML rule spec (see examples/rules.json).")
+    parser.add_argument("--model", type=str, help="Optional joblib classifier (predict_proba) to blend in.")
+    parser.add_argument("--cache-db", type=str, help="Optional SQLite file caching results of unchanged profiles.")
+    parser.add_argument("--cache-size", type=int, default=0, help="In-memory result cache entries (0 disables).")
+    parser.add_argument("--watchlist", type=str, help="Compiled watchlist screening each profile's identity values.")
+    parser.add_argument(
+        "--metrics-out",
+        type=str,
+        help="Write stage timings and counters here (*.prom/*.txt: Prometheus text, else JSON; '-' for stderr).",
+    )
+    parser.add_argument("--profile", choices=PROFILERS, help="Run scoring under a profiler.")
+    parser.add_argument("--profile-out", type=str, help="Profiler output (.prof for cProfile, .html for pyinstrument).")
+    parser.add_argument(
+        "--daemon",
+        type=str,
+        help="Run in the cli_daemon listening on this unix socket (default $RISK_ENGINE_DAEMON), if one is.",
+    )
+    return parser
+
+
+def main(argv: Optional[List[str]] = None):
+    from .cli_daemon import call_daemon, daemon_socket
+
+    argv = sys.argv[1:] if argv is None else argv
+    socket_path = daemon_socket(argv)
+    if socket_path:
+        code = call_daemon(socket_path, "risk_scoring", argv)
+        if code is not None:
+            sys.exit(code)
+    execute(build_parser().parse_args(argv))
+
+
+def execute(args, engines: Optional[Dict[Any, RiskEngine]] = None):
     input_path = Path(args.input)
     if not input_path.exists():
         raise FileNotFoundError(f"Input profile not found: {input_path}")
 
+    engine = engine_from_args(args, engines)
+
+    with profiled(args.profile, args.profile_out):
+        _run_cli(engine, args, input_path)
+
+    if args.metrics_out:
+        engine.metrics.dump(args.metrics_out)
+
+
+def _run_cli(engine: RiskEngine, args, input_path: Path):
+    if args.sweep:
+        from .calibration import calibrate
+
+        spec = load_json(Path(args.sweep))
+        cache_path = Path(args.score_cache) if args.score_cache else None
+        reports = calibrate(engine, input_path, spec, cache_path=cache_path, workers=args.workers)
+        output_path = Path(args.output) if args.output else None
+        count = write_jsonl(reports, output_path)
+        if output_path:
+            print(f"{count} sweep configurations saved to {args.output}")
+        return
+
+    if args.jsonl or is_columnar_path(input_path):
+        output_path = Path(args.output) if args.output else None
+        count = score_file(engine, input_path, output_path, workers=args.workers, chunksize=args.chunksize)
+        if output_path:
+            print(f"{count} risk results saved to {args.output}")
+            if engine.cache is not None and engine.cache.hits + engine.cache.misses:
+                print(f"Result cache: {engine.cache.stats()}")
+        return
+
     profile = load_json(input_path)
 
-    engine = RiskEngine()
     result = engine.score_profile(profile)
 
     if args.output:
@@ -147,4 +631,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,386 @@
+# rule_spec.py
+# Declarative rule definitions for both scoring pipelines
+#
+# Thresholds that used to be hard-coded (high-risk event types, per-event
+# base scores, risk level bands, the financial/GPA ratio ladders) live in a
+# JSON or YAML spec. The spec is compiled once into flat lookup tables,
+# cached on disk (as JSON) by content hash, and can be hot-reloaded by
+# long-running workers through RuleSet.
+
+import hashlib
+import json
+import math
+import os
+import stat
+import time
+import dataclasses
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+
+DEFAULT_RULE_SPEC: Dict[str, Any] = {
+    "events": {
+        "high_risk_events": ["privilege_escalation", "data_export", "suspicious_login"],
+        "base_scores": {
+            "login": 3,
+            "privilege_escalation": 9,  # KRI2
+            "data_export": 8,           # KRI3
+            "suspicious_login": 7,      # KRI4
+        },
+        "default_score": 5,
+        "failed_bonus": 2,              # KRI1
+        "bruteforce_bonus": 0,          # KRI1 burst (BruteForceDetector); opt-in
+        "score_range": [1, 10],
+        "risk_levels": [
+            {"min": 9, "level": "Critical"},
+            {"min": 7, "level": "High"},
+            {"min": 4, "level": "Medium"},
+            {"level": "Low"},
+        ],
+    },
+    "profile": {
+        "financial_ratio": [
+            {"min": 1.2, "delta": 20, "note": "Bank balance is comfortably above the required minimum."},
+            {"min": 1.0, "delta": 10, "note": "Bank balance meets the required minimum."},
+            {"min": 0.8, "delta": -10, "note": "Bank balance is slightly below the required minimum."},
+            {"delta": -25, "note": "Bank balance is significantly below the required minimum."},
+        ],
+        "gpa_ratio": [
+            {"min": 1.2, "delta": 20, "note": "Academic performance significantly above requirement."},
+            {"min": 1.0, "delta": 10, "note": "Academic performance meets requirement."},
+            {"delta": -10, "note": "Academic performance below requirement."},
+        ],
+    },
+}
+
+# A ladder step: (minimum value or None for the fallback, score delta, note)
+LadderStep = Tuple[Optional[float], int, str]
+
+
+@dataclass(frozen=True)
+class Ladder:
+    """
+    Compiled threshold ladder. `steps` keeps the spec order (highest
+    minimum first). lookup(value) -> (delta, note) is generated as a plain
+    if-chain with the thresholds inlined as constants, so it runs exactly
+    like the hand-written branches it replaces.
+    """
+
+    steps: Tuple[LadderStep, ...]
+
+    def __post_init__(self):
+        object.__setattr__(self, "lookup", _ladder_function(self.steps))
+
+    def __getstate__(self):
+        # Generated functions cannot be pickled; rebuild them on load
+        return {"steps": self.steps}
+
+    def __setstate__(self, state):
+        object.__setattr__(self, "steps", state["steps"])
+        self.__post_init__()
+
+
+def _ladder_function(steps: Tuple[LadderStep, ...]):
+    # NaN fails every `>=` test and falls through to the last step,
+    # matching the original elif chains.
+    namespace = {f"_out{i}": (delta, note) for i, (_, delta, note) in enumerate(steps)}
+    lines = ["def lookup(value):"]
+    for i, (minimum, _, _) in enumerate(steps[:-1]):
+        lines.append(f"    if value >= {minimum!r}:")
+        lines.append(f"        return _out{i}")
+    lines.append(f"    return _out{len(steps) - 1}")
+    exec("\n".join(lines), namespace)
+    return namespace["lookup"]
+
+
+@dataclass(frozen=True)
+class CompiledRules:
+    digest: str
+    high_risk_events: frozenset
+    base_scores: Dict[str, int]
+    default_score: int
+    failed_bonus: int
+    bruteforce_bonus: int
+    score_min: int
+    score_max: int
+    risk_levels: Tuple[Tuple[Optional[int], str], ...]
+    # event_type -> (score, level) when not failed, when failed, and when
+    # failed and completing a brute-force burst
+    event_table: Dict[str, Tuple[Tuple[int, str], ...]]
+    default_event: Tuple[Tuple[int, str], ...]
+    financial_ratio: Ladder
+    gpa_ratio: Ladder
+
+    def risk_level(self, score: int) -> str:
+        return _risk_level(self.risk_levels, score)
+
+    def score_event(self, event_type: str, failed: bool, burst: bool = False) -> Tuple[int, str]:
+        """
+        Single dict lookup replacing the base score / bonus / band branches.
+        burst (a KRI1 brute-force burst) only counts for failed events.
+        """
+        return self.event_table.get(event_type, self.default_event)[failed + (failed and burst)]
+
+
+# ------------------------------------------------------------
+# Compilation
+# ------------------------------------------------------------
+def _risk_level(levels, score: int) -> str:
+    for threshold, level in levels:
+        if threshold is None or score >= threshold:
+            return level
+    return levels[-1][1]
+
+
+def _compile_ladder(name: str, steps) -> Ladder:
+    compiled = []
+    previous = float("inf")
+    for i, step in enumerate(steps):
+        minimum = step.get("min")
+        if minimum is None and i != len(steps) - 1:
+            raise ValueError(f"{name}: only the last step may omit 'min'")
+        if minimum is not None:
+            minimum = float(minimum)
+            if not math.isfinite(minimum) or minimum >= previous:
+                raise ValueError(f"{name}: 'min' values must be finite and in descending order")
+            previous = minimum
+        compiled.append((minimum, int(step["delta"]), str(step.get("note", ""))))
+    if not compiled or compiled[-1][0] is not None:
+        raise ValueError(f"{name}: the last step must be a fallback without 'min'")
+    return Ladder(tuple(compiled))
+
+
+def compile_rule_spec(spec: Dict[str, Any], digest: str = "") -> CompiledRules:
+    events = spec.get("events", {})
+    profile = spec.get("profile", {})
+    defaults_events = DEFAULT_RULE_SPEC["events"]
+    defaults_profile = DEFAULT_RULE_SPEC["profile"]
+
+    base_scores = {
+        str(k).lower(): int(v) for k, v in events.get("base_scores", defaults_events["base_scores"]).items()
+    }
+    default_score = int(events.get("default_score", defaults_events["default_score"]))
+    failed_bonus = int(events.get("failed_bonus", defaults_events["failed_bonus"]))
+    bruteforce_bonus = int(events.get("bruteforce_bonus", defaults_events["bruteforce_bonus"]))
+    score_min, score_max = (int(v) for v in events.get("score_range", defaults_events["score_range"]))
+
+    levels = []
+    entries = events.get("risk_levels", defaults_events["risk_levels"])
+    previous = None
+    for i, entry in enumerate(entries):
+        minimum = entry.get("min")
+        if minimum is None and i != len(entries) - 1:
+            raise ValueError("risk_levels: only the last entry may omit 'min'")
+        if minimum is not None:
+            minimum = int(minimum)
+            # Levels are matched first to last (and binned by columnar_engine),
+            # so thresholds must descend
+            if previous is not None and minimum >= previous:
+                raise ValueError("risk_levels: 'min' values must be in descending order")
+            previous = minimum
+        levels.append((minimum, str(entry["level"])))
+    if not levels or levels[-1][0] is not None:
+        raise ValueError("risk_levels: the last entry must be a fallback without 'min'")
+
+    # Precompute (score, level) for every known event type: not failed,
+    # failed, failed within a brute-force burst
+    def event_entry(base):
+        out = []
+        for bonus in (0, failed_bonus, failed_bonus + bruteforce_bonus):
+            score = max(score_min, min(base + bonus, score_max))
+            out.append((score, _risk_level(levels, score)))
+        return tuple(out)
+
+    return CompiledRules(
+        digest=digest,
+        high_risk_events=frozenset(
+            str(e).lower() for e in events.get("high_risk_events", defaults_events["high_risk_events"])
+        ),
+        base_scores=base_scores,
+        default_score=default_score,
+        failed_bonus=failed_bonus,
+        bruteforce_bonus=bruteforce_bonus,
+        score_min=score_min,
+        score_max=score_max,
+        risk_levels=tuple(levels),
+        event_table={event_type: event_entry(base) for event_type, base in base_scores.items()},
+        default_event=event_entry(default_score),
+        financial_ratio=_compile_ladder(
+            "financial_ratio", profile.get("financial_ratio", defaults_profile["financial_ratio"])
+        ),
+        gpa_ratio=_compile_ladder("gpa_ratio", profile.get("gpa_ratio", defaults_profile["gpa_ratio"])),
+    )
+
+
+# ------------------------------------------------------------
+# Loading, disk cache and hot reload
+# ------------------------------------------------------------
+# Version of the on-disk compiled form (see _to_fields). Bump it whenever
+# CompiledRules or its field encoding changes, so entries written by an
+# older release are neither found nor trusted.
+COMPILED_FORMAT = 1
+
+
+def default_cache_dir() -> Path:
+    return Path(os.environ.get("RISK_RULES_CACHE_DIR", Path.home() / ".cache" / "risk-engine" / "rules"))
+
+
+def parse_rule_spec(raw: bytes, suffix: str = ".json") -> Dict[str, Any]:
+    if suffix in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError as exc:
+            raise ImportError("PyYAML is required to load YAML rule specs") from exc
+        return yaml.safe_load(raw) or {}
+    return json.loads(raw)
+
+
+def load_rules(path, cache_dir: Optional[Path] = None) -> CompiledRules:
+    """
+    Loads and compiles a rule spec file. The compiled tables are stored as
+    JSON under cache_dir keyed by COMPILED_FORMAT and the SHA-256 of the
+    file contents, so later cold starts with an unchanged spec skip
+    parsing and compilation.
+    Cache entries are plain data (never code) and are ignored unless they
+    are owned by the current user and not writable by anyone else.
+    """
+    path = Path(path)
+    raw = path.read_bytes()
+    digest = hashlib.sha256(raw).hexdigest()
+
+    cache_dir = Path(cache_dir) if cache_dir else default_cache_dir()
+    cache_file = cache_dir / f"rules-v{COMPILED_FORMAT}-{digest}.json"
+    if _trusted_cache_file(cache_file):
+        try:
+            with cache_file.open("r", encoding="utf-8") as f:
+                fields = json.load(f)
+            if fields.get("format") == COMPILED_FORMAT and fields.get("digest") == digest:
+                return _from_fields(fields)
+        except Exception:
+            pass  # corrupt or incompatible cache entry: recompile below
+
+    rules = compile_rule_spec(parse_rule_spec(raw, path.suffix.lower()), digest=digest)
+
+    try:
+        cache_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+        tmp = cache_file.with_suffix(f".{os.getpid()}.tmp")
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(_to_fields(rules), f)
+        os.replace(tmp, cache_file)
+    except OSError:
+        pass  # caching is best effort
+
+    return rules
+
+
+def _trusted_cache_file(path: Path) -> bool:
+    """The cache file exists, belongs to this user and only they can write to it."""
+    try:
+        st = path.stat()
+    except OSError:
+        return False
+    if hasattr(os, "getuid") and st.st_uid != os.getuid():
+        return False
+    return not st.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+
+# The on-disk form holds only JSON types, so it does not depend on the
+# import path of this module (flat `rule_spec` vs. package-relative) and
+# loading it cannot run code. Values are re-coerced on the way back in,
+# as ladder thresholds end up in generated source.
+def _to_fields(rules: CompiledRules) -> Dict[str, Any]:
+    fields = {f.name: getattr(rules, f.name) for f in dataclasses.fields(rules)}
+    fields["format"] = COMPILED_FORMAT
+    fields["high_risk_events"] = sorted(rules.high_risk_events)
+    fields["financial_ratio"] = rules.financial_ratio.steps
+    fields["gpa_ratio"] = rules.gpa_ratio.steps
+    return fields
+
+
+def _from_fields(fields: Dict[str, Any]) -> CompiledRules:
+    def pair(entry):
+        return int(entry[0]), str(entry[1])
+
+    def ladder(steps):
+        return Ladder(tuple((None if m is None else float(m), int(d), str(n)) for m, d, n in steps))
+
+    return CompiledRules(
+        digest=str(fields["digest"]),
+        high_risk_events=frozenset(str(e) for e in fields["high_risk_events"]),
+        base_scores={str(k): int(v) for k, v in fields["base_scores"].items()},
+        default_score=int(fields["default_score"]),
+        failed_bonus=int(fields["failed_bonus"]),
+        bruteforce_bonus=int(fields["bruteforce_bonus"]),
+        score_min=int(fields["score_min"]),
+        score_max=int(fields["score_max"]),
+        risk_levels=tuple((None if m is None else int(m), str(level)) for m, level in fields["risk_levels"]),
+        event_table={str(k): tuple(pair(e) for e in v) for k, v in fields["event_table"].items()},
+        default_event=tuple(pair(e) for e in fields["default_event"]),
+        financial_ratio=ladder(fields["financial_ratio"]),
+        gpa_ratio=ladder(fields["gpa_ratio"]),
+    )
+
+
+class RuleSet:
+    """
+    Hot-reloadable handle on a rule spec file.
+
+    Reading .rules checks the file's mtime/size at most once every
+    check_interval seconds and recompiles only if the content changed, so
+    workers pick up new thresholds without a restart.
+    """
+
+    def __init__(self, path, cache_dir: Optional[Path] = None, check_interval: float = 5.0):
+        self.path = Path(path)
+        self.cache_dir = cache_dir
+        self.check_interval = check_interval
+        self._rules = load_rules(self.path, cache_dir)
+        self._stat = self._file_stat()
+        self._next_check = time.monotonic() + check_interval
+
+    def _file_stat(self):
+        st = self.path.stat()
+        return st.st_mtime_ns, st.st_size
+
+    @property
+    def rules(self) -> CompiledRules:
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self.check_interval
+            self.reload()
+        return self._rules
+
+    def reload(self) -> bool:
+        """Recompiles if the file changed. Returns True if rules were replaced."""
+        try:
+            stat = self._file_stat()
+        except OSError:
+            return False  # keep serving the last good rules
+        if stat == self._stat:
+            return False
+        self._stat = stat
+        try:
+            rules = load_rules(self.path, self.cache_dir)
+        except Exception:
+            return False  # invalid spec (or a half-written file): keep the last good rules
+        if rules.digest == self._rules.digest:
+            return False
+        self._rules = rules
+        return True
+
+
+def resolve_rules(source) -> CompiledRules:
+    """Accepts None, CompiledRules or RuleSet and returns current compiled rules."""
+    if source is None:
+        return DEFAULT_RULES
+    if isinstance(source, RuleSet):
+        return source.rules
+    return source
+
+
+DEFAULT_RULES = compile_rule_spec(
+    DEFAULT_RULE_SPEC,
+    digest=hashlib.sha256(json.dumps(DEFAULT_RULE_SPEC, sort_keys=True).encode("utf-8")).hexdigest(),
+)
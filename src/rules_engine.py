@@ -1,6 +1,8 @@
 from dataclasses import dataclass
 from typing import Dict, Any, List
 
+from .rule_spec import CompiledRules, DEFAULT_RULES
+
 
 @dataclass
 class CategoryScore:
@@ -17,7 +19,7 @@ def clamp(value: float, minimum: int = 0, maximum: int = 100) -> int:
 # ------------------------------------------------------------
 # Financial Risk Scoring
 # ------------------------------------------------------------
-def score_financial(section: Dict[str, Any]) -> CategoryScore:
+def score_financial(section: Dict[str, Any], rules: CompiledRules = DEFAULT_RULES) -> CategoryScore:
     notes = []
     score = 60
 
@@ -26,21 +28,12 @@ def score_financial(section: Dict[str, Any]) -> CategoryScore:
     regular_income = bool(section.get("has_regular_income", False))
     unexplained_deposits = bool(section.get("recent_large_unexplained_deposits", False))
 
-    # Ratio logic
+    # Ratio logic (thresholds from the rule spec's financial_ratio ladder)
     ratio = balance / required if required > 0 else 0
 
-    if ratio >= 1.2:
-        score += 20
-        notes.append("Bank balance is comfortably above the required minimum.")
-    elif ratio >= 1.0:
-        score += 10
-        notes.append("Bank balance meets the required minimum.")
-    elif ratio >= 0.8:
-        score -= 10
-        notes.append("Bank balance is slightly below the required minimum.")
-    else:
-        score -= 25
-        notes.append("Bank balance is significantly below the required minimum.")
+    delta, note = rules.financial_ratio.lookup(ratio)
+    score += delta
+    notes.append(note)
 
     if regular_income:
         score += 10
@@ -92,7 +85,7 @@ def score_documentation(section: Dict[str, Any]) -> CategoryScore:
 # ------------------------------------------------------------
 # Eligibility Scoring
 # ------------------------------------------------------------
-def score_eligibility(section: Dict[str, Any]) -> CategoryScore:
+def score_eligibility(section: Dict[str, Any], rules: CompiledRules = DEFAULT_RULES) -> CategoryScore:
     notes = []
     score = 60
 
@@ -110,15 +103,9 @@ def score_eligibility(section: Dict[str, Any]) -> CategoryScore:
 
     if required_gpa > 0:
         ratio = gpa / required_gpa
-        if ratio >= 1.2:
-            score += 20
-            notes.append("Academic performance significantly above requirement.")
-        elif ratio >= 1.0:
-            score += 10
-            notes.append("Academic performance meets requirement.")
-        else:
-            score -= 10
-            notes.append("Academic performance below requirement.")
+        delta, note = rules.gpa_ratio.lookup(ratio)
+        score += delta
+        notes.append(note)
 
     if gap_years > 3:
         score -= 20
@@ -192,10 +179,10 @@ def score_behaviour(section: Dict[str, Any]) -> CategoryScore:
 # ------------------------------------------------------------
 # Main scoring aggregator
 # ------------------------------------------------------------
-def score_all_categories(profile: Dict[str, Any]):
-    financial = score_financial(profile.get("financial", {}))
+def score_all_categories(profile: Dict[str, Any], rules: CompiledRules = DEFAULT_RULES):
+    financial = score_financial(profile.get("financial", {}), rules)
     documentation = score_documentation(profile.get("documentation", {}))
-    eligibility = score_eligibility(profile.get("eligibility", {}))
+    eligibility = score_eligibility(profile.get("eligibility", {}), rules)
     compliance = score_compliance(profile.get("compliance", {}))
     behaviour = score_behaviour(profile.get("behaviour", {}))
 
@@ -0,0 +1,183 @@
+from functools import partial
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .rule_spec import CompiledRules, resolve_rules
+from .rules_engine import (
+    score_financial,
+    score_documentation,
+    score_eligibility,
+    score_compliance,
+    score_behaviour,
+)
+
+
+# ------------------------------------------------------------
+# Column layout: field -> (profile section, coercion, default)
+# The coercions mirror the float()/int()/bool() calls in rules_engine.
+# ------------------------------------------------------------
+FIELDS: Dict[str, Tuple[str, type, Any]] = {
+    "bank_balance": ("financial", float, 0),
+    "minimum_required": ("financial", float, 0),
+    "has_regular_income": ("financial", bool, False),
+    "recent_large_unexplained_deposits": ("financial", bool, False),
+    "all_required_documents_provided": ("documentation", bool, False),
+    "documents_verified": ("documentation", bool, False),
+    "inconsistencies_found": ("documentation", int, 0),
+    "meets_minimum_criteria": ("eligibility", bool, False),
+    "gpa": ("eligibility", float, 0),
+    "required_gpa": ("eligibility", float, 0),
+    "gap_years": ("eligibility", float, 0),
+    "previous_visa_refusals": ("compliance", int, 0),
+    "adverse_immigration_history": ("compliance", bool, False),
+    "sanctions_or_watchlists": ("compliance", bool, False),
+    "response_consistency_score": ("behaviour", float, 0.5),
+    "missed_deadlines": ("behaviour", int, 0),
+    "suspicious_communication": ("behaviour", bool, False),
+}
+
+_DTYPES = {float: np.float64, int: np.int64, bool: np.bool_}
+
+CATEGORY_SCORERS = {
+    "financial": score_financial,
+    "documentation": score_documentation,
+    "eligibility": score_eligibility,
+    "compliance": score_compliance,
+    "behaviour": score_behaviour,
+}
+
+
+def profiles_to_columns(profiles: Sequence[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """Flattens JSON profiles into one typed array per field."""
+    n = len(profiles)
+    columns = {}
+    for field, (section, cast, default) in FIELDS.items():
+        values = (cast(p.get(section, {}).get(field, default)) for p in profiles)
+        columns[field] = np.fromiter(values, dtype=_DTYPES[cast], count=n)
+    return columns
+
+
+def _clamp(score: np.ndarray) -> np.ndarray:
+    # Same as rules_engine.clamp: round half-to-even, then limit to 0–100.
+    # A NaN or infinite score (from a "nan"/"inf" input) fails as round() does.
+    if score.dtype.kind == "f" and not np.isfinite(score).all():
+        if np.isnan(score).any():
+            raise ValueError("cannot convert float NaN to integer")
+        raise OverflowError("cannot convert float infinity to integer")
+    return np.clip(np.round(score), 0, 100).astype(np.int64)
+
+
+def _ladder(ladder, values: np.ndarray) -> np.ndarray:
+    # Vector form of Ladder.lookup: first matching step wins (NaN matches none)
+    steps = ladder.steps
+    conditions = [values >= minimum for minimum, _, _ in steps[:-1]]
+    choices = [delta for _, delta, _ in steps[:-1]]
+    return np.select(conditions, choices, steps[-1][1])
+
+
+# ------------------------------------------------------------
+# Vectorized category scorers
+# ------------------------------------------------------------
+def _financial(c: Dict[str, np.ndarray], rules: CompiledRules) -> np.ndarray:
+    balance = c["bank_balance"]
+    required = c["minimum_required"]
+    with np.errstate(invalid="ignore"):  # inf / inf is NaN, as in rules_engine
+        ratio = np.divide(balance, required, out=np.zeros_like(balance), where=required > 0)
+
+    score = 60 + _ladder(rules.financial_ratio, ratio)
+    score += c["has_regular_income"] * 10
+    score -= c["recent_large_unexplained_deposits"] * 25
+    return _clamp(score)
+
+
+def _documentation(c: Dict[str, np.ndarray], rules: CompiledRules) -> np.ndarray:
+    inconsistencies = c["inconsistencies_found"]
+
+    score = 70 + np.where(c["all_required_documents_provided"], 15, -30)
+    score += c["documents_verified"] * 10
+    score -= np.select([inconsistencies > 2, inconsistencies > 0], [20, 10], 0)
+    return _clamp(score)
+
+
+def _eligibility(c: Dict[str, np.ndarray], rules: CompiledRules) -> np.ndarray:
+    gpa = c["gpa"]
+    required_gpa = c["required_gpa"]
+    gap_years = c["gap_years"]
+    has_requirement = required_gpa > 0
+    with np.errstate(invalid="ignore"):
+        ratio = np.divide(gpa, required_gpa, out=np.zeros_like(gpa), where=has_requirement)
+
+    score = 60 + np.where(c["meets_minimum_criteria"], 10, -30)
+    score += np.where(has_requirement, _ladder(rules.gpa_ratio, ratio), 0)
+    score -= np.select([gap_years > 3, gap_years > 1], [20, 10], 0)
+    return _clamp(score)
+
+
+def _compliance(c: Dict[str, np.ndarray], rules: CompiledRules) -> np.ndarray:
+    refusals = c["previous_visa_refusals"]
+
+    score = 100 - np.select([refusals > 1, refusals == 1], [40, 20], 0)
+    score -= c["adverse_immigration_history"] * 40
+    score -= c["sanctions_or_watchlists"] * 50
+    return _clamp(score)
+
+
+def _behaviour(c: Dict[str, np.ndarray], rules: CompiledRules) -> np.ndarray:
+    missed = c["missed_deadlines"]
+
+    # Same operation order as score_behaviour so float results are identical
+    score = 60 + (c["response_consistency_score"] - 0.5) * 40
+    score = score - np.select([missed > 3, missed > 0], [20, 10], 0)
+    score = score - c["suspicious_communication"] * 25
+    return _clamp(score)
+
+
+_VECTOR_SCORERS = {
+    "financial": _financial,
+    "documentation": _documentation,
+    "eligibility": _eligibility,
+    "compliance": _compliance,
+    "behaviour": _behaviour,
+}
+
+
+# ------------------------------------------------------------
+# Main columnar evaluator
+# ------------------------------------------------------------
+def score_all_categories_columnar(
+    columns: Dict[str, np.ndarray],
+    explain: Optional[Iterable[int]] = None,
+    rules: Optional[Any] = None,
+) -> Tuple[Dict[str, np.ndarray], Dict[int, Dict[str, List[str]]]]:
+    """
+    Scores every row of `columns` (field name -> array, see FIELDS) for all
+    five categories at once. Missing fields take the rules_engine default.
+
+    Notes are produced only for the row indices in `explain`, by running
+    the scalar scorers on those rows, so they match score_all_categories
+    word for word.
+    """
+    n = len(next(iter(columns.values()))) if columns else 0
+    full = {}
+    for field, (_, cast, default) in FIELDS.items():
+        if field in columns:
+            full[field] = np.asarray(columns[field], dtype=_DTYPES[cast])
+        else:
+            full[field] = np.full(n, cast(default), dtype=_DTYPES[cast])
+
+    compiled = resolve_rules(rules)
+    scores = {name: scorer(full, compiled) for name, scorer in _VECTOR_SCORERS.items()}
+
+    scalar_scorers = dict(CATEGORY_SCORERS)
+    scalar_scorers["financial"] = partial(score_financial, rules=compiled)
+    scalar_scorers["eligibility"] = partial(score_eligibility, rules=compiled)
+
+    notes = {}
+    for i in explain or ():
+        sections: Dict[str, Dict[str, Any]] = {name: {} for name in CATEGORY_SCORERS}
+        for field, (section, _, _) in FIELDS.items():
+            sections[section][field] = full[field][i].item()
+        notes[i] = {name: scorer(sections[name]).notes for name, scorer in scalar_scorers.items()}
+
+    return scores, notes
@@ -0,0 +1,422 @@
+# scoring_service.py
+# Long-running HTTP scoring service around RiskEngine
+#
+# A small asyncio HTTP/1.1 server (stdlib only) with keep-alive:
+#   POST /score         one profile (JSON object) -> one result
+#   POST /score/batch   JSON list of profiles (or {"profiles": [...]}) -> list
+#   GET  /health        liveness plus batching counters
+#
+# Concurrent requests are coalesced into micro-batches (up to max_batch
+# profiles or max_wait_ms, whichever comes first) and scored with one
+# RiskEngine.score_batch call in a worker pool that keeps the engine, rules
+# and model loaded, so the event loop only parses requests and writes
+# responses.
+#
+# Profiles are validated before they are queued (400 for a field the
+# engine cannot read), and if a batch still fails its requests are scored
+# one by one, so a bad request never fails the others it was batched with.
+
+import asyncio
+import json
+import os
+import signal
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from .risk_scoring import RiskEngine, make_result_cache
+from .rule_spec import RuleSet
+from .rules_vectorized import FIELDS
+from .watchlist import open_watchlist
+
+
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    411: "Length Required",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+# section -> [(field, coercion), ...], as read by rules_engine and ml_model
+_SECTION_FIELDS: Dict[str, List[Tuple[str, type]]] = {}
+for _field, (_section, _cast, _) in FIELDS.items():
+    _SECTION_FIELDS.setdefault(_section, []).append((_field, _cast))
+
+
+def validate_profile(profile: Dict[str, Any]) -> Optional[str]:
+    """
+    Why the engine could not score a profile (a section that is not an
+    object, a field its float()/int() coercion rejects), or None if it can.
+    """
+    for section, fields in _SECTION_FIELDS.items():
+        values = profile.get(section)
+        if values is None and section not in profile:
+            continue
+        if not isinstance(values, dict):
+            return f"{section}: expected a JSON object"
+        for field, cast in fields:
+            if field not in values:
+                continue
+            try:
+                cast(values[field])
+            except (TypeError, ValueError, OverflowError) as exc:
+                return f"{section}.{field}: {exc}"
+    return None
+
+
+# ------------------------------------------------------------
+# Worker side: one warm engine per worker
+# ------------------------------------------------------------
+_ENGINE: Optional[RiskEngine] = None
+
+
+def _init_engine(engine: RiskEngine):
+    global _ENGINE
+    _ENGINE = engine
+
+
+def _score_to_json(profiles: List[Dict[str, Any]]) -> List[str]:
+    # Results are serialised in the worker too, off the event loop
+    return [json.dumps(r) for r in _ENGINE.score_batch(profiles)]
+
+
+class MicroBatcher:
+    """
+    Collects profiles from concurrent callers and scores them together.
+    A batch is dispatched once it holds max_batch profiles or the oldest
+    waiting request is max_wait_ms old; at most max_inflight batches run
+    at the same time.
+    """
+
+    def __init__(
+        self,
+        executor: Executor,
+        max_batch: int = 64,
+        max_wait_ms: float = 2.0,
+        max_inflight: int = 2,
+    ):
+        self.executor = executor
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.requests = 0
+        self.profiles = 0
+        self.batches = 0
+        self.retried_batches = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._max_inflight = max_inflight
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self._max_inflight)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, profiles: List[Dict[str, Any]]) -> List[str]:
+        """Scores profiles (possibly batched with other callers); returns JSON strings."""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((profiles, future))
+        return await future
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "profiles": self.profiles,
+            "batches": self.batches,
+            "avg_batch": round(self.profiles / self.batches, 2) if self.batches else 0.0,
+            "retried_batches": self.retried_batches,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+        }
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        queue = self._queue
+        while True:
+            item = await queue.get()
+            batch = [item]
+            size = len(item[0])
+            deadline = loop.time() + self.max_wait
+
+            while size < self.max_batch:
+                if queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    item = queue.get_nowait()
+                batch.append(item)
+                size += len(item[0])
+
+            await self._slots.acquire()
+            loop.create_task(self._dispatch(batch))
+
+    async def _dispatch(self, batch: List[Tuple[List[Dict[str, Any]], asyncio.Future]]):
+        try:
+            profiles = [p for chunk, _ in batch for p in chunk]
+            self.requests += len(batch)
+            self.profiles += len(profiles)
+            self.batches += 1
+            loop = asyncio.get_running_loop()
+            try:
+                results = await loop.run_in_executor(self.executor, _score_to_json, profiles)
+            except Exception as exc:
+                if len(batch) == 1:
+                    _settle(batch[0][1], exc=exc)
+                    return
+                # Score each request on its own so only the failing one fails
+                self.retried_batches += 1
+                await asyncio.gather(*(self._score_alone(chunk, future) for chunk, future in batch))
+                return
+
+            start = 0
+            for chunk, future in batch:
+                _settle(future, results[start:start + len(chunk)])
+                start += len(chunk)
+        finally:
+            self._slots.release()
+
+    async def _score_alone(self, profiles: List[Dict[str, Any]], future: asyncio.Future):
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(self.executor, _score_to_json, profiles)
+        except Exception as exc:
+            _settle(future, exc=exc)
+        else:
+            _settle(future, results)
+
+
+def _settle(future: asyncio.Future, result: Any = None, exc: Optional[BaseException] = None):
+    # The caller may have gone away (cancelled future)
+    if future.done():
+        return
+    if exc is not None:
+        future.set_exception(exc)
+    else:
+        future.set_result(result)
+
+
+class ScoringService:
+    """HTTP front end: parses requests, hands profiles to the MicroBatcher."""
+
+    def __init__(self, batcher: MicroBatcher, max_body: int = MAX_BODY_BYTES):
+        self.batcher = batcher
+        self.max_body = max_body
+        self.server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8080):
+        self.batcher.start()
+        self.server = await asyncio.start_server(self._handle, host, port)
+        return self.server
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        await self.batcher.stop()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    writer.write(_response(400, _error("Malformed request line"), keep_alive=False))
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+
+                if "transfer-encoding" in headers:
+                    writer.write(_response(411, _error("Send a Content-Length body"), keep_alive=False))
+                    break
+                try:
+                    length = int(headers.get("content-length", 0))
+                except ValueError:
+                    length = -1
+                if length < 0 or length > self.max_body:
+                    writer.write(_response(413, _error("Body too large"), keep_alive=False))
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                status, payload = await self._route(method, target.split("?", 1)[0], body)
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method: str, path: str, body: bytes) -> Tuple[int, bytes]:
+        if path == "/health":
+            if method != "GET":
+                return 405, _error("Use GET")
+            return 200, json.dumps({"status": "ok", **self.batcher.stats()}).encode("utf-8")
+
+        if path not in ("/score", "/score/batch"):
+            return 404, _error(f"No route for {path}")
+        if method != "POST":
+            return 405, _error("Use POST")
+
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return 400, _error("Body is not valid JSON")
+
+        if path == "/score":
+            if not isinstance(data, dict):
+                return 400, _error("Expected a JSON object (one profile)")
+            profiles = [data]
+        else:
+            if isinstance(data, dict):
+                data = data.get("profiles")
+            if not isinstance(data, list) or not all(isinstance(p, dict) for p in data):
+                return 400, _error('Expected a JSON list of profiles or {"profiles": [...]}')
+            if not data:
+                return 200, b"[]"
+            profiles = data
+
+        for i, profile in enumerate(profiles):
+            problem = validate_profile(profile)
+            if problem is not None:
+                return 400, _error(problem if path == "/score" else f"profiles[{i}].{problem}")
+
+        try:
+            results = await self.batcher.submit(profiles)
+        except Exception as exc:
+            return 500, _error(f"Scoring failed: {exc}")
+
+        if path == "/score":
+            return 200, results[0].encode("utf-8")
+        return 200, ("[" + ",".join(results) + "]").encode("utf-8")
+
+
+def _error(message: str) -> bytes:
+    return json.dumps({"error": message}).encode("utf-8")
+
+
+def _response(status: int, body: bytes, keep_alive: bool) -> bytes:
+    head = (
+        f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return head.encode("latin-1") + body
+
+
+def make_executor(engine: RiskEngine, workers: int) -> Executor:
+    """
+    workers > 0: that many processes, each holding its own copy of the
+    engine. workers == 0: one background thread sharing this engine.
+    """
+    if workers > 0:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_engine, initargs=(engine,))
+        # Start the workers (imports, model load) before any traffic arrives
+        executor.submit(_score_to_json, []).result()
+        return executor
+    _init_engine(engine)
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="risk-scoring")
+
+
+async def serve(
+    engine: RiskEngine,
+    host: str = "127.0.0.1",
+    port: int = 8080,
+    workers: int = 0,
+    max_batch: int = 64,
+    max_wait_ms: float = 2.0,
+):
+    executor = make_executor(engine, workers)
+    batcher = MicroBatcher(executor, max_batch=max_batch, max_wait_ms=max_wait_ms, max_inflight=max(workers, 1) * 2)
+    service = ScoringService(batcher)
+    await service.start(host, port)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:  # e.g. Windows
+            pass
+
+    print(f"Scoring service listening on http://{host}:{port} (workers={workers}, max_batch={max_batch}, max_wait_ms={max_wait_ms})")
+    try:
+        await stop.wait()
+    finally:
+        await service.stop()
+        executor.shutdown(wait=True)
+
+
+# ------------------------------------------------------------
+# CLI entry point
+# ------------------------------------------------------------
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Enterprise Risk Intelligence Engine – scoring service")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Address to bind.")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on.")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=max((os.cpu_count() or 1) - 1, 0),
+        help="Scoring processes (0 = one background thread in this process).",
+    )
+    parser.add_argument("--max-batch", type=int, default=64, help="Profiles per micro-batch.")
+    parser.add_argument("--max-wait-ms", type=float, default=2.0, help="Longest a request waits for a batch to fill.")
+    parser.add_argument("--rules", type=str, help="Optional JSON/YAML rule spec (see examples/rules.json).")
+    parser.add_argument("--model", type=str, help="Optional joblib classifier (predict_proba) to blend in.")
+    parser.add_argument("--cache-db", type=str, help="Optional SQLite file caching results of unchanged profiles.")
+    parser.add_argument("--cache-size", type=int, default=0, help="In-memory result cache entries (0 disables).")
+    parser.add_argument("--watchlist", type=str, help="Compiled watchlist screening each profile's identity values.")
+    args = parser.parse_args()
+
+    engine = RiskEngine(
+        rules=RuleSet(args.rules) if args.rules else None,
+        model_path=args.model,
+        cache=make_result_cache(args.cache_db, args.cache_size),
+        watchlist=open_watchlist(args.watchlist),
+    )
+    asyncio.run(
+        serve(
+            engine,
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+            max_batch=args.max_batch,
+            max_wait_ms=args.max_wait_ms,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+# watchlist.py
+# Memory-mapped watchlist / sanctions screening for identifiers and IPs
+#
+# A watchlist is compiled offline into one file that is memory-mapped at
+# lookup time, so a 10M-entry list opens instantly and is shared between
+# processes through the page cache:
+#
+#   header | Bloom filter | sorted 64-bit entry hashes | IPv4 ranges
+#
+# Identifiers (user names, passport numbers, e-mails, ...) are normalised
+# (stripped, case-folded) and hashed once per lookup. The Bloom filter is
+# blocked: all of a value's bits sit in one 64-bit word, so rejecting a
+# non-listed value costs one memory access however large the list. The
+# few values that pass are confirmed by binary search over the sorted
+# hashes. IPv4 addresses
+# and CIDR blocks become merged [start, end] intervals searched by bisect,
+# so a /8 costs the same as a single address. IPv6 addresses are listed
+# as identifiers (canonical text); IPv6 ranges are not supported.
+#
+# Results are memoised per value, so the repeated users and IPs of a log
+# stream cost a dict lookup.
+#
+#   python src/watchlist.py build watchlist.wl sanctions.txt blocked_ips.txt
+#   python src/watchlist.py check watchlist.wl alice 10.1.2.3
+
+import hashlib
+import ipaddress
+import math
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+MAGIC = b"RIEWATCH"
+FORMAT_VERSION = 1
+# magic, version, byte order, bits per value, Bloom words, entry hashes, IPv4 ranges
+_HEADER = struct.Struct("<8sHHIQQQ")
+_ALIGN = 8
+
+DEFAULT_BITS_PER_ENTRY = 10  # ~2% Bloom false positives (7 bits per value)
+
+_MASK64 = (1 << 64) - 1
+_IPV4_END = 1 << 32
+_IP_CHARS = frozenset("0123456789abcdefABCDEF.:/")
+
+# Bounded memo of lookup results; cleared when full
+_MEMO_LIMIT = 1_000_000
+
+
+def normalize(value) -> str:
+    """Canonical form an identifier is listed and looked up under."""
+    return str(value).strip().casefold()
+
+
+def _hash(key: str) -> Tuple[int, int]:
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16, person=b"riewatch").digest()
+    value = int.from_bytes(digest, "little")
+    # h1 is the stored entry hash (and picks the Bloom word); 6-bit slices
+    # of h2 pick the bits within it
+    return value & _MASK64, value >> 64
+
+
+def _aligned(size: int) -> int:
+    return -(-size // _ALIGN) * _ALIGN
+
+
+# ------------------------------------------------------------
+# Building
+# ------------------------------------------------------------
+def parse_entry(line: str):
+    """
+    ("ipv4", (start, end)) for IPv4 addresses and CIDR blocks, else
+    ("id", normalised text). IPv6 addresses are kept as identifiers.
+    """
+    text = line.strip()
+    if not _IP_CHARS.issuperset(text):
+        return "id", normalize(text)
+    try:
+        network = ipaddress.ip_network(text, strict=False)
+    except ValueError:
+        return "id", normalize(text)
+    if network.version == 4:
+        return "ipv4", (int(network.network_address), int(network.broadcast_address))
+    if network.num_addresses != 1:
+        raise ValueError(f"IPv6 ranges are not supported: {text}")
+    return "id", str(network.network_address)
+
+
+def read_entries(paths: Iterable[str]) -> Iterable[str]:
+    """Non-blank, non-comment (#) lines of one or more list files."""
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.split("#", 1)[0].strip()
+                if line:
+                    yield line
+
+
+def _merge_ranges(ranges: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    merged: List[Tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def build_watchlist(entries: Iterable[str], path, bits_per_entry: int = DEFAULT_BITS_PER_ENTRY) -> Dict[str, int]:
+    """
+    Compiles entries (identifiers, IPs, IPv4 CIDRs) into a watchlist file,
+    written atomically. Returns counts of what went in.
+    """
+    try:
+        import numpy as np
+    except ImportError as exc:
+        raise ImportError("numpy is required to build watchlists") from exc
+
+    h1s, h2s, ranges = set(), {}, []
+    for line in entries:
+        kind, value = parse_entry(line)
+        if kind == "ipv4":
+            ranges.append(value)
+        elif value:
+            h1, h2 = _hash(value)
+            h1s.add(h1)
+            h2s[h1] = h2
+    ranges = _merge_ranges(ranges)
+
+    hashes = np.array(sorted(h1s), dtype=np.uint64)
+    slices = np.array([h2s[h] for h in hashes.tolist()], dtype=np.uint64)
+    n_words = max(1, -(-len(hashes) * bits_per_entry // 64))
+    n_bits = max(1, min(10, round(bits_per_entry * math.log(2))))
+
+    # Word h1 mod n_words, bits (h2 >> 6i) & 63, as at lookup time
+    masks = np.zeros(len(hashes), dtype=np.uint64)
+    for i in range(n_bits):
+        masks |= np.uint64(1) << ((slices >> np.uint64(6 * i)) & np.uint64(63))
+    bloom = np.zeros(n_words, dtype=np.uint64)
+    np.bitwise_or.at(bloom, (hashes % np.uint64(n_words)).astype(np.int64), masks)
+
+    starts = array("I", (start for start, _ in ranges))
+    ends = array("I", (end for _, end in ranges))
+    byteorder = 1 if sys.byteorder == "little" else 2
+
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("wb") as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, byteorder, n_bits, n_words, len(hashes), len(ranges)))
+        for block in (bloom.tobytes(), hashes.astype(np.uint64).tobytes(), starts.tobytes(), ends.tobytes()):
+            f.write(block)
+            f.write(b"\0" * (_aligned(len(block)) - len(block)))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return {"identifiers": len(hashes), "ipv4_ranges": len(ranges), "bloom_words": n_words, "bits_per_value": n_bits}
+
+
+# ------------------------------------------------------------
+# Lookups
+# ------------------------------------------------------------
+class Watchlist:
+    """
+    Read-only view of a compiled watchlist file. Pickles as its path, so
+    pool workers re-map the file instead of copying it.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._open()
+
+    def _open(self):
+        with self.path.open("rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, byteorder, n_bits, n_words, n_ids, n_ranges = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{self.path} is not a version {FORMAT_VERSION} watchlist file")
+        if byteorder != (1 if sys.byteorder == "little" else 2):
+            raise ValueError(f"{self.path} was built on a machine with a different byte order")
+
+        self.n_bits = n_bits
+        self.n_words = n_words
+        # Every view into the map is kept so close() can release them all
+        self._views = [memoryview(self._mmap)]
+        offset = _aligned(_HEADER.size)
+        sections = []
+        for size, fmt in ((8 * n_words, "Q"), (8 * n_ids, "Q"), (4 * n_ranges, "I"), (4 * n_ranges, "I")):
+            raw = self._views[0][offset : offset + size]
+            section = raw.cast(fmt)
+            self._views += (raw, section)
+            sections.append(section)
+            offset += _aligned(size)
+        self._bloom, self._hashes, self._starts, self._ends = sections
+        self._memo: Dict[object, bool] = {}
+        self._ip_memo: Dict[object, bool] = {}
+
+    def __getstate__(self):
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.path = state["path"]
+        self._open()
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def __contains__(self, value) -> bool:
+        return self.contains(value)
+
+    def stats(self) -> Dict[str, int]:
+        return {"identifiers": len(self._hashes), "ipv4_ranges": len(self._starts), "bloom_words": self.n_words}
+
+    def contains(self, value) -> bool:
+        """Whether an identifier (compared normalised) is listed."""
+        hit = self._memo.get(value)
+        if hit is None:
+            hit = self._lookup(normalize(value))
+            if len(self._memo) >= _MEMO_LIMIT:
+                self._memo.clear()
+            self._memo[value] = hit
+        return hit
+
+    def _lookup(self, key: str) -> bool:
+        if not key:
+            return False
+        h1, h2 = _hash(key)
+        word = self._bloom[h1 % self.n_words]
+        for _ in range(self.n_bits):
+            if not word >> (h2 & 63) & 1:
+                return False
+            h2 >>= 6
+        hashes = self._hashes
+        i = bisect_left(hashes, h1)
+        return i < len(hashes) and hashes[i] == h1
+
+    def matches(self, value) -> bool:
+        """
+        Whether a value is listed as an identifier or, if it is IP address
+        text, as / within an IP entry. Numbers are only compared as
+        identifiers (an applicant id of 12345 is not 0.0.48.57).
+        """
+        if not isinstance(value, str):
+            return self.contains(str(value))
+        return self.contains(value) or self.contains_ip(value)
+
+    def contains_ip(self, ip) -> bool:
+        """
+        Whether an IP is listed, alone or inside a listed IPv4 block. Takes
+        text or an IPv4 address as an int.
+        """
+        hit = self._ip_memo.get(ip)
+        if hit is None:
+            hit = self._lookup_ip(ip)
+            if len(self._ip_memo) >= _MEMO_LIMIT:
+                self._ip_memo.clear()
+            self._ip_memo[ip] = hit
+        return hit
+
+    def _lookup_ip(self, ip) -> bool:
+        if not isinstance(ip, int):
+            try:
+                address = ipaddress.ip_address(str(ip).strip())
+            except ValueError:
+                return False
+            if address.version == 6:
+                return self._lookup(str(address))
+            ip = int(address)
+        if not 0 <= ip < _IPV4_END:
+            return False
+        i = bisect_right(self._starts, ip) - 1
+        return i >= 0 and ip <= self._ends[i]
+
+    def close(self):
+        for view in reversed(self._views):
+            view.release()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def open_watchlist(path: Optional[str]) -> Optional[Watchlist]:
+    return Watchlist(path) if path else None
+
+
+def main():
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Build or query a memory-mapped watchlist file.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Compile list files (one identifier, IP or IPv4 CIDR per line).")
+    build.add_argument("output", type=str, help="Watchlist file to write.")
+    build.add_argument("lists", nargs="+", help="Text files to read ('#' starts a comment).")
+    build.add_argument("--bits-per-entry", type=int, default=DEFAULT_BITS_PER_ENTRY, help="Bloom filter size per entry.")
+    check = sub.add_parser("check", help="Look values up (identifiers and IPs).")
+    check.add_argument("watchlist", type=str, help="Watchlist file.")
+    check.add_argument("values", nargs="+", help="Values to screen.")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        stats = build_watchlist(read_entries(args.lists), args.output, bits_per_entry=args.bits_per_entry)
+        print(f"Wrote {args.output}: {json.dumps(stats)}")
+        return
+
+    watchlist = Watchlist(args.watchlist)
+    for value in args.values:
+        print(json.dumps({"value": value, "listed": watchlist.matches(value)}))
+
+
+if __name__ == "__main__":
+    main()
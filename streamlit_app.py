@@ -1,11 +1,19 @@
 from __future__ import annotations
 
+import hashlib
 import io
 import json
-from dataclasses import dataclass
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
 from datetime import datetime
-from typing import Dict, Any, Optional
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 import streamlit as st
 
@@ -16,6 +24,12 @@ DEFAULT_TIME_COLS = ["timestamp", "time", "event_time", "created_at", "date"]
 DEFAULT_MESSAGE_COLS = ["message", "event", "log", "description"]
 DEFAULT_NUMERIC_COLS_HINT = ["latency_ms", "duration_ms", "error_count", "requests", "status_code"]
 
+# Analysed uploads are cached by content hash: in memory (LRU, bounded by
+# frame size) and, if RISK_CACHE_DIR is set, as Parquet files on disk.
+CACHE_MAX_BYTES = int(os.environ.get("RISK_CACHE_MAX_MB", "1024")) * 1024 * 1024
+CACHE_DIR = os.environ.get("RISK_CACHE_DIR")
+CACHE_DISK_MAX_BYTES = int(os.environ.get("RISK_CACHE_DISK_MAX_MB", "4096")) * 1024 * 1024
+
 # -----------------------------
 # Core demo logic (simple + safe)
 # -----------------------------
@@ -28,71 +42,135 @@ class RiskResult:
     meta: Dict[str, Any]
 
 
-def _pick_first_existing(columns, candidates) -> Optional[str]:
-    lower_map = {c.lower(): c for c in columns}
+def _pick_first_existing(columns, candidates, lower_map: Optional[Dict[str, str]] = None) -> Optional[str]:
+    if lower_map is None:
+        lower_map = {c.lower(): c for c in columns}
     for cand in candidates:
         if cand.lower() in lower_map:
             return lower_map[cand.lower()]
     return None
 
 
+def _error_flags(df: pd.DataFrame, lower_map: Dict[str, str], msg_col: Optional[str]) -> Optional[pd.Series]:
+    status_col = _pick_first_existing(df.columns, ["status_code"], lower_map)
+    if status_col:
+        # treat 4xx/5xx as errors
+        s = pd.to_numeric(df[status_col], errors="coerce")
+        return (s >= 400).fillna(False)
+    if msg_col:
+        m = df[msg_col].astype(str)
+        return m.str.contains("error|failed|exception|timeout", case=False, regex=True)
+    return None
+
+
+def _error_rate(df: pd.DataFrame, lower_map: Dict[str, str], msg_col: Optional[str]) -> float:
+    flags = _error_flags(df, lower_map, msg_col)
+    return 0.0 if flags is None else float(flags.mean())
+
+
+def _hourly_counts(values: pd.Series) -> pd.Series:
+    """Rows per clock hour (hours with no rows are absent)."""
+    t = pd.to_datetime(values, errors="coerce", utc=True).dropna()
+    return t.dt.floor("h").value_counts()
+
+
+def _spike_ratio(first_hour, last_hour, busiest: int, total: int) -> float:
+    # Average over the whole first..last span, so empty hours count too
+    n_hours = int((last_hour - first_hour) / pd.Timedelta(hours=1)) + 1
+    if n_hours < 3:
+        return 0.0
+    avg = total / n_hours
+    return float(busiest / avg) if avg > 0 else 0.0
+
+
+def _volume_spike(df: pd.DataFrame, time_col: Optional[str]) -> float:
+    """Busiest hour vs the average hour, counting empty hours in between."""
+    if not time_col:
+        return 0.0
+    per_hour = _hourly_counts(df[time_col])
+    if per_hour.empty:
+        return 0.0
+    return _spike_ratio(per_hour.index.min(), per_hour.index.max(), per_hour.max(), per_hour.sum())
+
+
+def _missingness(df: pd.DataFrame) -> float:
+    # Column by column, so only one boolean mask exists at a time
+    per_col = [df.iloc[:, i].isna().mean() for i in range(df.shape[1])]
+    return float(pd.Series(per_col, dtype="float64").mean())
+
+
+def _numeric_columns(df: pd.DataFrame, lower_map: Dict[str, str]) -> Dict[str, pd.Series]:
+    """
+    Numeric columns as a name -> Series mapping. Falls back to coercing the
+    hinted columns into new Series; the caller's frame is never modified.
+    """
+    # Dtype selection on a zero-row slice: same rules as select_dtypes, no data touched
+    numeric_cols = df.iloc[:0].select_dtypes(include=["number"]).columns.tolist()
+    if numeric_cols:
+        return {c: df[c] for c in numeric_cols}
+
+    coerced = {}
+    for h in DEFAULT_NUMERIC_COLS_HINT:
+        real = _pick_first_existing(df.columns, [h], lower_map)
+        if real is not None:
+            coerced[real] = pd.to_numeric(df[real], errors="coerce")
+    return coerced
+
+
+def _valid_rows(numeric: Dict[str, pd.Series]) -> np.ndarray:
+    """Mask of rows where every numeric column holds a finite value."""
+    valid = None
+    for s in numeric.values():
+        finite = np.isfinite(s.to_numpy(dtype="float64", na_value=np.nan))
+        valid = finite if valid is None else valid & finite
+    return valid
+
+
+def _outlier_intensity(numeric: Dict[str, pd.Series]) -> float:
+    """
+    Share of values beyond 3 std devs, over rows where every numeric value
+    is finite. Works one column at a time instead of on a copied sub-frame.
+    """
+    if not numeric:
+        return 0.0
+
+    valid = _valid_rows(numeric)
+    if not valid.any():
+        return 0.0
+
+    fractions = []
+    for s in numeric.values():
+        x = s.to_numpy(dtype="float64", na_value=np.nan)[valid]
+        z = (x - x.mean()) / (x.std() + 1e-9)
+        fractions.append(np.count_nonzero(np.abs(z) > 3) / len(x))
+    return float(np.mean(fractions))
+
+
 def compute_kris(df: pd.DataFrame) -> Dict[str, float]:
     """
     Tiny KRI set that works for many log-like CSVs.
     You can replace this later with your real KRIs.
+
+    Single pass over the columns that matter; no DataFrame copies and the
+    input frame is left untouched.
     """
     cols = df.columns
+    lower_map = {c.lower(): c for c in cols}
 
-    time_col = _pick_first_existing(cols, DEFAULT_TIME_COLS)
-    msg_col = _pick_first_existing(cols, DEFAULT_MESSAGE_COLS)
+    time_col = _pick_first_existing(cols, DEFAULT_TIME_COLS, lower_map)
+    msg_col = _pick_first_existing(cols, DEFAULT_MESSAGE_COLS, lower_map)
 
     # 1) Error rate (based on message keywords or status_code if present)
-    error_rate = 0.0
-    if "status_code" in [c.lower() for c in cols]:
-        status_col = _pick_first_existing(cols, ["status_code"])
-        # treat 4xx/5xx as errors
-        s = pd.to_numeric(df[status_col], errors="coerce")
-        error_rate = float((s >= 400).fillna(False).mean())
-    elif msg_col:
-        m = df[msg_col].astype(str).str.lower()
-        error_rate = float(m.str.contains("error|failed|exception|timeout").mean())
+    error_rate = _error_rate(df, lower_map, msg_col)
 
     # 2) Volume spike proxy (rows per hour vs average) if time exists
-    volume_spike = 0.0
-    if time_col:
-        t = pd.to_datetime(df[time_col], errors="coerce", utc=True)
-        temp = df.copy()
-        temp["_t"] = t
-        temp = temp.dropna(subset=["_t"])
-        if not temp.empty:
-            per_hour = temp.set_index("_t").resample("1H").size()
-            if len(per_hour) >= 3:
-                avg = per_hour.mean()
-                mx = per_hour.max()
-                volume_spike = float((mx / avg) if avg > 0 else 0.0)
+    volume_spike = _volume_spike(df, time_col)
 
     # 3) Missingness (data quality risk)
-    missingness = float(df.isna().mean().mean())
+    missingness = _missingness(df)
 
     # 4) Numeric outlier intensity (quick z-score-ish proxy)
-    numeric_cols = df.select_dtypes(include=["number"]).columns.tolist()
-    if not numeric_cols:
-        # try to coerce hinted numeric columns
-        for h in DEFAULT_NUMERIC_COLS_HINT:
-            if h in [c.lower() for c in cols]:
-                real = _pick_first_existing(cols, [h])
-                df[real] = pd.to_numeric(df[real], errors="coerce")
-        numeric_cols = df.select_dtypes(include=["number"]).columns.tolist()
-
-    outlier_intensity = 0.0
-    if numeric_cols:
-        num = df[numeric_cols].copy()
-        num = num.replace([float("inf"), float("-inf")], pd.NA)
-        num = num.dropna()
-        if not num.empty:
-            # ratio of values beyond 3 std dev (rough)
-            z = (num - num.mean()) / (num.std(ddof=0) + 1e-9)
-            outlier_intensity = float((z.abs() > 3).mean().mean())
+    outlier_intensity = _outlier_intensity(_numeric_columns(df, lower_map))
 
     return {
         "error_rate": round(error_rate, 4),
@@ -102,12 +180,11 @@ def compute_kris(df: pd.DataFrame) -> Dict[str, float]:
     }
 
 
-def compute_anomaly_rate(df: pd.DataFrame) -> float:
+def anomaly_rate_from_kris(kris: Dict[str, float]) -> float:
     """
     Tiny heuristic anomaly: if error keywords OR high outlier intensity OR missingness high.
     Replace later with your IsolationForest outputs if you like.
     """
-    kris = compute_kris(df)
     flags = 0
     if kris["error_rate"] > 0.05:
         flags += 1
@@ -120,6 +197,470 @@ def compute_anomaly_rate(df: pd.DataFrame) -> float:
     return {0: 0.01, 1: 0.05, 2: 0.15, 3: 0.30}.get(flags, 0.10)
 
 
+def compute_anomaly_rate(df: pd.DataFrame) -> float:
+    return anomaly_rate_from_kris(compute_kris(df))
+
+
+def compute_kris_and_anomaly_rate(df: pd.DataFrame) -> Tuple[Dict[str, float], float]:
+    """All KRIs plus the anomaly rate from one pass over the frame."""
+    kris = compute_kris(df)
+    return kris, anomaly_rate_from_kris(kris)
+
+
+# -----------------------------
+# Chunked (out-of-core) KRIs for large uploads
+# -----------------------------
+CHUNK_ROWS = 200_000
+PREVIEW_ROWS = 20
+
+# Uploads at least this large are scored chunk by chunk instead of being
+# loaded into a single DataFrame
+CHUNKED_MIN_BYTES = int(os.environ.get("RISK_CHUNKED_MIN_MB", "256")) * 1024 * 1024
+
+
+class KRIAccumulator:
+    """
+    Mergeable running state for compute_kris over a CSV read in chunks:
+    error counts, a per-hour row histogram, per-column null counts and
+    per-column (n, mean, M2) moments for the z-score outlier check.
+    Memory depends on the number of columns and distinct hours, not rows.
+
+    Outliers need the final mean/std, so they are counted in a second,
+    numeric-columns-only pass (see accumulate_kris).
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.columns: Optional[list] = None
+        self.time_col: Optional[str] = None
+        self.has_error_source = False
+        self.errors = 0
+        self.hour_counts: Dict[pd.Timestamp, int] = {}
+        self.null_counts: Dict[str, int] = {}
+        # Columns read as numbers in every chunk so far; only these are
+        # numeric when the file is read in one go
+        self.numeric: Optional[list] = None
+        self.moments: Dict[str, Tuple[int, float, float]] = {}
+        self.moments_stale = False
+        self.outliers: Dict[str, int] = {}
+        self.outlier_rows = 0
+        # Optional per-chunk anomaly counter (see IsolationForestBackend.stream)
+        self.anomalies = None
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        if self.columns is None:
+            self.columns = list(chunk.columns)
+            lower_map = {c.lower(): c for c in self.columns}
+            self.time_col = _pick_first_existing(self.columns, DEFAULT_TIME_COLS, lower_map)
+            self.null_counts = dict.fromkeys(self.columns, 0)
+        lower_map = {c.lower(): c for c in self.columns}
+
+        self.rows += len(chunk)
+        if self.anomalies is not None:
+            self.anomalies.update(chunk)
+
+        msg_col = _pick_first_existing(self.columns, DEFAULT_MESSAGE_COLS, lower_map)
+        flags = _error_flags(chunk, lower_map, msg_col)
+        if flags is not None:
+            self.has_error_source = True
+            self.errors += int(flags.sum())
+
+        if self.time_col:
+            for hour, count in _hourly_counts(chunk[self.time_col]).items():
+                self.hour_counts[hour] = self.hour_counts.get(hour, 0) + int(count)
+
+        for i, c in enumerate(self.columns):
+            self.null_counts[c] += int(chunk.iloc[:, i].isna().sum())
+
+        numeric = chunk.iloc[:0].select_dtypes(include=["number"]).columns.tolist()
+        if self.numeric is None:
+            self.numeric = numeric
+        elif not set(self.numeric) <= set(numeric):
+            # A column turned non-numeric: moments so far covered rows
+            # that the final column set would not have excluded
+            self.numeric = [c for c in self.numeric if c in numeric]
+            self.moments_stale = True
+        if not self.moments_stale:
+            self._update_moments({c: chunk[c] for c in self.numeric})
+
+    def _update_moments(self, numeric: Dict[str, pd.Series]) -> None:
+        if not numeric:
+            return
+        valid = _valid_rows(numeric)
+        n = int(np.count_nonzero(valid))
+        if not n:
+            return
+        for c, s in numeric.items():
+            x = s.to_numpy(dtype="float64", na_value=np.nan)[valid]
+            mean = x.mean()
+            self.moments[c] = _merge_moments(self.moments.get(c), (n, mean, float(((x - mean) ** 2).sum())))
+
+    def count_outliers(self, numeric: Dict[str, pd.Series]) -> None:
+        if not numeric:
+            return
+        valid = _valid_rows(numeric)
+        if not valid.any():
+            return
+        self.outlier_rows += int(np.count_nonzero(valid))
+        for c, s in numeric.items():
+            n, mean, m2 = self.moments[c]
+            x = s.to_numpy(dtype="float64", na_value=np.nan)[valid]
+            z = (x - mean) / (np.sqrt(m2 / n) + 1e-9)
+            self.outliers[c] = self.outliers.get(c, 0) + int(np.count_nonzero(np.abs(z) > 3))
+
+    def merge(self, other: "KRIAccumulator") -> "KRIAccumulator":
+        """Folds in an accumulator built over a later part of the same file."""
+        if other.columns is None:
+            return self
+        if self.columns is None:
+            self.__dict__.update(other.__dict__)
+            return self
+
+        self.rows += other.rows
+        self.has_error_source = self.has_error_source or other.has_error_source
+        self.errors += other.errors
+        for hour, count in other.hour_counts.items():
+            self.hour_counts[hour] = self.hour_counts.get(hour, 0) + count
+        for c, count in other.null_counts.items():
+            self.null_counts[c] = self.null_counts.get(c, 0) + count
+
+        if self.numeric != other.numeric:
+            self.numeric = [c for c in self.numeric if c in other.numeric]
+            self.moments_stale = True
+        self.moments_stale = self.moments_stale or other.moments_stale
+        for c, m in other.moments.items():
+            self.moments[c] = _merge_moments(self.moments.get(c), m)
+        for c, count in other.outliers.items():
+            self.outliers[c] = self.outliers.get(c, 0) + count
+        self.outlier_rows += other.outlier_rows
+        if self.anomalies is not None and other.anomalies is not None:
+            self.anomalies.merge(other.anomalies)
+        return self
+
+    def kris(self) -> Dict[str, float]:
+        error_rate = self.errors / self.rows if self.rows and self.has_error_source else 0.0
+
+        volume_spike = 0.0
+        if self.hour_counts:
+            volume_spike = _spike_ratio(
+                min(self.hour_counts),
+                max(self.hour_counts),
+                max(self.hour_counts.values()),
+                sum(self.hour_counts.values()),
+            )
+
+        missingness = 0.0
+        if self.rows and self.null_counts:
+            missingness = float(np.mean([n / self.rows for n in self.null_counts.values()]))
+
+        outlier_intensity = 0.0
+        if self.outlier_rows and self.outliers:
+            outlier_intensity = float(np.mean([n / self.outlier_rows for n in self.outliers.values()]))
+
+        return {
+            "error_rate": round(float(error_rate), 4),
+            "volume_spike_ratio": round(volume_spike, 4),
+            "missingness": round(missingness, 4),
+            "numeric_outlier_intensity": round(outlier_intensity, 4),
+        }
+
+
+def _merge_moments(a: Optional[Tuple[int, float, float]], b: Tuple[int, float, float]) -> Tuple[int, float, float]:
+    # Chan et al. pairwise update of (count, mean, sum of squared deviations)
+    if a is None:
+        return b
+    n_a, mean_a, m2_a = a
+    n_b, mean_b, m2_b = b
+    n = n_a + n_b
+    delta = mean_b - mean_a
+    return n, mean_a + delta * n_b / n, m2_a + m2_b + delta * delta * n_a * n_b / n
+
+
+def _rewindable(source):
+    """Paths are re-opened per pass; non-seekable streams are spooled first."""
+    if isinstance(source, (str, os.PathLike)):
+        return source
+    if getattr(source, "seekable", lambda: False)():
+        return source
+    spool = tempfile.SpooledTemporaryFile(max_size=64 * 1024 * 1024)
+    shutil.copyfileobj(source, spool)
+    return spool
+
+
+def _read_chunks(source, chunksize: int, encoding: Optional[str], usecols=None):
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return pd.read_csv(source, chunksize=chunksize, encoding=encoding, usecols=usecols)
+
+
+def _accumulate(source, chunksize: int, encoding: Optional[str], anomaly_backend=None) -> KRIAccumulator:
+    acc = KRIAccumulator()
+    if anomaly_backend is not None:
+        acc.anomalies = anomaly_backend.stream()
+    with _read_chunks(source, chunksize, encoding) as reader:
+        for chunk in reader:
+            acc.update(chunk)
+    if acc.columns is None:
+        return acc
+
+    hinted = []
+    if not acc.numeric:
+        # Same fallback as compute_kris: coerce the hinted columns
+        lower_map = {c.lower(): c for c in acc.columns}
+        for h in DEFAULT_NUMERIC_COLS_HINT:
+            real = _pick_first_existing(acc.columns, [h], lower_map)
+            if real is not None and real not in hinted:
+                hinted.append(real)
+    columns = acc.numeric or hinted
+    if not columns:
+        return acc
+
+    def numeric_chunks():
+        with _read_chunks(source, chunksize, encoding, usecols=columns) as reader:
+            for chunk in reader:
+                if hinted:
+                    yield {c: pd.to_numeric(chunk[c], errors="coerce") for c in columns}
+                else:
+                    yield {c: chunk[c] for c in columns}
+
+    if hinted or acc.moments_stale:
+        acc.moments = {}
+        for numeric in numeric_chunks():
+            acc._update_moments(numeric)
+    for numeric in numeric_chunks():
+        acc.count_outliers(numeric)
+    return acc
+
+
+def accumulate_kris(source, chunksize: int = CHUNK_ROWS, anomaly_backend=None) -> KRIAccumulator:
+    """
+    Streams a CSV (path or file object) in chunks of `chunksize` rows and
+    returns the filled accumulator. One full pass collects everything but
+    the outlier counts; a second pass reading only the numeric columns
+    counts values beyond 3 std devs against the exact mean/std.
+    With anomaly_backend, its stream() counter also sees every chunk.
+    """
+    source = _rewindable(source)
+    try:
+        return _accumulate(source, chunksize, None, anomaly_backend)
+    except UnicodeDecodeError:
+        return _accumulate(source, chunksize, "latin-1", anomaly_backend)
+
+
+def compute_kris_chunked(source, chunksize: int = CHUNK_ROWS) -> Dict[str, float]:
+    """compute_kris for CSVs too large to load, with bounded memory."""
+    return accumulate_kris(source, chunksize).kris()
+
+
+# -----------------------------
+# Anomaly backends
+# -----------------------------
+ANOMALY_FIT_ROWS = 100_000
+ANOMALY_MAX_CATEGORIES = 50
+ANOMALY_MAX_MODELS = 16
+
+
+@dataclass
+class AnomalyResult:
+    rate: float
+    # Per-row anomaly score in (0, 1], higher is more anomalous (None if not
+    # available, e.g. for the heuristic or for chunked uploads)
+    scores: Optional[np.ndarray] = None
+
+
+class HeuristicAnomalyBackend:
+    """The original flag-count estimate derived from the KRIs."""
+
+    name = "Heuristic"
+
+    def score(self, df: pd.DataFrame, kris: Dict[str, float]) -> AnomalyResult:
+        return AnomalyResult(rate=anomaly_rate_from_kris(kris))
+
+    def stream(self) -> None:
+        # Nothing to accumulate: the rate comes from the final KRIs
+        return None
+
+
+class FeatureEncoder:
+    """
+    Turns a frame into the float matrix the IsolationForest was fitted on:
+    numeric columns (NaN -> fit-time median), low-cardinality text columns
+    (value -> fit-time frequency, unseen -> 0) and the error flag.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        lower_map = {c.lower(): c for c in df.columns}
+        self.msg_col = _pick_first_existing(df.columns, DEFAULT_MESSAGE_COLS, lower_map)
+        self.use_errors = _error_flags(df.iloc[:0], lower_map, self.msg_col) is not None
+
+        self.numeric: Dict[str, float] = {}
+        self.categorical: Dict[str, Dict[Any, float]] = {}
+        numeric_cols = set(df.iloc[:0].select_dtypes(include=["number"]).columns)
+        for c in df.columns:
+            if c in numeric_cols:
+                x = df[c].to_numpy(dtype="float64", na_value=np.nan)
+                finite = x[np.isfinite(x)]
+                self.numeric[c] = float(np.median(finite)) if len(finite) else 0.0
+            else:
+                freq = df[c].value_counts(normalize=True, dropna=False)
+                if len(freq) <= ANOMALY_MAX_CATEGORIES:
+                    self.categorical[c] = freq.to_dict()
+
+    @property
+    def n_features(self) -> int:
+        return len(self.numeric) + len(self.categorical) + int(self.use_errors)
+
+    def transform(self, df: pd.DataFrame) -> np.ndarray:
+        X = np.empty((len(df), self.n_features), dtype=np.float32)
+        j = 0
+        for c, fill in self.numeric.items():
+            x = pd.to_numeric(df[c], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+            X[:, j] = np.where(np.isfinite(x), x, fill)
+            j += 1
+        for c, freq in self.categorical.items():
+            X[:, j] = df[c].map(freq).fillna(0.0).to_numpy(dtype="float64")
+            j += 1
+        if self.use_errors:
+            lower_map = {c.lower(): c for c in df.columns}
+            X[:, j] = _error_flags(df, lower_map, self.msg_col).to_numpy(dtype="float64")
+        return X
+
+
+class IsolationForestBackend:
+    """
+    IsolationForest over the numeric and encoded columns. The forest is
+    fitted on at most fit_rows sampled rows and cached per schema (column
+    names and dtypes), so later uploads with the same layout are only
+    scored. Scoring runs on n_jobs threads.
+
+    Rows are flagged when their score is above the Tukey fence
+    (Q3 + 1.5 * IQR) of the fit sample's scores. IsolationForest's own
+    "auto" cut-off of 0.5 flags a large share of ordinary rows on
+    low-dimensional log data.
+    """
+
+    name = "IsolationForest"
+
+    def __init__(
+        self,
+        fit_rows: int = ANOMALY_FIT_ROWS,
+        n_estimators: int = 100,
+        n_jobs: int = -1,
+        max_models: int = ANOMALY_MAX_MODELS,
+        random_state: int = 0,
+    ):
+        self.fit_rows = fit_rows
+        self.n_estimators = n_estimators
+        self.n_jobs = n_jobs
+        self.max_models = max_models
+        self.random_state = random_state
+        self._models: "OrderedDict[str, Tuple[FeatureEncoder, Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def schema_key(df: pd.DataFrame) -> str:
+        layout = [(str(c), str(t)) for c, t in df.dtypes.items()]
+        return hashlib.sha256(json.dumps(layout).encode("utf-8")).hexdigest()
+
+    def fitted(self, df: pd.DataFrame) -> Optional[Tuple[FeatureEncoder, Any, float]]:
+        """Cached (encoder, forest, threshold) for df's schema, fitting one if needed."""
+        key = self.schema_key(df)
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                return self._models[key]
+
+        try:
+            from sklearn.ensemble import IsolationForest
+        except ImportError as exc:
+            raise ImportError("scikit-learn is required for the IsolationForest anomaly engine") from exc
+
+        sample = df
+        if len(df) > self.fit_rows:
+            sample = df.sample(n=self.fit_rows, random_state=self.random_state)
+        encoder = FeatureEncoder(sample)
+        if not encoder.n_features or sample.empty:
+            return None
+
+        X = encoder.transform(sample)
+        forest = IsolationForest(
+            n_estimators=self.n_estimators,
+            n_jobs=self.n_jobs,
+            random_state=self.random_state,
+        ).fit(X)
+        fit_scores = self._score_samples(forest, X)
+        q1, q3 = np.percentile(fit_scores, [25, 75])
+        fitted = (encoder, forest, float(q3 + 1.5 * (q3 - q1)))
+
+        with self._lock:
+            self._models[key] = fitted
+            while len(self._models) > self.max_models:
+                self._models.popitem(last=False)
+        return fitted
+
+    def _score_samples(self, forest, X: np.ndarray) -> np.ndarray:
+        from joblib import parallel_config
+
+        # score_samples only parallelises over trees when asked to
+        with parallel_config(backend="threading", n_jobs=self.n_jobs):
+            return -forest.score_samples(X)
+
+    def scores(self, fitted: Tuple[FeatureEncoder, Any, float], df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """Per-row anomaly scores and the boolean anomaly flags."""
+        encoder, forest, threshold = fitted
+        scores = self._score_samples(forest, encoder.transform(df))
+        return scores, scores > threshold
+
+    def score(self, df: pd.DataFrame, kris: Dict[str, float]) -> AnomalyResult:
+        fitted = self.fitted(df) if len(df) else None
+        if fitted is None:
+            # Nothing to fit on: fall back to the KRI heuristic
+            return HeuristicAnomalyBackend().score(df, kris)
+        scores, flags = self.scores(fitted, df)
+        return AnomalyResult(rate=float(flags.mean()), scores=scores)
+
+    def stream(self) -> "AnomalyCounter":
+        return AnomalyCounter(self)
+
+
+class AnomalyCounter:
+    """
+    Chunk-by-chunk anomaly count for uploads too large to load. The forest
+    is fitted on (a sample of) the first chunk unless one is cached for the
+    schema; per-row scores are not kept.
+    """
+
+    def __init__(self, backend: IsolationForestBackend):
+        self.backend = backend
+        self.fitted = None
+        self.rows = 0
+        self.anomalies = 0
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        if self.fitted is None:
+            self.fitted = self.backend.fitted(chunk)
+            if self.fitted is None:
+                return
+        _, flags = self.backend.scores(self.fitted, chunk)
+        self.rows += len(chunk)
+        self.anomalies += int(np.count_nonzero(flags))
+
+    def merge(self, other: "AnomalyCounter") -> "AnomalyCounter":
+        self.rows += other.rows
+        self.anomalies += other.anomalies
+        return self
+
+    @property
+    def rate(self) -> Optional[float]:
+        return self.anomalies / self.rows if self.rows else None
+
+
+ANOMALY_BACKENDS = {
+    IsolationForestBackend.name: IsolationForestBackend,
+    HeuristicAnomalyBackend.name: HeuristicAnomalyBackend,
+}
+
+
 def compute_risk_score(kris: Dict[str, float], anomaly_rate: float) -> float:
     """
     Weighted score 0..100. Tune weights later.
@@ -166,7 +707,7 @@ def make_report(df: pd.DataFrame, result: RiskResult) -> str:
     lines.append("ENTERPRISE RISK INTELLIGENCE DEMO REPORT")
     lines.append("=" * 44)
     lines.append(f"Generated: {datetime.utcnow().isoformat()}Z")
-    lines.append(f"Rows analysed: {len(df):,}")
+    lines.append(f"Rows analysed: {result.meta.get('shape', [len(df)])[0]:,}")
     lines.append("")
     lines.append(f"Risk score: {result.risk_score}/100")
     lines.append(f"Anomaly rate (est.): {result.anomaly_rate*100:.1f}%")
@@ -184,65 +725,317 @@ def make_report(df: pd.DataFrame, result: RiskResult) -> str:
 
 
 # -----------------------------
-# Streamlit UI
+# Upload cache (content-hash keyed)
 # -----------------------------
-st.set_page_config(page_title="Risk Intelligence Engine Live Demo", layout="wide")
-
-st.title("Enterprise Risk Intelligence Engine Live Demo")
-st.caption("Upload a CSV of logs/events → KRIs + anomaly estimate → risk score → narrative report")
-
-with st.sidebar:
-    st.header("Upload")
-    uploaded = st.file_uploader("Upload CSV", type=["csv"])
-    st.markdown("---")
-    st.header("Scoring")
-    st.write("This demo uses lightweight heuristics so it runs anywhere.")
-    st.write("You can swap in IsolationForest later without changing the UI.")
-
-if not uploaded:
-    st.info("Upload a CSV to get started.")
-    st.stop()
-
-# Read CSV safely
-try:
-    df = pd.read_csv(uploaded)
-except Exception:
+@dataclass
+class AnalysedUpload:
+    df: pd.DataFrame
+    result: RiskResult
+    report_text: str
+    nbytes: int
+    anomaly_scores: Optional[np.ndarray] = None
+
+    @property
+    def rows(self) -> int:
+        # df is only a preview for uploads scored chunk by chunk
+        return self.result.meta["shape"][0]
+
+
+class UploadCache:
+    """
+    Process-wide LRU of analysed uploads keyed by content hash. Entries are
+    evicted oldest-first once their frames exceed max_bytes in total; the
+    newest entry is always kept, however large.
+    """
+
+    def __init__(self, max_bytes: int = CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, AnalysedUpload]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[AnalysedUpload]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, entry: AnalysedUpload) -> None:
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= old.nbytes
+            self._entries[key] = entry
+            self.nbytes += entry.nbytes
+            while self.nbytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+
+
+@st.cache_resource
+def get_upload_cache() -> UploadCache:
+    # cache_resource hands every session the same object (no pickling, no copies)
+    return UploadCache(CACHE_MAX_BYTES)
+
+
+def upload_digest(uploaded) -> str:
+    """SHA-256 of the upload, computed once per uploaded file per session."""
+    memo = st.session_state.setdefault("_upload_digests", {})
+    file_id = getattr(uploaded, "file_id", None)
+    digest = memo.get(file_id) if file_id is not None else None
+    if digest is None:
+        digest = hashlib.sha256(uploaded.getbuffer()).hexdigest()
+        if file_id is not None:
+            memo.clear()
+            memo[file_id] = digest
+    return digest
+
+
+def read_csv_upload(uploaded, nrows: Optional[int] = None) -> pd.DataFrame:
+    # Read CSV safely
     uploaded.seek(0)
-    df = pd.read_csv(uploaded, encoding="latin-1")
-
-st.subheader("Preview")
-st.dataframe(df.head(20), use_container_width=True)
-
-st.subheader("Risk Results")
-kris = compute_kris(df)
-anomaly_rate = compute_anomaly_rate(df)
-risk_score = compute_risk_score(kris, anomaly_rate)
-narrative = build_narrative(kris, anomaly_rate, risk_score)
-
-result = RiskResult(
-    anomaly_rate=anomaly_rate,
-    risk_score=risk_score,
-    kris=kris,
-    narrative=narrative,
-    meta={"columns": list(df.columns), "shape": list(df.shape)},
-)
-
-col1, col2, col3 = st.columns(3)
-col1.metric("Risk score", f"{risk_score}/100")
-col2.metric("Anomaly rate (est.)", f"{anomaly_rate*100:.1f}%")
-col3.metric("Rows analysed", f"{len(df):,}")
-
-st.markdown("### KRIs")
-st.json(kris)
-
-st.markdown("### Narrative")
-st.write(narrative)
-
-report_text = make_report(df, result)
-st.markdown("### Download report")
-st.download_button(
-    label="Download report (TXT)",
-    data=report_text.encode("utf-8"),
-    file_name="risk_report.txt",
-    mime="text/plain",
-)
\ No newline at end of file
+    try:
+        return pd.read_csv(uploaded, nrows=nrows)
+    except Exception:
+        uploaded.seek(0)
+        return pd.read_csv(uploaded, encoding="latin-1", nrows=nrows)
+
+
+def build_result(kris: Dict[str, float], columns, shape, anomaly_rate: Optional[float] = None) -> RiskResult:
+    if anomaly_rate is None:
+        anomaly_rate = anomaly_rate_from_kris(kris)
+    risk_score = compute_risk_score(kris, anomaly_rate)
+    narrative = build_narrative(kris, anomaly_rate, risk_score)
+
+    return RiskResult(
+        anomaly_rate=anomaly_rate,
+        risk_score=risk_score,
+        kris=kris,
+        narrative=narrative,
+        meta={"columns": [str(c) for c in columns], "shape": list(shape)},
+    )
+
+
+def analyse_frame(df: pd.DataFrame, backend=None) -> AnalysedUpload:
+    backend = backend or HeuristicAnomalyBackend()
+    kris = compute_kris(df)
+    anomalies = backend.score(df, kris)
+    result = build_result(kris, df.columns, df.shape, anomalies.rate)
+
+    nbytes = _frame_nbytes(df)
+    if anomalies.scores is not None:
+        nbytes += anomalies.scores.nbytes
+    return AnalysedUpload(
+        df=df,
+        result=result,
+        report_text=make_report(df, result),
+        nbytes=nbytes,
+        anomaly_scores=anomalies.scores,
+    )
+
+
+def analyse_large_upload(uploaded, backend=None) -> AnalysedUpload:
+    """
+    Scores an upload chunk by chunk (compute_kris_chunked) and keeps only
+    the first PREVIEW_ROWS rows as its frame.
+    """
+    backend = backend or HeuristicAnomalyBackend()
+    acc = accumulate_kris(uploaded, anomaly_backend=backend)
+    kris = acc.kris()
+    columns = acc.columns or []
+    anomaly_rate = acc.anomalies.rate if acc.anomalies is not None else None
+    preview = read_csv_upload(uploaded, nrows=PREVIEW_ROWS)
+    result = build_result(kris, columns, (acc.rows, len(columns)), anomaly_rate)
+    return AnalysedUpload(
+        df=preview,
+        result=result,
+        report_text=make_report(preview, result),
+        nbytes=_frame_nbytes(preview),
+    )
+
+
+def _frame_nbytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def _disk_paths(key: str) -> Tuple[Path, Path, Path]:
+    base = Path(CACHE_DIR)
+    return base / f"{key}.parquet", base / f"{key}.json", base / f"{key}.scores.npy"
+
+
+def load_cached_upload(key: str) -> Optional[AnalysedUpload]:
+    """Loads a previously analysed upload from the Parquet cache, if any."""
+    if not CACHE_DIR:
+        return None
+    parquet_path, meta_path, scores_path = _disk_paths(key)
+    if not (parquet_path.exists() and meta_path.exists()):
+        return None
+    try:
+        df = pd.read_parquet(parquet_path)
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        scores = np.load(scores_path) if scores_path.exists() else None
+    except Exception:
+        return None  # unreadable or no Parquet engine: treat as a miss
+
+    # Touch both files so disk pruning is least-recently-used too
+    for path in (parquet_path, meta_path):
+        os.utime(path)
+    nbytes = _frame_nbytes(df) + (scores.nbytes if scores is not None else 0)
+    return AnalysedUpload(
+        df=df,
+        result=RiskResult(**meta["result"]),
+        report_text=meta["report_text"],
+        nbytes=nbytes,
+        anomaly_scores=scores,
+    )
+
+
+def save_cached_upload(key: str, entry: AnalysedUpload) -> None:
+    if not CACHE_DIR:
+        return
+    parquet_path, meta_path, scores_path = _disk_paths(key)
+    parquet_path.parent.mkdir(parents=True, exist_ok=True)
+
+    tmp = parquet_path.with_name(parquet_path.name + ".tmp")
+    try:
+        # Parquet needs string column names
+        entry.df.rename(columns=str).to_parquet(tmp)
+    except Exception:
+        # No Parquet engine installed, or column types Parquet can't hold
+        tmp.unlink(missing_ok=True)
+        return
+    os.replace(tmp, parquet_path)
+
+    if entry.anomaly_scores is not None:
+        tmp = scores_path.with_name(scores_path.name + ".tmp")
+        with tmp.open("wb") as f:
+            np.save(f, entry.anomaly_scores)
+        os.replace(tmp, scores_path)
+
+    meta = {"result": asdict(entry.result), "report_text": entry.report_text}
+    tmp = meta_path.with_name(meta_path.name + ".tmp")
+    tmp.write_text(json.dumps(meta), encoding="utf-8")
+    os.replace(tmp, meta_path)
+
+    _prune_disk_cache(Path(CACHE_DIR), CACHE_DISK_MAX_BYTES)
+
+
+def _prune_disk_cache(cache_dir: Path, max_bytes: int) -> None:
+    files = []
+    for path in cache_dir.glob("*.parquet"):
+        try:
+            st_ = path.stat()
+        except FileNotFoundError:
+            continue
+        files.append((st_.st_mtime, st_.st_size, path))
+
+    total = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files)[:-1]:  # never drop the newest entry
+        if total <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        path.with_suffix(".json").unlink(missing_ok=True)
+        path.with_suffix(".scores.npy").unlink(missing_ok=True)
+        total -= size
+
+
+@st.cache_resource
+def get_anomaly_backend(name: str):
+    # One instance per process, so fitted models are shared across sessions
+    return ANOMALY_BACKENDS[name]()
+
+
+def get_analysed_upload(uploaded, backend=None) -> AnalysedUpload:
+    """
+    Parses and scores an upload, reusing earlier work for identical content:
+    memory cache first, then the Parquet cache, then a fresh read_csv
+    (chunked for uploads of CHUNKED_MIN_BYTES or more).
+    """
+    backend = backend or HeuristicAnomalyBackend()
+    key = f"{upload_digest(uploaded)}-{backend.name.lower()}"
+    cache = get_upload_cache()
+
+    entry = cache.get(key)
+    if entry is not None:
+        return entry
+
+    entry = load_cached_upload(key)
+    if entry is None and uploaded.getbuffer().nbytes >= CHUNKED_MIN_BYTES:
+        entry = analyse_large_upload(uploaded, backend)
+        save_cached_upload(key, entry)
+    elif entry is None:
+        entry = analyse_frame(read_csv_upload(uploaded), backend)
+        save_cached_upload(key, entry)
+
+    cache.put(key, entry)
+    return entry
+
+
+# -----------------------------
+# Streamlit UI
+# -----------------------------
+def main() -> None:
+    st.set_page_config(page_title="Risk Intelligence Engine Live Demo", layout="wide")
+
+    st.title("Enterprise Risk Intelligence Engine Live Demo")
+    st.caption("Upload a CSV of logs/events → KRIs + anomaly estimate → risk score → narrative report")
+
+    with st.sidebar:
+        st.header("Upload")
+        uploaded = st.file_uploader("Upload CSV", type=["csv"])
+        st.markdown("---")
+        st.header("Scoring")
+        engine = st.selectbox("Anomaly engine", list(ANOMALY_BACKENDS))
+        st.write("IsolationForest scores every row; Heuristic estimates the rate from the KRIs.")
+
+    if not uploaded:
+        st.info("Upload a CSV to get started.")
+        st.stop()
+
+    analysed = get_analysed_upload(uploaded, get_anomaly_backend(engine))
+    df = analysed.df
+    result = analysed.result
+
+    st.subheader("Preview")
+    st.dataframe(df.head(PREVIEW_ROWS), use_container_width=True)
+
+    st.subheader("Risk Results")
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Risk score", f"{result.risk_score}/100")
+    col2.metric("Anomaly rate (est.)", f"{result.anomaly_rate*100:.1f}%")
+    col3.metric("Rows analysed", f"{analysed.rows:,}")
+
+    st.markdown("### KRIs")
+    st.json(result.kris)
+
+    st.markdown("### Narrative")
+    st.write(result.narrative)
+
+    if analysed.anomaly_scores is not None:
+        st.markdown("### Most anomalous rows")
+        top = np.argsort(-analysed.anomaly_scores, kind="stable")[:PREVIEW_ROWS]
+        st.dataframe(
+            df.iloc[top].assign(anomaly_score=analysed.anomaly_scores[top].round(4)),
+            use_container_width=True,
+        )
+
+    st.markdown("### Download report")
+    st.download_button(
+        label="Download report (TXT)",
+        data=analysed.report_text.encode("utf-8"),
+        file_name="risk_report.txt",
+        mime="text/plain",
+    )
+
+
+if __name__ == "__main__":
+    main()
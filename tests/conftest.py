@@ -0,0 +1,22 @@
+# conftest.py
+# Makes the log pipeline (flat modules in src/), the profile engine
+# (imported as the risk_engine package) and streamlit_app importable from
+# the tests, the same way benchmarks/run_benchmarks.py does.
+
+import sys
+import types
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+SRC_DIR = REPO_ROOT / "src"
+
+for path in (str(SRC_DIR), str(REPO_ROOT)):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+try:
+    import risk_engine  # noqa: F401  (installed or symlinked package)
+except ImportError:
+    package = types.ModuleType("risk_engine")
+    package.__path__ = [str(SRC_DIR)]
+    sys.modules["risk_engine"] = package
@@ -0,0 +1,120 @@
+# Parquet / Arrow IPC: RecordWriter output must read back as written
+
+import csv
+import json
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+from arrow_io import RecordWriter, as_text, convert_csv, iter_batches, iter_records, read_table, write_records
+from log_event import LogEvent
+from log_reader import read_log_events, read_rows
+from risk_analyzer import scored_schema
+from risk_engine.profile_io import iter_profiles, write_profiles
+
+from conftest import REPO_ROOT
+
+
+SUFFIXES = [".parquet", ".arrow"]
+HEADER = ["timestamp", "user", "event_type", "source_ip", "status"]
+
+
+def scored_events(count):
+    events = []
+    for i in range(count):
+        event = LogEvent(f"2024-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}Z", f"user{i % 7}", "login", f"10.0.{i % 3}.{i % 250}", "failed")
+        if i % 4:
+            event.reason = "Failed login"
+            event.score = i % 10
+            event.risk_level = "High" if i % 10 >= 7 else "Medium"
+        events.append(event)
+    return events
+
+
+@pytest.mark.parametrize("suffix", SUFFIXES)
+def test_scored_events_round_trip(tmp_path, suffix):
+    path = tmp_path / ("scored" + suffix)
+    events = scored_events(250)
+    with RecordWriter(path, schema=scored_schema, batch_rows=64) as writer:
+        writer.write_all(events)
+    assert writer.count == 250
+
+    # Unset scored fields come back as nulls
+    expected = [{name: event.get(name) for name in scored_schema(pa).names} for event in events]
+    assert list(iter_records(path, batch_rows=50)) == expected
+    assert read_table(path).schema == scored_schema(pa)
+    assert [b.num_rows for b in iter_batches(path, batch_rows=64)] == [64, 64, 64, 58]
+
+
+@pytest.mark.parametrize("suffix", SUFFIXES)
+def test_inferred_schema_round_trip(tmp_path, suffix):
+    path = tmp_path / ("records" + suffix)
+    records = [{"id": i, "score": i / 3, "tags": ["a"] * (i % 3), "nested": {"ok": i % 2 == 0}} for i in range(100)]
+    assert write_records(iter(records), path, batch_rows=30) == 100
+    assert list(iter_records(path)) == records
+
+
+@pytest.mark.parametrize("suffix", SUFFIXES)
+def test_tee_passes_records_on(tmp_path, suffix):
+    path = tmp_path / ("tee" + suffix)
+    events = scored_events(10)
+    with RecordWriter(path, schema=scored_schema) as writer:
+        assert list(writer.tee(events)) == events
+    assert [r["user"] for r in iter_records(path)] == [e.user for e in events]
+
+
+@pytest.mark.parametrize("suffix", SUFFIXES)
+def test_empty_writer_leaves_a_readable_file(tmp_path, suffix):
+    path = tmp_path / ("empty" + suffix)
+    RecordWriter(path, schema=scored_schema).close()
+    assert list(iter_records(path)) == []
+    assert read_table(path).schema == scored_schema(pa)
+
+
+def test_ipc_stream_format_is_read_too(tmp_path):
+    path = tmp_path / "stream.arrow"
+    table = pa.table({"a": [1, 2, 3], "b": ["x", "y", None]})
+    with pa.ipc.new_stream(str(path), table.schema) as writer:
+        writer.write_table(table)
+    assert list(iter_records(path)) == table.to_pylist()
+    assert [b.schema.names for b in iter_batches(path, columns=["b", "missing"])] == [["b"]]
+
+
+def test_as_text_formats_timestamps_and_numbers():
+    table = pa.table(
+        {
+            "t": pa.array([0, 90], type=pa.timestamp("s", tz="UTC")),
+            "n": [1, 2],
+            "c": pa.array(["x", "y"]).dictionary_encode(),
+        }
+    )
+    assert as_text(table).to_pylist() == [
+        {"t": "1970-01-01T00:00:00Z", "n": "1", "c": "x"},
+        {"t": "1970-01-01T00:01:30Z", "n": "2", "c": "y"},
+    ]
+
+
+@pytest.mark.parametrize("suffix", SUFFIXES)
+def test_converted_csv_reads_back_like_the_csv(tmp_path, suffix):
+    src = tmp_path / "logs.csv"
+    with open(src, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER + ["host"])
+        for i in range(500):
+            writer.writerow([f"2024-01-01T00:00:{i % 60:02d}Z", f"u{i % 5}", "Login", f"10.0.0.{i % 9}", "" if i % 11 == 0 else "failed", "007"])
+    dst = tmp_path / ("logs" + suffix)
+    assert convert_csv(src, dst) == 500
+
+    assert list(read_rows(dst)) == list(read_rows(src))
+    assert [e.to_dict() for e in read_log_events(dst)] == [e.to_dict() for e in read_log_events(src)]
+
+
+@pytest.mark.parametrize("suffix", SUFFIXES)
+def test_profiles_round_trip(tmp_path, suffix):
+    sample = json.loads((REPO_ROOT / "examples" / "sample_input.json").read_text(encoding="utf-8"))
+    partial = {k: v for k, v in sample.items() if k != "documentation"}
+    profiles = [sample, partial, {**sample, "customer_id": "c-42"}]
+    path = tmp_path / ("profiles" + suffix)
+    assert write_profiles(profiles, path) == 3
+    assert list(iter_profiles(path)) == profiles
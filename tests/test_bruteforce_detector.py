@@ -0,0 +1,78 @@
+# KRI1 sliding-window brute-force detection and its effect on scores
+
+import json
+
+from anomaly_detector import AnomalyDetector
+from bruteforce_detector import BruteForceDetector, parse_timestamp
+from log_event import LogEvent
+from risk_score_engine import RiskScorer
+from rule_spec import DEFAULT_RULE_SPEC, compile_rule_spec
+
+
+def failed_login(ts, user="bob", ip="10.0.0.8"):
+    return {"timestamp": ts, "user": user, "event_type": "login", "source_ip": ip, "status": "failed"}
+
+
+BOB = [failed_login(f"2025-11-15T09:0{m}:00Z") for m in (5, 6, 7)]
+
+
+def with_bonus(bonus):
+    spec = json.loads(json.dumps(DEFAULT_RULE_SPEC))
+    spec["events"]["bruteforce_bonus"] = bonus
+    return compile_rule_spec(spec)
+
+
+def scored(rows, rules=None, **detector_args):
+    detector = AnomalyDetector(rules=rules, bruteforce=BruteForceDetector(**detector_args))
+    return RiskScorer(rules=rules).score_events(detector.detect_anomalies(rows))
+
+
+def test_parse_timestamp_accepts_z_suffix():
+    expected = parse_timestamp("2025-11-15T09:05:10+00:00")
+    assert expected is not None
+    assert parse_timestamp("2025-11-15T09:05:10Z") == expected
+    assert parse_timestamp("2025-11-15T09:05:10z") == expected
+    assert parse_timestamp("not a time") is None
+    assert parse_timestamp("") is None
+
+
+def test_burst_is_annotated_but_not_rescored_by_default():
+    first, second, third = scored(BOB, threshold=3, window_seconds=300)
+    assert "Repeated failed logins" not in first.reason
+    assert "Repeated failed logins" in third.reason
+    assert [(e.score, e.risk_level) for e in (first, second, third)] == [(5, "Medium")] * 3
+
+
+def test_slow_failures_are_not_a_burst():
+    rows = [failed_login(f"2025-11-15T09:{m:02d}:00Z") for m in (0, 10, 20)]
+    assert [e.score for e in scored(rows, threshold=3, window_seconds=300)] == [5, 5, 5]
+
+
+def test_bruteforce_bonus_is_opt_in_through_the_rule_spec():
+    first, _, third = scored(BOB, rules=with_bonus(2), threshold=3, window_seconds=300)
+    assert first.score == 5
+    assert "Repeated failed logins" in third.reason
+    assert (third.score, third.risk_level) == (7, "High")
+
+
+def test_burst_flag_does_not_leak_into_a_later_pass():
+    rules = with_bonus(2)
+    events = [LogEvent.from_row(row) for row in BOB]
+
+    with_bursts = AnomalyDetector(rules=rules, bruteforce=BruteForceDetector(threshold=3, window_seconds=300))
+    assert RiskScorer(rules=rules).score_events(with_bursts.detect_anomalies(events))[-1].score == 7
+
+    # Same event objects, no brute-force detector: plain failed logins again
+    third = RiskScorer(rules=rules).score_events(AnomalyDetector(rules=rules).detect_anomalies(events))[-1]
+    assert third.reason == "Failed action"
+    assert (third.score, third.risk_level) == (5, "Medium")
+
+
+def test_idle_keys_are_evicted():
+    detector = BruteForceDetector(threshold=3, window_seconds=60, max_keys=100)
+    for i in range(1000):
+        detector.observe(failed_login(f"2025-11-15T09:00:{i % 60:02d}Z", user=f"u{i}", ip=f"10.0.{i // 250}.{i % 250}"))
+    assert len(detector) <= 100
+    detector.observe(failed_login("2025-11-15T10:00:00Z"))
+    # Everything but the newest user and IP keys went idle for over the TTL
+    assert len(detector) == 2
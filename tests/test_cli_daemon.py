@@ -0,0 +1,61 @@
+# The CLI daemon only serves (and only trusts) the user running it
+
+import json
+import os
+import stat
+import threading
+
+import pytest
+
+from conftest import REPO_ROOT
+from risk_engine import cli_daemon
+from risk_engine.cli_daemon import CLIDaemon, call_daemon, default_socket_path
+
+
+SAMPLE = str(REPO_ROOT / "examples" / "sample_input.json")
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    # Exits once idle for a second; join() waits for that
+    daemon = CLIDaemon(str(tmp_path / "d.sock"), idle_timeout=1)
+    daemon.bind()
+    thread = threading.Thread(target=daemon.serve_forever, daemon=True)
+    thread.start()
+    daemon.join = lambda: thread.join(30)
+    yield daemon
+    daemon.join()
+
+
+def test_socket_is_owner_only(daemon):
+    assert stat.S_IMODE(os.stat(daemon.socket_path).st_mode) == 0o600
+
+
+def test_same_user_is_served(daemon, capsys):
+    assert call_daemon(daemon.socket_path, "cli_main", ["--input", SAMPLE]) == 0
+    assert "risk_band" in json.loads(capsys.readouterr().out)
+    daemon.join()
+    assert daemon.served == 1
+
+
+def test_other_users_are_refused(daemon, monkeypatch, capsys):
+    monkeypatch.setattr(cli_daemon, "peer_uid", lambda sock: os.getuid() + 1)
+    # The daemon drops the caller, and the caller distrusts the daemon
+    assert call_daemon(daemon.socket_path, "cli_main", ["--input", SAMPLE]) is None
+    assert "belongs to another user" in capsys.readouterr().err
+    daemon.join()
+    assert (daemon.served, daemon.refused) == (0, 1)
+
+
+def test_default_socket_path(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    assert default_socket_path() == str(tmp_path / "risk-engine.sock")
+
+    monkeypatch.delenv("XDG_RUNTIME_DIR")
+    monkeypatch.setattr(cli_daemon.tempfile, "gettempdir", lambda: str(tmp_path))
+    path = default_socket_path()
+    assert stat.S_IMODE(os.stat(os.path.dirname(path)).st_mode) == 0o700
+
+    os.chmod(os.path.dirname(path), 0o777)
+    with pytest.raises(RuntimeError):
+        default_socket_path()
@@ -0,0 +1,103 @@
+# ColumnarRiskEngine must reproduce the row pipeline record for record
+
+import csv
+import json
+import random
+
+import pytest
+
+from anomaly_detector import AnomalyDetector
+from bruteforce_detector import BruteForceDetector
+from columnar_engine import ColumnarRiskEngine
+from risk_score_engine import RiskScorer
+from rule_spec import DEFAULT_RULE_SPEC, compile_rule_spec
+from watchlist import Watchlist, build_watchlist
+
+
+EVENT_TYPES = ["login", "Login", "logout", "file_access", "privilege_escalation", "data_export", "api_call"]
+
+
+def write_log(path, rows=5000, seed=7):
+    rng = random.Random(seed)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["timestamp", "user", "event_type", "source_ip", "status"])
+        for i in range(rows):
+            # Few users and IPs, so failed logins form brute-force bursts
+            writer.writerow(
+                [
+                    f"2025-11-15T{9 + i // 3600:02d}:{i // 60 % 60:02d}:{i % 60:02d}Z",
+                    rng.choice(["alice", "bob", "carol", "dave", ""]),
+                    rng.choice(EVENT_TYPES),
+                    rng.choice(["10.0.0.5", "10.0.0.8", "192.168.1.20", "2001:db8::1", "", "gateway"]),
+                    rng.choice(["success", "success", "Failed", "failed"]),
+                ]
+            )
+    return path
+
+
+def make_detector(watchlist=None, rules=None):
+    bruteforce = BruteForceDetector(threshold=3, window_seconds=120)
+    return AnomalyDetector(rules=rules, bruteforce=bruteforce, watchlist=watchlist)
+
+
+def row_results(path, watchlist=None, rules=None):
+    detector = make_detector(watchlist, rules)
+    scored = RiskScorer(rules=rules).score_events(detector.detect_anomalies(detector.load_logs(str(path), workers=1)))
+    return [e.to_dict() for e in scored]
+
+
+def frame_results(frames, watchlist=None, rules=None):
+    engine = ColumnarRiskEngine(detector=make_detector(watchlist, rules), scorer=RiskScorer(rules=rules))
+    records = []
+    for df in frames(engine):
+        records.extend(engine.to_records(engine.process_frame(df)))
+    return [{k: (int(v) if k == "score" else v) for k, v in r.items()} for r in records]
+
+
+@pytest.fixture
+def log(tmp_path):
+    return write_log(tmp_path / "logs.csv")
+
+
+@pytest.fixture
+def watchlist(tmp_path):
+    path = tmp_path / "watch.wl"
+    build_watchlist(["carol", "10.0.0.8", "2001:db8::1"], path)
+    with Watchlist(path) as wl:
+        yield wl
+
+
+def test_matches_row_path(log):
+    expected = row_results(log)
+    assert any("Repeated failed logins" in r["reason"] for r in expected)
+    assert frame_results(lambda e: [e.read_logs(str(log))]) == expected
+
+
+def test_matches_row_path_with_bruteforce_bonus(log):
+    spec = json.loads(json.dumps(DEFAULT_RULE_SPEC))
+    spec["events"]["bruteforce_bonus"] = 2
+    rules = compile_rule_spec(spec)
+    expected = row_results(log, rules=rules)
+    assert expected != row_results(log)
+    assert frame_results(lambda e: [e.read_logs(str(log))], rules=rules) == expected
+
+
+def test_matches_row_path_with_watchlist(log, watchlist):
+    expected = row_results(log, watchlist)
+    assert any("Watchlisted user and source IP" in r["reason"] for r in expected)
+    assert frame_results(lambda e: [e.read_logs(str(log))], watchlist) == expected
+
+
+def test_chunks_carry_brute_force_state(log):
+    # Chunk boundaries split bursts; the detector state must carry over
+    assert frame_results(lambda e: e.read_logs(str(log), chunksize=777)) == row_results(log)
+
+
+def test_falls_back_to_pandas_on_short_rows(tmp_path):
+    path = tmp_path / "short.csv"
+    path.write_text("timestamp,user,event_type,source_ip,status\n2025-11-15T09:00:00Z,bob,data_export\n", encoding="utf-8")
+    engine = ColumnarRiskEngine()
+    scored = engine.process_frame(engine.read_logs(str(path)))
+    assert scored["event_type"].tolist() == ["data_export"]
+    assert scored["score"].tolist() == [r["score"] for r in row_results(path)]
@@ -0,0 +1,55 @@
+# Entity risk snapshots and the half-life they are reloaded with
+
+import pytest
+
+from entity_risk import DEFAULT_HALF_LIFE, EntityRisk
+
+
+EVENTS = [
+    {"timestamp": "2024-01-01T00:00:00Z", "user": "alice", "source_ip": "10.0.0.1", "score": 8},
+    {"timestamp": "2024-01-01T06:00:00Z", "user": "bob", "source_ip": "10.0.0.2", "score": 5},
+    {"timestamp": "2024-01-01T12:00:00Z", "user": "alice", "source_ip": "10.0.0.1", "score": 4},
+]
+HOUR = 3600
+
+
+def snapshot(half_life):
+    store = EntityRisk(half_life=half_life)
+    store.add_all(EVENTS)
+    return store
+
+
+def test_snapshot_half_life_is_adopted_when_none_is_given():
+    state = snapshot(6 * HOUR).to_state()
+    store = EntityRisk()
+    store.load_state(state)
+    assert store.half_life == 6 * HOUR
+    assert store.risk("user", "alice") == pytest.approx(4 + 8 * 0.25)
+
+    assert EntityRisk().half_life == DEFAULT_HALF_LIFE
+
+
+def test_given_half_life_overrides_the_snapshot_and_rescales_it():
+    old = snapshot(6 * HOUR)
+    store = EntityRisk(half_life=HOUR)
+    store.load_state(old.to_state())
+    assert store.half_life == HOUR
+
+    # Risk at the snapshot's last anomaly is carried over unchanged...
+    for dim, key in (("user", "alice"), ("user", "bob"), ("source_ip", "10.0.0.2")):
+        assert store.risk(dim, key) == pytest.approx(old.risk(dim, key))
+    # ...and decays at the new rate from there
+    later = old.watermark + 2 * HOUR
+    assert store.risk("user", "alice", at=later) == pytest.approx(old.risk("user", "alice") / 4)
+
+    store.add({"timestamp": "2024-01-01T13:00:00Z", "user": "bob", "source_ip": "10.0.0.2", "score": 1})
+    # 2.5 carried over at 12:00, halved by 13:00
+    assert store.risk("user", "bob") == pytest.approx(1 + 1.25)
+    assert [row["user"] for row in store.top("user")] == ["alice", "bob"]
+
+
+def test_same_half_life_round_trips():
+    old = snapshot(6 * HOUR)
+    store = EntityRisk(half_life=6 * HOUR)
+    store.load_state(old.to_state())
+    assert store.to_state() == old.to_state()
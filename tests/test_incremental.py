@@ -0,0 +1,144 @@
+# Incremental (--incremental) runs: offsets, resumption and inputs
+
+import csv
+import gzip
+import json
+import subprocess
+import sys
+
+import pytest
+
+from incremental import IncrementalAnalyzer
+from risk_analyzer import run_risk_analysis
+from conftest import SRC_DIR
+
+
+HEADER = ["timestamp", "user", "event_type", "source_ip", "status"]
+
+
+def rows(start, count):
+    return [
+        [f"2025-11-15T09:{(start + i) // 60 % 60:02d}:{(start + i) % 60:02d}Z", f"u{(start + i) % 7}",
+         "data_export" if i % 5 == 0 else "login", "10.0.0.1", "failed" if i % 3 == 0 else "success"]
+        for i in range(count)
+    ]
+
+
+def write_csv(path, data, header=True, mode="w"):
+    with open(path, mode, newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        if header:
+            writer.writerow(HEADER)
+        writer.writerows(data)
+
+
+def analyzer(tmp_path, **kwargs):
+    return IncrementalAnalyzer(tmp_path / "checkpoint.json", tmp_path / "scored.jsonl", **kwargs)
+
+
+def scored_lines(tmp_path):
+    return (tmp_path / "scored.jsonl").read_text(encoding="utf-8").splitlines()
+
+
+def batch_anomalies(tmp_path, log):
+    return run_risk_analysis(str(log), str(tmp_path / "report.html"), stream=True)["anomalies"]
+
+
+def test_only_new_rows_are_processed(tmp_path):
+    log = tmp_path / "logs.csv"
+    write_csv(log, rows(0, 100))
+    assert analyzer(tmp_path).run(str(log))["new_logs"] == 100
+
+    write_csv(log, rows(100, 50), header=False, mode="a")
+    result = analyzer(tmp_path).run(str(log))
+    assert result["new_logs"] == 50 and result["logs"] == 150
+    assert result["anomalies"] == len(scored_lines(tmp_path)) == batch_anomalies(tmp_path, log)
+
+    assert analyzer(tmp_path).run(str(log))["new_logs"] == 0
+
+
+def test_partial_last_line_waits_for_next_run(tmp_path):
+    log = tmp_path / "logs.csv"
+    write_csv(log, rows(0, 10))
+    with open(log, "a", encoding="utf-8") as f:
+        f.write("2025-11-15T10:00:00Z,bob,login,10.0.0.1,fai")
+    assert analyzer(tmp_path).run(str(log))["new_logs"] == 10
+
+    with open(log, "a", encoding="utf-8") as f:
+        f.write("led\n")
+    assert analyzer(tmp_path).run(str(log))["new_logs"] == 1
+    assert json.loads(scored_lines(tmp_path)[-1])["status"] == "failed"
+
+
+def test_quoted_newlines_stay_in_one_row(tmp_path):
+    log = tmp_path / "logs.csv"
+    write_csv(log, [["2025-11-15T09:00:00Z", "bob\nsmith", "data_export", "10.0.0.1", "success"]] + rows(1, 4))
+    assert analyzer(tmp_path).run(str(log))["new_logs"] == 5
+    assert json.loads(scored_lines(tmp_path)[0])["user"] == "bob\nsmith"
+
+    # A record whose quoted field is still open is not consumed yet
+    with open(log, "a", encoding="utf-8") as f:
+        f.write('2025-11-15T09:10:00Z,"carol\n')
+    assert analyzer(tmp_path).run(str(log))["new_logs"] == 0
+    with open(log, "a", encoding="utf-8") as f:
+        f.write('jones",data_export,10.0.0.2,success\n')
+    assert analyzer(tmp_path).run(str(log))["new_logs"] == 1
+    assert json.loads(scored_lines(tmp_path)[-1])["user"] == "carol\njones"
+
+
+def test_compressed_and_columnar_inputs(tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    logs = tmp_path / "logs"
+    logs.mkdir()
+    write_csv(logs / "a.csv", rows(0, 20))
+    with gzip.open(logs / "b.csv.gz", "wt", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows(rows(20, 30))
+    data = rows(50, 40)
+    pq.write_table(pa.table({name: [r[i] for r in data] for i, name in enumerate(HEADER)}), logs / "c.parquet")
+
+    assert analyzer(tmp_path).run(str(logs))["new_logs"] == 90
+    assert analyzer(tmp_path).run(str(logs))["new_logs"] == 0
+
+    # An appended gzip member: only its rows are new
+    with gzip.open(logs / "b.csv.gz", "at", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows(rows(90, 5))
+    assert analyzer(tmp_path).run(str(logs))["new_logs"] == 5
+
+
+def test_resumes_after_crash_without_duplicates(tmp_path):
+    log = tmp_path / "logs.csv"
+    write_csv(log, rows(0, 200))
+
+    crashing = analyzer(tmp_path, checkpoint_every=25)
+    record = crashing._record
+    seen = []
+
+    def crash_midway(scored):
+        seen.append(scored)
+        if len(seen) == 40:
+            raise RuntimeError("simulated crash")
+        record(scored)
+
+    crashing._record = crash_midway
+    with pytest.raises(RuntimeError):
+        crashing.run(str(log))
+
+    result = analyzer(tmp_path).run(str(log))
+    assert result["logs"] == 200
+    assert result["anomalies"] == len(scored_lines(tmp_path)) == batch_anomalies(tmp_path, log)
+
+
+@pytest.mark.parametrize("flag", [["--stream"], ["--output", "r.html"], ["--page-size", "10"], ["--save-scored", "s.parquet"]])
+def test_cli_rejects_flags_incremental_ignores(tmp_path, flag):
+    proc = subprocess.run(
+        [sys.executable, str(SRC_DIR / "risk_analyzer.py"), "--incremental", "--logs", str(tmp_path), *flag],
+        cwd=tmp_path,
+        capture_output=True,
+        text=True,
+    )
+    assert proc.returncode == 2
+    assert "cannot be combined with --incremental" in proc.stderr
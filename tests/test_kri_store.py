@@ -0,0 +1,171 @@
+# Rolling KRI buckets: range queries against a brute-force count, and eviction
+
+import random
+
+import pytest
+
+from kri_store import DAY, HOUR, MINUTE, STATS, KRIStore, format_epoch
+from log_event import LogEvent
+
+
+START = 1_700_000_000  # 2023-11-14T22:13:20Z, not on an hour boundary
+KEEP_ALL = {MINUTE: 10 * DAY, HOUR: 10 * DAY}
+
+
+def make_events(count=3000, span=2 * DAY, seed=7):
+    rng = random.Random(seed)
+    events, anomalies = [], []
+    for _ in range(count):
+        t = START + rng.randrange(span)
+        event = LogEvent(
+            format_epoch(t),
+            rng.choice(["alice", "bob", "carol", "dave"]),
+            rng.choice(["login", "download"]),
+            rng.choice(["10.0.0.1", "10.0.0.2", "2001:db8::1", "gateway"]),
+            rng.choice(["success", "success", "failed"]),
+        )
+        events.append((t, event))
+        if event.status == "failed":
+            event.score = rng.randrange(1, 10)
+            anomalies.append((t, event))
+    # Mostly in order, with some late rows
+    events.sort(key=lambda item: item[0] + rng.choice([0, 0, 0, -900]))
+    return events, anomalies
+
+
+def expected(events, anomalies, start, end, width, key=None):
+    start, end = start - start % width, -(-end // width) * width
+
+    def matches(t, e):
+        return start <= t < end and (key is None or e.get(key[0]) == key[1])
+
+    picked = [e for t, e in events if matches(t, e)]
+    flagged = [e for t, e in anomalies if matches(t, e)]
+    return {
+        "events": len(picked),
+        "failures": sum(e.status == "failed" for e in picked),
+        "anomalies": len(flagged),
+        "score_sum": sum(e.score for e in flagged),
+    }
+
+
+@pytest.fixture(scope="module")
+def loaded():
+    events, anomalies = make_events()
+    store = KRIStore(tiers=KEEP_ALL)
+    # Flushed every 500 rows, so late rows land in already-folded buckets
+    for i in range(0, len(events), 500):
+        store.add_events(e for _, e in events[i:i + 500])
+        store.flush()
+    store.add_anomalies(e for _, e in anomalies)
+    return store, events, anomalies
+
+
+RANGES = [(START, START + 2 * DAY), (START + 3601, START + 7 * HOUR + 5), (START + 100, START + 101), (START - DAY, START)]
+KEYS = [None, ("user", "alice"), ("source_ip", "2001:db8::1"), ("source_ip", "gateway"), ("event_type", "download"), ("user", "nobody")]
+
+
+@pytest.mark.parametrize("width", [MINUTE, HOUR])
+@pytest.mark.parametrize("key", KEYS)
+def test_totals_match_brute_force(loaded, width, key):
+    store, events, anomalies = loaded
+    for start, end in RANGES:
+        assert store.totals(start, end, key=key, width=width) == expected(events, anomalies, start, end, width, key)
+
+
+def test_iso_times_and_default_tier(loaded):
+    store, events, anomalies = loaded
+    start, end = START + HOUR, START + 5 * HOUR
+    assert store.totals(format_epoch(start), format_epoch(end)) == store.totals(start, end, width=MINUTE)
+
+
+@pytest.mark.parametrize("step", [HOUR, 6 * HOUR])
+def test_buckets_are_a_regular_series(loaded, step):
+    store, events, anomalies = loaded
+    start, end = START + 1234, START + DAY
+    series = store.buckets(start, end, key=("user", "bob"), width=MINUTE, step=step)
+    times = [t for t, _ in series]
+    assert times == list(range(times[0], times[-1] + step, step))
+    for t, values in series:
+        assert values == expected(events, anomalies, t, t + step, MINUTE, ("user", "bob"))
+    with pytest.raises(ValueError):
+        store.buckets(start, end, width=HOUR, step=90 * MINUTE)
+
+
+def test_top_matches_brute_force(loaded):
+    store, events, anomalies = loaded
+    start, end = START, START + DAY
+    top = store.top("source_ip", start, end, by="score_sum", n=2, width=HOUR)
+    ranked = sorted(
+        ((ip, expected(events, anomalies, start, end, HOUR, ("source_ip", ip))) for ip in ["10.0.0.1", "10.0.0.2", "2001:db8::1", "gateway"]),
+        key=lambda item: item[1]["score_sum"],
+        reverse=True,
+    )
+    assert top == ranked[:2]
+    with pytest.raises(ValueError):
+        store.top("user", start, end, by="bytes")
+
+
+def test_kris_window(loaded):
+    store, events, anomalies = loaded
+    kris = store.kris(window=HOUR, end=START + DAY)
+    totals = expected(events, anomalies, START + DAY - HOUR, START + DAY, MINUTE)
+    assert {stat: kris[stat] for stat in STATS} == totals
+    assert kris["bucket_seconds"] == MINUTE
+    assert kris["failure_rate"] == round(totals["failures"] / totals["events"], 4)
+
+
+def test_state_round_trip(loaded):
+    store, events, anomalies = loaded
+    restored = KRIStore(tiers=KEEP_ALL)
+    restored.load_state(store.to_state())
+    assert len(restored) == len(store)
+    for key in KEYS:
+        assert restored.totals(START, START + 2 * DAY, key=key) == store.totals(START, START + 2 * DAY, key=key)
+
+
+def test_retention_evicts_old_buckets():
+    store = KRIStore(tiers={MINUTE: 2 * HOUR, HOUR: 2 * DAY})
+    store.add_event({"timestamp": format_epoch(START), "user": "old", "source_ip": "10.0.0.9", "status": "failed"})
+    store.flush()
+    assert store.totals(START, START + 1, key=("user", "old"), width=MINUTE)["events"] == 1
+
+    # Three hours later the minute bucket is gone, the hour bucket is kept
+    later = START + 3 * HOUR
+    store.add_event({"timestamp": format_epoch(later), "user": "new", "source_ip": "10.0.0.9", "status": "success"})
+    store.flush()
+    assert store.totals(START, START + 1, key=("user", "old"), width=MINUTE)["events"] == 0
+    assert ("user", "old") not in store._series[MINUTE]
+    assert store.totals(START, START + 1, key=("user", "old"), width=HOUR)["events"] == 1
+    assert store.tier_for(START) == HOUR
+
+    # Totals over the live range are unaffected by what was evicted
+    assert store.totals(later, later + 1, width=MINUTE)["events"] == 1
+    assert store.totals(later, later + 1, key=("source_ip", "10.0.0.9"), width=MINUTE)["events"] == 1
+
+    # Three days on, every bucket in both tiers has expired
+    store.evict(later + 3 * DAY)
+    assert len(store) == 0
+    store.evict(START)  # going back in time evicts nothing more
+    assert len(store) == 0
+
+
+def test_evicted_series_keeps_memory_bounded():
+    store = KRIStore(tiers={MINUTE: HOUR, HOUR: 3 * HOUR}, dimensions=("user",))
+    for i in range(48 * 60):
+        t = START + i * MINUTE
+        store.add_event({"timestamp": format_epoch(t), "user": f"u{i // 60}", "status": "success"})
+        if i % 60 == 59:
+            store.flush()
+    # Per-hour users: only those within a few hours of the watermark survive
+    assert len(store._series[MINUTE]) <= 4
+    assert len(store._series[HOUR]) <= 7
+    assert len(store._series[MINUTE][None].starts) <= HOUR // MINUTE * 5 // 4 + 1
+
+
+def test_unparseable_timestamps_are_skipped():
+    store = KRIStore()
+    store.add_event({"timestamp": "yesterday", "user": "x"})
+    store.add_event({"timestamp": None, "user": "x"})
+    assert store.skipped == 2 and store.watermark is None
+    assert store.kris()["events"] == 0
@@ -0,0 +1,107 @@
+# LogEvent: the dict-like API, pickling and packed IPs
+
+import csv
+import io
+import pickle
+
+import pytest
+
+from log_event import EventParser, LogEvent, pack_ip, read_events, unpack_ip
+
+
+ROW = {
+    "timestamp": "2024-01-01T00:00:00Z",
+    "user": "alice",
+    "event_type": "Login",
+    "source_ip": "10.0.0.1",
+    "status": "FAILED",
+}
+
+
+@pytest.mark.parametrize("value", ["10.0.0.1", "0.0.0.0", "255.255.255.255", "::1", "2001:db8::1"])
+def test_canonical_ips_pack_to_ints_and_back(value):
+    packed = pack_ip(value)
+    assert isinstance(packed, int)
+    assert unpack_ip(packed) == value
+
+
+def test_ipv4_and_ipv6_never_collide():
+    assert pack_ip("0.0.0.1") != pack_ip("::1")
+    assert pack_ip("10.0.0.1") != pack_ip("::a00:1")
+
+
+@pytest.mark.parametrize("value", ["host.example", "010.0.0.1", "2001:DB8::1", "2001:0db8::1", "not an ip"])
+def test_non_canonical_ips_stay_strings(value):
+    assert pack_ip(value) == value
+    assert unpack_ip(pack_ip(value)) == value
+
+
+def test_mapped_ipv6_round_trips_whichever_form_is_canonical():
+    # str() of IPv4-mapped addresses differs between Python versions
+    assert unpack_ip(pack_ip("::ffff:10.0.0.1")) == "::ffff:10.0.0.1"
+
+
+@pytest.mark.parametrize("value", ["", None])
+def test_empty_ips_pass_through(value):
+    assert pack_ip(value) is value
+    assert unpack_ip(value) is value
+
+
+def test_mapping_api_matches_the_row():
+    event = LogEvent.from_row({**ROW, "host": "web-1"})
+    assert event["user"] == "alice"
+    assert event["source_ip"] == "10.0.0.1" and event.packed_ip == pack_ip("10.0.0.1")
+    assert event["event_type"] == "login" and event["status"] == "failed"
+    assert event["host"] == "web-1" and event.get("nope", "x") == "x"
+    assert "host" in event and "reason" not in event
+    with pytest.raises(KeyError):
+        event["score"]
+    assert event.keys() == ["timestamp", "user", "event_type", "source_ip", "status", "host"]
+    assert event.to_dict() == {**ROW, "event_type": "login", "status": "failed"}
+
+    event.reason = "Failed login"
+    event.score = 5
+    assert event.keys()[-2:] == ["reason", "score"]
+    assert event.to_dict()["score"] == 5 and "risk_level" not in event.to_dict()
+
+
+@pytest.mark.parametrize("source_ip", ["10.0.0.1", "2001:db8::1", "gateway", ""])
+def test_pickle_round_trip(source_ip):
+    event = LogEvent.from_row({**ROW, "source_ip": source_ip, "host": "web-1"})
+    event.reason = "Failed login"
+    event.score = 7
+    event.risk_level = "High"
+    event.burst = True
+
+    copy = pickle.loads(pickle.dumps(event))
+    assert copy.to_dict() == event.to_dict()
+    assert copy.packed_ip == event.packed_ip and copy.extra == event.extra
+    assert copy.burst is True
+
+
+def test_pickle_keeps_unset_fields_unset():
+    copy = pickle.loads(pickle.dumps(LogEvent.from_row(ROW)))
+    assert "reason" not in copy and "score" not in copy
+    assert copy.get("burst", False) is False
+    # Strings are re-interned on the receiving side
+    assert copy.user is LogEvent.from_row(ROW).user
+
+
+def test_read_events_matches_dict_reader():
+    text = (
+        "timestamp,user,event_type,source_ip,status,host\n"
+        "2024-01-01T00:00:00Z,alice,login,10.0.0.1,failed,web-1\n"
+        "\n"
+        "2024-01-01T00:01:00Z,bob,login,::1\n"
+    )
+    events = list(read_events(io.StringIO(text)))
+    rows = list(csv.DictReader(io.StringIO(text)))
+    assert len(events) == len(rows) == 2
+    for event, row in zip(events, rows):
+        # Missing fields are None as with DictReader, except status which is normalised to ""
+        assert {k: event.get(k) for k in row} == {**row, "status": row["status"] or ""}
+
+
+def test_parser_fast_path_needs_exactly_the_core_columns():
+    assert EventParser(["timestamp", "user", "event_type", "source_ip", "status"])._fast is not None
+    assert EventParser(["timestamp", "user", "event_type", "source_ip", "status", "host"])._fast is None
@@ -0,0 +1,93 @@
+# Multi-file ingestion: worker processes pre-filter rows without changing
+# what the pipeline detects
+
+import csv
+import gzip
+import random
+
+import pytest
+
+from anomaly_detector import AnomalyDetector
+from bruteforce_detector import BruteForceDetector
+from risk_analyzer import run_risk_analysis
+from watchlist import Watchlist, build_watchlist
+
+
+HEADER = ["timestamp", "user", "event_type", "source_ip", "status"]
+
+
+def write_logs(log_dir, files=3, rows=1500, seed=3):
+    rng = random.Random(seed)
+    log_dir.mkdir()
+    for n in range(files):
+        rows_out = []
+        for i in range(rows):
+            # The same users and IPs in every file, so bursts span files
+            rows_out.append(
+                [
+                    f"2025-11-15T{9 + i // 3600:02d}:{i // 60 % 60:02d}:{i % 60:02d}Z",
+                    rng.choice(["alice", "bob", "carol", "dave"]),
+                    rng.choice(["login", "logout", "file_access", "data_export"]),
+                    rng.choice(["10.0.0.5", "10.0.0.8", "192.168.1.20"]),
+                    rng.choice(["success"] * 6 + ["failed"]),
+                ]
+            )
+        opener = gzip.open if n == 0 else open
+        name = f"app-{n}.csv.gz" if n == 0 else f"app-{n}.csv"
+        with opener(log_dir / name, "wt", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(HEADER)
+            writer.writerows(rows_out)
+    return log_dir
+
+
+@pytest.fixture
+def logs(tmp_path):
+    return write_logs(tmp_path / "logs")
+
+
+@pytest.fixture
+def watchlist(tmp_path):
+    path = tmp_path / "watch.wl"
+    build_watchlist(["carol"], path)
+    with Watchlist(path) as wl:
+        yield wl
+
+
+def detector(watchlist=None):
+    return AnomalyDetector(bruteforce=BruteForceDetector(threshold=3, window_seconds=60), watchlist=watchlist)
+
+
+@pytest.mark.parametrize("listed", [False, True])
+def test_scan_finds_the_same_anomalies(logs, watchlist, listed):
+    wl = watchlist if listed else None
+    serial = detector(wl)
+    events = serial.load_logs(str(logs), workers=1)
+    expected = [e.to_dict() for e in serial.detect_anomalies(events)]
+    assert any("Repeated failed logins" in e["reason"] for e in expected)
+
+    parallel = detector(wl)
+    rows, flagged = parallel.scan_logs(str(logs), workers=2)
+    flagged = list(flagged)
+    assert rows == len(events) == 4500
+    # Only the flagged rows came back from the workers
+    assert len(flagged) == sum(map(serial.flagged, events)) < rows
+    assert [e.to_dict() for e in parallel.detect_anomalies(flagged)] == expected
+
+
+def test_scan_is_skipped_when_there_is_nothing_to_parallelise(logs):
+    assert detector().scan_logs(str(logs), workers=1) is None
+    assert detector().scan_logs(str(logs / "app-1.csv"), workers=4) is None
+
+
+def table(report):
+    html = report.read_text(encoding="utf-8")
+    return html[html.index("<tbody>"):html.index("</tbody>")]
+
+
+def test_pipeline_counts_match_serial(logs, tmp_path):
+    for stream in (False, True):
+        serial = run_risk_analysis(str(logs), str(tmp_path / "serial.html"), stream=stream, workers=1)
+        parallel = run_risk_analysis(str(logs), str(tmp_path / "parallel.html"), stream=stream, workers=2)
+        assert serial == parallel
+        assert table(tmp_path / "serial.html") == table(tmp_path / "parallel.html")
@@ -0,0 +1,100 @@
+# Stage metrics: recording, merging worker snapshots and the dump formats
+
+import json
+import pickle
+
+import pytest
+
+from metrics import NULL_METRICS, Metrics, make_metrics, profiled
+
+
+def recorded():
+    metrics = Metrics(sample_every=2)
+    metrics.incr("events", 3)
+    metrics.incr("events", risk_level="High")
+    metrics.incr("events", 2, risk_level="High")
+    metrics.set_gauge("queue_depth", 7)
+    metrics.observe("score", 0.5, count=4, peak=0.25)
+    metrics.observe("score", 0.1)
+    return metrics
+
+
+def test_make_metrics():
+    assert make_metrics(False) is NULL_METRICS and not NULL_METRICS.enabled
+    assert isinstance(make_metrics(True), Metrics)
+
+
+def test_null_metrics_record_nothing():
+    items = [1, 2, 3]
+    assert NULL_METRICS.timed_iter(items, "read") is items
+    with NULL_METRICS.timer("stage"):
+        NULL_METRICS.incr("events")
+    assert NULL_METRICS.to_dict() == {"counters": {}, "gauges": {}, "timers": {}}
+
+
+def test_counters_gauges_and_timers():
+    out = recorded().to_dict()
+    assert out["counters"] == {"events": 3, 'events{risk_level="High"}': 3}
+    assert out["gauges"] == {"queue_depth": 7}
+    assert out["timers"]["score"] == {"count": 5, "total_seconds": 0.6, "mean_seconds": 0.12, "max_seconds": 0.25}
+
+
+def test_timer_and_timed_iter():
+    metrics = Metrics(sample_every=3)
+    with metrics.timer("stage", kind="batch"):
+        pass
+    assert metrics.timers[("stage", (("kind", "batch"),))][0] == 1
+
+    assert list(metrics.timed_iter(range(10), "read")) == list(range(10))
+    assert metrics.counters[("read_items", ())] == 10
+    assert metrics.timers[("read", ())][0] == 10
+    assert metrics.total_seconds("read") >= 0.0 and metrics.total_seconds("missing") == 0.0
+
+
+def test_merge_adds_a_pickled_worker_snapshot():
+    parent = recorded()
+    worker = recorded()
+    worker.observe("score", 1.0, peak=0.75)
+    parent.merge(pickle.loads(pickle.dumps(worker.snapshot())))
+
+    out = parent.to_dict()
+    assert out["counters"] == {"events": 6, 'events{risk_level="High"}': 6}
+    assert out["timers"]["score"]["count"] == 11
+    assert out["timers"]["score"]["total_seconds"] == pytest.approx(2.2)
+    assert out["timers"]["score"]["max_seconds"] == 0.75
+
+
+def test_prometheus_text():
+    text = recorded().to_prometheus()
+    lines = text.splitlines()
+    assert lines.count("# TYPE risk_events_total counter") == 1
+    assert "risk_events_total 3" in lines
+    assert 'risk_events_total{risk_level="High"} 3' in lines
+    assert "risk_queue_depth 7" in lines
+    assert "risk_score_seconds_count 5" in lines
+    assert "risk_score_seconds_sum 0.6" in lines
+    assert "risk_score_seconds_max 0.25" in lines
+
+
+def test_label_values_are_escaped():
+    metrics = Metrics()
+    metrics.incr("events", source='a "b"\\c\n')
+    assert 'risk_events_total{source="a \\"b\\"\\\\c\\n"} 1' in metrics.to_prometheus()
+
+
+def test_dump_picks_the_format_from_the_suffix(tmp_path, capsys):
+    metrics = recorded()
+    metrics.dump(str(tmp_path / "m.prom"))
+    metrics.dump(str(tmp_path / "m.json"))
+    metrics.dump("-")
+    assert (tmp_path / "m.prom").read_text(encoding="utf-8") == metrics.to_prometheus()
+    assert json.loads((tmp_path / "m.json").read_text(encoding="utf-8")) == metrics.to_dict()
+    assert json.loads(capsys.readouterr().err) == metrics.to_dict()
+
+
+def test_profiled_rejects_unknown_profilers():
+    with profiled(None):
+        pass
+    with pytest.raises(ValueError):
+        with profiled("perf"):
+            pass
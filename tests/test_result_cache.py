@@ -0,0 +1,98 @@
+# Result cache behaviour when profiles are scored over a process pool
+
+import json
+import subprocess
+import sys
+
+import pytest
+
+from conftest import REPO_ROOT, SRC_DIR
+from risk_engine.result_cache import MemoryResultCache, ResultCache
+from risk_engine.risk_scoring import RiskEngine, make_result_cache
+
+
+SAMPLE = json.loads((REPO_ROOT / "examples" / "sample_input.json").read_text(encoding="utf-8"))
+
+
+def profiles(count):
+    out = []
+    for i in range(count):
+        profile = json.loads(json.dumps(SAMPLE))
+        profile["financial"]["bank_balance"] = 9000 + i * 37
+        out.append(profile)
+    return out
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def cache(request, tmp_path):
+    if request.param == "memory":
+        return make_result_cache(size=10_000)
+    return make_result_cache(db_path=str(tmp_path / "results.db"))
+
+
+def test_pool_scoring_counts_hits_and_misses(cache):
+    data = profiles(300)
+    expected = RiskEngine().score_batch(data)
+    engine = RiskEngine(cache=cache)
+
+    assert list(engine.score_profiles(data, workers=2, chunksize=16)) == expected
+    assert (cache.hits, cache.misses) == (0, 300)
+
+    assert list(engine.score_profiles(data, workers=2, chunksize=16)) == expected
+    assert (cache.hits, cache.misses) == (300, 300)
+    assert len(cache) == 300
+
+
+def test_json_lines_through_pool_use_the_cache(cache):
+    lines = [json.dumps(p) for p in profiles(100)]
+    engine = RiskEngine(cache=cache)
+    first = list(engine.score_json_lines(lines, workers=2, chunksize=16))
+    second = list(engine.score_json_lines(lines, workers=2, chunksize=16))
+    assert first == second == list(RiskEngine().score_json_lines(lines))
+    assert (cache.hits, cache.misses) == (100, 100)
+
+
+_RUN_CLI = f"""
+import sys, types
+sys.path.insert(0, {str(SRC_DIR)!r})
+package = types.ModuleType("risk_engine")
+package.__path__ = [{str(SRC_DIR)!r}]
+sys.modules["risk_engine"] = package
+from risk_engine.risk_scoring import main
+main(sys.argv[1:])
+"""
+
+
+def test_cli_prints_cache_stats_with_workers(tmp_path):
+    data = profiles(50)
+    path = tmp_path / "profiles.jsonl"
+    path.write_text("".join(json.dumps(p) + "\n" for p in data + data), encoding="utf-8")
+
+    proc = subprocess.run(
+        [sys.executable, "-c", _RUN_CLI, str(path), "--jsonl", "--workers", "2", "--chunksize", "10",
+         "--cache-size", "1000", "--output", str(tmp_path / "out.jsonl")],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert "Result cache: {'hits': 50, 'misses': 50" in proc.stdout
+
+
+def test_result_cache_is_abstract():
+    with pytest.raises(TypeError):
+        ResultCache()
+
+    class NoLookup(ResultCache):
+        def put_many(self, items):
+            pass
+
+        def __len__(self):
+            return 0
+
+    with pytest.raises(TypeError, match="_lookup"):
+        NoLookup()
+
+    cache = MemoryResultCache(2)
+    cache.put("a", {"score": 1})
+    assert cache.get("a") == {"score": 1} and cache.get("b") is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5, "entries": 1}
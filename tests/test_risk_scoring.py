@@ -0,0 +1,125 @@
+# Risk bands: the static helper, the engine's configurable cut-offs and
+# the calibration sweeps that re-band portfolios under other settings
+
+import json
+import random
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from conftest import REPO_ROOT
+from risk_engine.calibration import (
+    BANDS,
+    apply_config,
+    calibrate,
+    config_arrays,
+    engine_config,
+    expand_grid,
+    load_score_matrix,
+    run_sweep,
+    sweep_counts,
+)
+from risk_engine.risk_scoring import RiskEngine, iter_jsonl
+
+
+SAMPLE = json.loads((REPO_ROOT / "examples" / "sample_input.json").read_text(encoding="utf-8"))
+
+
+def test_risk_band_is_callable_on_the_class():
+    assert RiskEngine.risk_band(75) == "High"
+    assert RiskEngine.risk_band(70) == "High"
+    assert RiskEngine.risk_band(45) == "Medium"
+    assert RiskEngine.risk_band(39.99) == "Low"
+    assert RiskEngine.risk_band(75, high=80, medium=60) == "Medium"
+
+
+def test_engine_bands_use_its_thresholds():
+    engine = RiskEngine()
+    score = engine.score_profile(SAMPLE)["final_risk_score"]
+    assert engine.score_profile(SAMPLE)["risk_band"] == RiskEngine.risk_band(score)
+
+    apply_config(engine, {"high_threshold": score, "medium_threshold": score})
+    assert engine.score_profile(SAMPLE)["risk_band"] == "High"
+    apply_config(engine, {"high_threshold": score + 1, "medium_threshold": score + 1})
+    assert engine.score_profile(SAMPLE)["risk_band"] == "Low"
+
+
+# ------------------------------------------------------------
+# Calibration sweeps must band profiles exactly as the engine does
+# ------------------------------------------------------------
+class StubModel:
+    """Deterministic predict_proba over the feature matrix."""
+
+    classes_ = [0, 1]
+
+    def predict_proba(self, features):
+        positive = (np.asarray(features).sum(axis=1) * 7.3) % 1.0
+        return np.column_stack([1 - positive, positive])
+
+
+SWEEP_CONFIGS = [
+    {},
+    {"high_threshold": 60, "medium_threshold": 25},
+    {"high_threshold": 55.5, "medium_threshold": 30.25},
+    {"rule_weight": 0.3, "ml_weight": 0.7},
+    {"category_weights": {"financial": 0.6, "compliance": 0.05}, "high_threshold": 45},
+    {"category_weights": {"behaviour": 0}, "rule_weight": 1.0, "ml_weight": 0.0, "medium_threshold": 20},
+]
+
+
+def varied_profiles(count, seed=5):
+    rng = random.Random(seed)
+    out = []
+    for _ in range(count):
+        profile = json.loads(json.dumps(SAMPLE))
+        profile["financial"]["bank_balance"] = rng.uniform(0, 25000)
+        profile["financial"]["has_regular_income"] = rng.random() < 0.6
+        profile["documentation"]["all_required_documents_provided"] = rng.random() < 0.7
+        profile["documentation"]["inconsistencies_found"] = rng.randint(0, 4)
+        profile["eligibility"]["meets_minimum_criteria"] = rng.random() < 0.7
+        profile["eligibility"]["gpa"] = round(rng.uniform(1.5, 4), 2)
+        profile["eligibility"]["gap_years"] = rng.randint(0, 5)
+        profile["compliance"]["previous_visa_refusals"] = rng.choice([0, 0, 1, 2])
+        profile["compliance"]["adverse_immigration_history"] = rng.random() < 0.15
+        profile["behaviour"]["response_consistency_score"] = rng.random()
+        profile["behaviour"]["missed_deadlines"] = rng.randint(0, 5)
+        out.append(profile)
+    return out
+
+
+@pytest.fixture
+def profiles_file(tmp_path):
+    path = tmp_path / "profiles.jsonl"
+    path.write_text("".join(json.dumps(p) + "\n" for p in varied_profiles(1500)), encoding="utf-8")
+    return path
+
+
+def engine_bands(make_engine, config, profiles):
+    engine = make_engine()
+    apply_config(engine, config)
+    return Counter(result["risk_band"] for result in engine.score_profiles(profiles))
+
+
+@pytest.mark.parametrize("model", [None, StubModel()], ids=["rules", "model"])
+def test_sweep_bands_match_the_engine(profiles_file, model):
+    make_engine = lambda: RiskEngine(model=model)  # noqa: E731
+    reports = calibrate(make_engine(), profiles_file, {"configs": SWEEP_CONFIGS})
+    profiles = list(iter_jsonl(profiles_file))
+
+    assert len({tuple(r["bands"].values()) for r in reports}) > 1
+    for report in reports:
+        expected = engine_bands(make_engine, report["config"], profiles)
+        assert report["bands"] == {band: expected.get(band, 0) for band in BANDS}, report["config"]
+
+
+def test_sharded_sweep_matches_sweep_counts(profiles_file, tmp_path):
+    engine = RiskEngine(model=StubModel())
+    baseline = engine_config(engine)
+    configs = expand_grid({"configs": SWEEP_CONFIGS}, baseline)
+    matrix = load_score_matrix(engine, profiles_file, tmp_path / "scores.npy")
+
+    expected = sweep_counts(matrix, config_arrays(configs), config_arrays([baseline]))
+    assert expected.sum() == len(configs) * len(matrix)
+    sharded = run_sweep(matrix, configs, baseline, workers=2, block_rows=128)
+    assert np.array_equal(sharded, expected)
@@ -0,0 +1,88 @@
+# Rule spec compilation and the on-disk compiled-rules cache
+
+import json
+import os
+
+import pytest
+
+from rule_spec import COMPILED_FORMAT, DEFAULT_RULE_SPEC, compile_rule_spec, load_rules
+
+
+def write_spec(path, spec=DEFAULT_RULE_SPEC):
+    path.write_text(json.dumps(spec), encoding="utf-8")
+    return path
+
+
+def test_cache_is_json_and_round_trips(tmp_path):
+    spec = write_spec(tmp_path / "rules.json")
+    cache = tmp_path / "cache"
+
+    compiled = load_rules(spec, cache)
+    (entry,) = cache.iterdir()
+    assert entry.suffix == ".json"
+    json.loads(entry.read_text(encoding="utf-8"))
+
+    cached = load_rules(spec, cache)
+    assert cached.event_table == compiled.event_table
+    assert cached.risk_levels == compiled.risk_levels
+    assert cached.high_risk_events == compiled.high_risk_events
+    assert cached.financial_ratio.lookup(1.1) == compiled.financial_ratio.lookup(1.1)
+
+
+def test_cache_entries_are_versioned(tmp_path):
+    spec = write_spec(tmp_path / "rules.json")
+    cache = tmp_path / "cache"
+    load_rules(spec, cache)
+    (entry,) = cache.iterdir()
+    assert entry.name.startswith(f"rules-v{COMPILED_FORMAT}-")
+    fields = json.loads(entry.read_text(encoding="utf-8"))
+    assert fields["format"] == COMPILED_FORMAT
+
+    # An entry from another format version is recompiled, even under this name
+    fields["format"] = COMPILED_FORMAT + 1
+    fields["failed_bonus"] = 99
+    entry.write_text(json.dumps(fields), encoding="utf-8")
+    assert load_rules(spec, cache).failed_bonus == DEFAULT_RULE_SPEC["events"]["failed_bonus"]
+    assert json.loads(entry.read_text(encoding="utf-8"))["format"] == COMPILED_FORMAT
+
+
+def test_tampered_cache_cannot_inject_code(tmp_path):
+    spec = write_spec(tmp_path / "rules.json")
+    cache = tmp_path / "cache"
+    load_rules(spec, cache)
+    (entry,) = cache.iterdir()
+
+    fields = json.loads(entry.read_text(encoding="utf-8"))
+    marker = tmp_path / "pwned"
+    fields["gpa_ratio"][0][0] = f"0 or open({str(marker)!r}, 'w')"
+    entry.write_text(json.dumps(fields), encoding="utf-8")
+
+    rules = load_rules(spec, cache)
+    rules.gpa_ratio.lookup(1.0)
+    assert not marker.exists()
+
+
+@pytest.mark.skipif(not hasattr(os, "getuid"), reason="POSIX permissions")
+def test_cache_writable_by_others_is_ignored(tmp_path):
+    spec = write_spec(tmp_path / "rules.json")
+    cache = tmp_path / "cache"
+    load_rules(spec, cache)
+    (entry,) = cache.iterdir()
+
+    fields = json.loads(entry.read_text(encoding="utf-8"))
+    fields["failed_bonus"] = 99
+    entry.write_text(json.dumps(fields), encoding="utf-8")
+    os.chmod(entry, 0o666)
+
+    assert load_rules(spec, cache).failed_bonus == DEFAULT_RULE_SPEC["events"]["failed_bonus"]
+
+
+def test_risk_levels_must_descend():
+    spec = json.loads(json.dumps(DEFAULT_RULE_SPEC))
+    spec["events"]["risk_levels"] = [{"min": 4, "level": "Medium"}, {"min": 9, "level": "Critical"}, {"level": "Low"}]
+    with pytest.raises(ValueError, match="descending"):
+        compile_rule_spec(spec)
+
+    spec["events"]["risk_levels"] = [{"level": "Low"}, {"min": 4, "level": "Medium"}]
+    with pytest.raises(ValueError, match="only the last"):
+        compile_rule_spec(spec)
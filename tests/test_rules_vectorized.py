@@ -0,0 +1,132 @@
+# The columnar category scorers must agree with rules_engine row for row
+
+import json
+import math
+import random
+
+import pytest
+
+from risk_engine.rule_spec import DEFAULT_RULE_SPEC, DEFAULT_RULES, compile_rule_spec
+from risk_engine.rules_engine import score_all_categories
+from risk_engine.rules_vectorized import FIELDS, profiles_to_columns, score_all_categories_columnar
+
+
+def boundary_ratios(ladder):
+    # Each step's minimum, and the floats just either side of it
+    ratios = [0.0]
+    for minimum, _, _ in ladder.steps[:-1]:
+        ratios += [minimum, math.nextafter(minimum, 0), math.nextafter(minimum, math.inf)]
+    return ratios
+
+
+def synthetic_profiles(count, rules=DEFAULT_RULES, seed=11):
+    rng = random.Random(seed)
+    money = boundary_ratios(rules.financial_ratio)
+    grades = boundary_ratios(rules.gpa_ratio)
+    profiles = []
+    for _ in range(count):
+        required = rng.choice([0, 1000, 2500.5, 12000, -5])
+        required_gpa = rng.choice([0, 2.5, 3, 3.3, -1])
+        profile = {
+            "financial": {
+                "bank_balance": rng.choice(money) * required if rng.random() < 0.7 else rng.uniform(0, 30000),
+                "minimum_required": required,
+                "has_regular_income": rng.choice([True, False, 1, 0, "yes", ""]),
+                "recent_large_unexplained_deposits": rng.random() < 0.2,
+            },
+            "documentation": {
+                "all_required_documents_provided": rng.random() < 0.8,
+                "documents_verified": rng.random() < 0.7,
+                "inconsistencies_found": rng.choice([0, 1, 2, 3, 7, 2.9, "1"]),
+            },
+            "eligibility": {
+                "meets_minimum_criteria": rng.random() < 0.8,
+                "gpa": rng.choice(grades) * required_gpa if rng.random() < 0.7 else rng.uniform(0, 4),
+                "required_gpa": required_gpa,
+                "gap_years": rng.choice([0, 1, 1.5, 3, 3.01, 10, "2"]),
+            },
+            "compliance": {
+                "previous_visa_refusals": rng.choice([0, 1, 2, 5]),
+                "adverse_immigration_history": rng.random() < 0.1,
+                "sanctions_or_watchlists": rng.random() < 0.05,
+            },
+            "behaviour": {
+                # k/80 puts (score - 0.5) * 40 on .5 steps: round-half-even ties
+                "response_consistency_score": rng.choice([rng.random(), 0.5 + rng.randint(-40, 40) / 80, "0.75"]),
+                "missed_deadlines": rng.choice([0, 1, 3, 4]),
+                "suspicious_communication": rng.random() < 0.1,
+            },
+        }
+        # Missing fields and sections take the rules_engine defaults
+        for section in list(profile):
+            for field in list(profile[section]):
+                if rng.random() < 0.05:
+                    del profile[section][field]
+            if rng.random() < 0.03:
+                del profile[section]
+        profiles.append(profile)
+    return profiles
+
+
+def assert_parity(profiles, rules=None):
+    compiled = rules if rules is not None else DEFAULT_RULES
+    explain = range(0, len(profiles), 97)
+    scores, notes = score_all_categories_columnar(profiles_to_columns(profiles), explain=explain, rules=rules)
+    for i, profile in enumerate(profiles):
+        expected_scores, expected_notes = score_all_categories(profile, compiled)
+        assert {name: int(column[i]) for name, column in scores.items()} == expected_scores, profile
+        if i in notes:
+            assert notes[i] == expected_notes
+
+
+def test_matches_rules_engine():
+    assert_parity(synthetic_profiles(5000))
+
+
+def test_matches_rules_engine_with_a_custom_spec():
+    spec = json.loads(json.dumps(DEFAULT_RULE_SPEC))
+    spec["profile"]["financial_ratio"] = [
+        {"min": 2, "delta": 30, "note": "Twice the minimum."},
+        {"min": 0.5, "delta": 0, "note": "At least half the minimum."},
+        {"delta": -40, "note": "Under half the minimum."},
+    ]
+    rules = compile_rule_spec(spec)
+    assert_parity(synthetic_profiles(2000, rules=rules, seed=12), rules=rules)
+
+
+def test_missing_columns_take_defaults():
+    scores, _ = score_all_categories_columnar({"bank_balance": [100.0, 5000.0]})
+    for i, balance in enumerate([100.0, 5000.0]):
+        expected, _ = score_all_categories({"financial": {"bank_balance": balance}})
+        assert {name: int(column[i]) for name, column in scores.items()} == expected
+
+
+@pytest.mark.parametrize("field,value", [("bank_balance", "n/a"), ("gpa", None), ("missed_deadlines", "1.5")])
+def test_invalid_values_fail_like_rules_engine(field, value):
+    section = FIELDS[field][0]
+    profile = {section: {field: value}}
+    with pytest.raises((TypeError, ValueError)) as scalar:
+        score_all_categories(profile)
+    with pytest.raises(scalar.type):
+        profiles_to_columns([profile])
+
+
+@pytest.mark.parametrize("value", ["nan", "inf", float("-inf")])
+def test_non_finite_scores_fail_like_rules_engine(value):
+    profiles = [{}, {"behaviour": {"response_consistency_score": value}}]
+    with pytest.raises((ValueError, OverflowError)) as scalar:
+        score_all_categories(profiles[1])
+    with pytest.raises(scalar.type):
+        score_all_categories_columnar(profiles_to_columns(profiles))
+
+
+def test_non_finite_ratios_match():
+    # NaN/inf ratios fall through the ladders the same way in both
+    assert_parity(
+        [
+            {"financial": {"bank_balance": "inf", "minimum_required": 1000}},
+            {"financial": {"bank_balance": "inf", "minimum_required": "inf"}},
+            {"eligibility": {"gpa": "nan", "required_gpa": 3}},
+            {"eligibility": {"gap_years": "nan"}},
+        ]
+    )
@@ -0,0 +1,73 @@
+# One bad request must not fail the others batched with it
+
+import asyncio
+import json
+
+from conftest import REPO_ROOT
+from risk_engine.risk_scoring import RiskEngine
+from risk_engine.scoring_service import MicroBatcher, ScoringService, make_executor, validate_profile
+
+
+SAMPLE = json.loads((REPO_ROOT / "examples" / "sample_input.json").read_text(encoding="utf-8"))
+
+
+def profile(**financial):
+    out = json.loads(json.dumps(SAMPLE))
+    out["financial"].update(financial)
+    return out
+
+
+class FlakyEngine(RiskEngine):
+    """Fails any batch holding a profile marked "explode"."""
+
+    def score_batch(self, profiles, *args, **kwargs):
+        if any(p.get("explode") for p in profiles):
+            raise RuntimeError("boom")
+        return super().score_batch(profiles, *args, **kwargs)
+
+
+def post_together(engine, bodies):
+    async def run():
+        executor = make_executor(engine, workers=0)
+        # A long window so all requests land in one batch
+        batcher = MicroBatcher(executor, max_batch=64, max_wait_ms=200)
+        service = ScoringService(batcher)
+        batcher.start()
+        try:
+            replies = await asyncio.gather(
+                *(service._route("POST", "/score", json.dumps(body).encode("utf-8")) for body in bodies)
+            )
+            return replies, batcher.stats()
+        finally:
+            await batcher.stop()
+            executor.shutdown(wait=True)
+
+    return asyncio.run(run())
+
+
+def test_validate_profile():
+    assert validate_profile(SAMPLE) is None
+    assert validate_profile({}) is None
+    assert validate_profile(profile(bank_balance="n/a")).startswith("financial.bank_balance:")
+    assert validate_profile(profile(bank_balance=None)).startswith("financial.bank_balance:")
+    assert validate_profile({"financial": "rich"}) == "financial: expected a JSON object"
+
+
+def test_bad_profile_is_rejected_without_failing_its_batch():
+    replies, stats = post_together(
+        RiskEngine(), [profile(bank_balance=5000), profile(bank_balance="n/a"), profile(bank_balance=9000)]
+    )
+    assert [status for status, _ in replies] == [200, 400, 200]
+    assert "financial.bank_balance" in json.loads(replies[1][1])["error"]
+    assert "risk_band" in json.loads(replies[0][1])
+    # The good requests were still batched together
+    assert stats["batches"] == 1 and stats["requests"] == 2
+
+
+def test_failed_batch_is_rescored_request_by_request():
+    good = profile(bank_balance=5000)
+    bad = dict(profile(bank_balance=6000), explode=True)
+    replies, stats = post_together(FlakyEngine(), [good, bad, profile(bank_balance=9000)])
+    assert [status for status, _ in replies] == [200, 500, 200]
+    assert json.loads(replies[0][1]) == json.loads(post_together(RiskEngine(), [good])[0][0][1])
+    assert stats["retried_batches"] == 1
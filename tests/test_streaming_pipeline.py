@@ -0,0 +1,48 @@
+# Streaming (--stream) and batch log pipelines must report the same anomalies
+
+import csv
+
+from risk_analyzer import run_risk_analysis
+
+
+ROWS = [
+    ("2025-11-15T09:01:00+00:00", "alice", "login", "10.0.0.5", "success"),
+    ("2025-11-15T09:05:10+00:00", "bob", "login", "10.0.0.8", "failed"),
+    ("2025-11-15T09:05:30+00:00", "bob", "login", "10.0.0.8", "failed"),
+    ("2025-11-15T09:06:00+00:00", "bob", "login", "10.0.0.8", "failed"),
+    ("2025-11-15T09:10:00+00:00", "carol", "privilege_escalation", "10.0.0.9", "success"),
+    ("2025-11-15T09:12:00+00:00", "dave", "file_access", "10.0.0.10", "success"),
+]
+
+
+def write_log(path, rows=ROWS):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["timestamp", "user", "event_type", "source_ip", "status"])
+        writer.writerows(rows)
+    return path
+
+
+def table_rows(report):
+    html = report.read_text(encoding="utf-8")
+    return html[html.index("<tbody>"):html.index("</tbody>")].count("<tr>")
+
+
+def test_stream_matches_batch(tmp_path):
+    log = write_log(tmp_path / "logs.csv")
+
+    run_risk_analysis(str(log), str(tmp_path / "batch.html"))
+    counts = run_risk_analysis(str(log), str(tmp_path / "stream.html"), stream=True)
+
+    assert counts == {"logs": len(ROWS), "anomalies": 4}
+    assert table_rows(tmp_path / "batch.html") == table_rows(tmp_path / "stream.html") == 4
+
+
+def test_stream_accepts_generators_of_any_length(tmp_path):
+    rows = [(f"2025-11-15T10:{i // 60:02d}:{i % 60:02d}+00:00", f"u{i}", "login", "10.1.0.1", "failed") for i in range(3000)]
+    log = write_log(tmp_path / "big.csv", rows)
+
+    counts = run_risk_analysis(str(log), str(tmp_path / "stream.html"), stream=True, workers=1)
+
+    assert counts == {"logs": 3000, "anomalies": 3000}
+    assert table_rows(tmp_path / "stream.html") == 3000
@@ -0,0 +1,112 @@
+# Streamlit app IsolationForest engine: per-schema model cache, chunked vs whole
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("streamlit")
+pytest.importorskip("sklearn")
+
+from streamlit_app import AnomalyCounter, HeuristicAnomalyBackend, IsolationForestBackend, accumulate_kris, compute_kris
+
+
+def log_frame(rows=6000, seed=3):
+    rng = np.random.default_rng(seed)
+    latency = rng.lognormal(3.5, 0.3, rows)
+    latency[rng.choice(rows, 40, replace=False)] *= 30
+    return pd.DataFrame(
+        {
+            "latency_ms": latency,
+            "bytes": rng.integers(100, 5000, rows),
+            "message": rng.choice(["ok", "request failed", "timeout"], rows, p=[0.9, 0.07, 0.03]),
+            "region": rng.choice(["eu", "us", "ap"], rows),
+        }
+    )
+
+
+def backend(**kwargs):
+    kwargs.setdefault("n_estimators", 25)
+    kwargs.setdefault("n_jobs", 1)
+    return IsolationForestBackend(**kwargs)
+
+
+def test_one_model_per_schema():
+    engine = backend()
+    df = log_frame()
+    first = engine.fitted(df)
+    assert engine.fitted(log_frame(seed=5)) is first  # same layout, new data: no refit
+    assert len(engine._models) == 1
+
+    # A different dtype is a different schema
+    other = df.assign(bytes=df["bytes"].astype("float64"))
+    assert IsolationForestBackend.schema_key(other) != IsolationForestBackend.schema_key(df)
+    assert engine.fitted(other) is not first
+    assert len(engine._models) == 2
+
+
+def test_model_cache_is_bounded_lru():
+    engine = backend(max_models=2)
+    df = log_frame(rows=500)
+    a = engine.fitted(df)
+    engine.fitted(df[["latency_ms", "message"]])
+    assert engine.fitted(df) is a  # a becomes the most recent
+    engine.fitted(df[["bytes", "region"]])
+    assert len(engine._models) == 2
+    assert engine.fitted(df) is a
+    assert IsolationForestBackend.schema_key(df[["latency_ms", "message"]]) not in engine._models
+
+
+def test_score_flags_the_outliers():
+    df = log_frame()
+    result = backend().score(df, compute_kris(df))
+    assert result.scores.shape == (len(df),)
+    # The error rows are rare enough to be isolated too, so ~10% are flagged
+    assert 0 < result.rate < 0.15
+    # The inflated latencies are among the highest scores
+    top = np.argsort(result.scores)[-200:]
+    assert (df["latency_ms"].to_numpy()[top] > 500).sum() >= 30
+
+
+@pytest.mark.parametrize("chunksize", [700, 2500, 10_000])
+def test_chunked_rate_matches_whole_frame(tmp_path, chunksize):
+    df = log_frame()
+    path = tmp_path / "logs.csv"
+    df.to_csv(path, index=False)
+    whole_df = pd.read_csv(path)
+
+    # With the model cached for the schema both paths score the same rows
+    # with the same forest, so the rates are identical
+    engine = backend()
+    whole = engine.score(whole_df, compute_kris(whole_df))
+    acc = accumulate_kris(path, chunksize=chunksize, anomaly_backend=engine)
+    assert acc.anomalies.rows == len(df)
+    assert acc.anomalies.rate == whole.rate
+    assert len(engine._models) == 1
+
+    # A fresh engine fits on the first chunk instead: identical when that
+    # chunk is the whole file, close when it is a large share of it
+    if chunksize >= 2500:
+        fresh = accumulate_kris(path, chunksize=chunksize, anomaly_backend=backend())
+        assert fresh.anomalies.rate == pytest.approx(whole.rate, abs=0.02)
+        if chunksize >= len(df):
+            assert fresh.anomalies.rate == whole.rate
+
+
+def test_merged_counters_add_up():
+    df = log_frame()
+    engine = backend()
+    whole = AnomalyCounter(engine)
+    whole.update(df)
+    merged = AnomalyCounter(engine)
+    for part in np.array_split(np.arange(len(df)), 3):
+        piece = AnomalyCounter(engine)
+        piece.update(df.iloc[part])
+        merged.merge(piece)
+    assert (merged.rows, merged.anomalies) == (whole.rows, whole.anomalies)
+
+
+def test_falls_back_to_the_heuristic_without_features():
+    df = pd.DataFrame({"id": [f"row-{i}" for i in range(100)]})  # high-cardinality text only
+    kris = compute_kris(df)
+    assert backend().score(df, kris) == HeuristicAnomalyBackend().score(df, kris)
+    assert AnomalyCounter(backend()).rate is None
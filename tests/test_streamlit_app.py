@@ -0,0 +1,158 @@
+# Streamlit app KRIs: the chunked accumulator must agree with compute_kris
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("streamlit")
+
+from streamlit_app import (
+    DEFAULT_NUMERIC_COLS_HINT,
+    KRIAccumulator,
+    _merge_moments,
+    accumulate_kris,
+    compute_anomaly_rate,
+    compute_kris,
+    compute_kris_and_anomaly_rate,
+    compute_kris_chunked,
+)
+
+
+def metric_frame(rows=4000, seed=4):
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp("2025-11-15T00:00:00Z")
+    # Uneven traffic over ~30 hours, with a burst, so the spike ratio is non-trivial
+    offsets = np.sort(np.concatenate([rng.uniform(0, 30 * 3600, rows - 800), rng.uniform(7200, 9000, 800)]))
+    timestamps = (start + pd.to_timedelta(offsets, unit="s")).strftime("%Y-%m-%dT%H:%M:%SZ").tolist()
+    for i in rng.choice(rows, 40, replace=False):
+        timestamps[i] = "not a time" if i % 2 else None
+    latency = rng.lognormal(3.5, 0.4, rows)
+    latency[rng.choice(rows, 60, replace=False)] *= 40
+    latency[rng.choice(rows, 150, replace=False)] = np.nan
+    return pd.DataFrame(
+        {
+            "timestamp": timestamps,
+            "message": rng.choice(["ok", "request failed", "Timeout talking to db", None], rows, p=[0.8, 0.1, 0.05, 0.05]),
+            "latency_ms": latency,
+            "status_code": rng.choice([200, 200, 200, 404, 500], rows).astype(float),
+            "bytes": rng.integers(100, 10_000, rows),
+            "region": rng.choice(["eu", "us", None], rows),
+        }
+    )
+
+
+def write(df, path):
+    df.to_csv(path, index=False)
+    return path
+
+
+def hinted_frame(rows=3000):
+    # No column reads as numbers, so the hinted columns have to be coerced
+    df = metric_frame(rows=rows)[["timestamp", "message", "latency_ms", "status_code"]]
+    df["latency_ms"] = df["latency_ms"].astype(object).where(df.index % 50 != 0, "missing")
+    df["status_code"] = df["status_code"].astype(object).where(df.index % 70 != 0, "none")
+    return df
+
+
+def reference_kris(df):
+    # The copy-based compute_kris this module started from (error rate and
+    # hourly spike left out: those never touched the frame)
+    df = df.copy()
+    missingness = float(df.isna().mean().mean())
+    numeric_cols = df.select_dtypes(include=["number"]).columns.tolist()
+    if not numeric_cols:
+        lower = [c.lower() for c in df.columns]
+        for h in DEFAULT_NUMERIC_COLS_HINT:
+            if h in lower:
+                real = df.columns[lower.index(h)]
+                df[real] = pd.to_numeric(df[real], errors="coerce")
+        numeric_cols = df.select_dtypes(include=["number"]).columns.tolist()
+    outliers = 0.0
+    if numeric_cols:
+        num = df[numeric_cols].replace([float("inf"), float("-inf")], np.nan).dropna()
+        if not num.empty:
+            z = (num - num.mean()) / (num.std(ddof=0) + 1e-9)
+            outliers = float((z.abs() > 3).mean().mean())
+    return {"missingness": round(missingness, 4), "numeric_outlier_intensity": round(outliers, 4)}
+
+
+@pytest.fixture
+def metric_csv(tmp_path):
+    return write(metric_frame(), tmp_path / "metrics.csv")
+
+
+@pytest.mark.parametrize("chunksize", [29, 333, 5000, 100_000])
+def test_chunked_matches_compute_kris(metric_csv, chunksize):
+    expected = compute_kris(pd.read_csv(metric_csv))
+    assert expected["volume_spike_ratio"] > 0 and expected["numeric_outlier_intensity"] > 0
+    assert compute_kris_chunked(metric_csv, chunksize=chunksize) == expected
+
+
+def test_hinted_numeric_fallback(tmp_path):
+    path = write(hinted_frame(), tmp_path / "hinted.csv")
+    full = pd.read_csv(path)
+    assert full.select_dtypes(include=["number"]).empty
+
+    expected = compute_kris(full)
+    assert expected["numeric_outlier_intensity"] > 0
+    for chunksize in (37, 1000):
+        assert compute_kris_chunked(path, chunksize=chunksize) == expected
+
+
+def test_column_turning_non_numeric_mid_file(tmp_path):
+    # Numeric in the first chunks only: the full read treats it as text
+    df = metric_frame(rows=3000)
+    df["bytes"] = df["bytes"].astype(object)
+    df.loc[2500, "bytes"] = "lots"
+    path = write(df, tmp_path / "late-text.csv")
+    assert compute_kris_chunked(path, chunksize=400) == compute_kris(pd.read_csv(path))
+
+
+def test_merged_accumulators_match_one_pass(metric_csv):
+    df = pd.read_csv(metric_csv)
+    whole = KRIAccumulator()
+    whole.update(df)
+    merged = KRIAccumulator()
+    for part in np.array_split(np.arange(len(df)), 5):
+        piece = KRIAccumulator()
+        piece.update(df.iloc[part])
+        merged.merge(piece)
+    assert merged.rows == whole.rows and merged.hour_counts == whole.hour_counts
+    assert merged.null_counts == whole.null_counts and merged.errors == whole.errors
+    for column, (n, mean, m2) in whole.moments.items():
+        assert merged.moments[column] == pytest.approx((n, mean, m2), rel=1e-9)
+
+
+def test_merge_moments():
+    x = np.random.default_rng(0).normal(50, 12, 1001)
+    parts = [x[:1], x[1:400], x[400:]]
+    moments = None
+    for part in parts:
+        moments = _merge_moments(moments, (len(part), part.mean(), float(((part - part.mean()) ** 2).sum())))
+    n, mean, m2 = moments
+    assert n == len(x)
+    assert mean == pytest.approx(x.mean(), rel=1e-12)
+    assert m2 / n == pytest.approx(x.var(), rel=1e-9)
+
+
+def test_accumulate_kris_accepts_file_objects(metric_csv):
+    with open(metric_csv, "rb") as f:
+        assert accumulate_kris(f, chunksize=500).kris() == compute_kris(pd.read_csv(metric_csv))
+
+
+@pytest.mark.parametrize("make", [metric_frame, hinted_frame])
+def test_compute_kris_leaves_the_frame_untouched(make):
+    df = make()
+    before = df.copy()
+    compute_kris(df)
+    pd.testing.assert_frame_equal(df, before)
+    assert list(df.dtypes) == list(before.dtypes)
+
+
+@pytest.mark.parametrize("make", [metric_frame, hinted_frame])
+def test_compute_kris_matches_the_copying_version(make):
+    df = make()
+    kris = compute_kris(df)
+    expected = reference_kris(df)
+    assert {k: kris[k] for k in expected} == expected
+    assert compute_kris_and_anomaly_rate(df) == (kris, compute_anomaly_rate(df))
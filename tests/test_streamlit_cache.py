@@ -0,0 +1,81 @@
+# Streamlit app upload cache: LRU eviction by frame bytes, and the Parquet copy
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("streamlit")
+
+import streamlit_app
+from streamlit_app import UploadCache, analyse_frame, load_cached_upload, save_cached_upload
+
+
+def entry(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({"latency_ms": rng.normal(100, 10, rows), "message": rng.choice(["ok", "failed"], rows)})
+    return analyse_frame(df)
+
+
+def test_nbytes_is_the_frame_size():
+    e = entry(500)
+    assert e.nbytes == int(e.df.memory_usage(index=True, deep=True).sum())
+    assert e.rows == 500
+
+
+def test_evicts_least_recently_used_by_bytes():
+    a, b, c = entry(1000, 1), entry(1000, 2), entry(1000, 3)
+    cache = UploadCache(max_bytes=a.nbytes + b.nbytes + c.nbytes // 2)
+    cache.put("a", a)
+    cache.put("b", b)
+    assert cache.get("a") is a  # a is now the most recently used
+    cache.put("c", c)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is a and cache.get("c") is c
+    assert len(cache) == 2 and cache.nbytes == a.nbytes + c.nbytes
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_evicts_as_many_entries_as_needed():
+    small = [entry(200, seed) for seed in range(4)]
+    big = entry(2000, 9)
+    cache = UploadCache(max_bytes=big.nbytes + small[3].nbytes)
+    for i, e in enumerate(small):
+        cache.put(str(i), e)
+    cache.put("big", big)
+    assert list(cache._entries) == ["3", "big"]
+    assert cache.nbytes == big.nbytes + small[3].nbytes
+
+
+def test_replacing_a_key_does_not_double_count():
+    cache = UploadCache(max_bytes=10**9)
+    cache.put("k", entry(1000))
+    smaller = entry(10)
+    cache.put("k", smaller)
+    assert len(cache) == 1 and cache.nbytes == smaller.nbytes
+
+
+def test_newest_entry_is_kept_however_large():
+    cache = UploadCache(max_bytes=1)
+    cache.put("a", entry(100, 1))
+    big = entry(5000, 2)
+    cache.put("b", big)
+    assert len(cache) == 1 and cache.get("b") is big and cache.nbytes == big.nbytes
+
+
+def test_disk_cache_round_trip_and_pruning(tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    monkeypatch.setattr(streamlit_app, "CACHE_DIR", str(tmp_path))
+    assert load_cached_upload("missing") is None
+
+    first = entry(800, 1)
+    save_cached_upload("first", first)
+    loaded = load_cached_upload("first")
+    pd.testing.assert_frame_equal(loaded.df, first.df)
+    assert loaded.result == first.result and loaded.report_text == first.report_text
+
+    # A budget smaller than both files drops the older one, never the newest
+    size = (tmp_path / "first.parquet").stat().st_size
+    monkeypatch.setattr(streamlit_app, "CACHE_DISK_MAX_BYTES", size)
+    save_cached_upload("second", entry(800, 2))
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["second.json", "second.parquet"]
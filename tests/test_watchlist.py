@@ -0,0 +1,49 @@
+# Watchlist screening of profile identity values
+
+import json
+
+import pytest
+
+from conftest import REPO_ROOT
+from risk_engine.risk_scoring import RiskEngine
+from watchlist import Watchlist, build_watchlist
+
+
+SAMPLE = json.loads((REPO_ROOT / "examples" / "sample_input.json").read_text(encoding="utf-8"))
+
+
+@pytest.fixture
+def watchlist(tmp_path):
+    path = tmp_path / "watchlist.wl"
+    build_watchlist(["0.0.0.0/8", "10.0.0.0/8", "12345", "Mallory"], path)
+    with Watchlist(path) as wl:
+        yield wl
+
+
+def listed(watchlist, identity):
+    engine = RiskEngine(watchlist=watchlist)
+    profile = {**SAMPLE, "identity": identity}
+    return engine.screen_profile(profile) is not profile
+
+
+def test_matches_ip_text_and_identifiers(watchlist):
+    assert watchlist.matches("10.1.2.3")
+    assert watchlist.matches(" mallory ")
+    assert watchlist.matches("12345")
+    assert not watchlist.matches("11.0.0.1")
+
+
+def test_numbers_are_not_read_as_packed_ips(watchlist):
+    assert watchlist.contains_ip(167772161)  # log side: 10.0.0.1 packed
+    assert not watchlist.matches(167772161)
+    assert not watchlist.matches(4321)
+
+
+def test_screen_profile(watchlist):
+    assert not listed(watchlist, {"applicant_id": 4321})
+    assert not listed(watchlist, {"phone": 167772161})
+    assert not listed(watchlist, {"verified": True})
+    assert listed(watchlist, {"applicant_id": 12345})
+    assert listed(watchlist, {"applicant_id": "12345"})
+    assert listed(watchlist, {"last_ip": "10.9.8.7"})
+    assert listed(watchlist, {"aliases": ["bob", "MALLORY"]})